@@ -0,0 +1,36 @@
+import argparse
+import json
+from services.replay import run_backtest
+from services.snapshot_store import STORE_DIR, SnapshotStore
+
+# Replays recorded snapshots (see services/snapshot_store.py) through the
+# indicator and GEX code and scores the predicted closing range/target
+# against the actual close. No Tradier or Gemini calls are made.
+#
+#   python backtest.py --symbol SPX --start 2025-11-01 --end 2025-11-30 --llm fake --step bar
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded 0DTE snapshots and score predictions")
+    parser.add_argument("--symbol", default="SPX")
+    parser.add_argument("--start", help="first date (YYYY-MM-DD), default: earliest recorded")
+    parser.add_argument("--end", help="last date (YYYY-MM-DD), default: latest recorded")
+    parser.add_argument("--store", default=STORE_DIR, help="snapshot store directory")
+    parser.add_argument("--llm", choices=["recorded", "fake"], default="recorded")
+    parser.add_argument("--step", choices=["cycle", "bar"], default="cycle")
+    parser.add_argument("--interval", default="5min")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--output", help="write the full report as JSON to this path")
+    args = parser.parse_args()
+
+    dates = [d for d in SnapshotStore(args.store).available_dates()
+             if (not args.start or d >= args.start) and (not args.end or d <= args.end)]
+    if not dates:
+        print("No recorded dates in range.")
+    else:
+        report = run_backtest(args.symbol.upper(), dates, args.store, args.llm, args.step, args.interval, args.workers)
+        print(f"Replayed {len(dates)} day(s) for {report['symbol']}:")
+        print(json.dumps(report["summary"], indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2, default=str)
+            print(f"Report written to {args.output}")
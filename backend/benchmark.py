@@ -0,0 +1,225 @@
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from tests.fakes import SESSION_DATE, SPOT, StubGoogleDocs, StubTradier, resample, synthetic_chain, synthetic_timesales
+
+# Benchmarks for the analysis hot path, run offline:
+#
+#   python benchmark.py                       # run, write benchmarks/latest.json
+#   python benchmark.py --save-baseline       # also store it as the baseline
+#   python benchmark.py --compare             # fail if slower than the baseline
+#   python benchmark.py --record              # snapshot live Tradier data as fixtures
+#
+# Fixtures are a full 0DTE chain and a full session of 1-minute timesales.
+# Recorded ones in benchmarks/fixtures/ are used when present, otherwise a
+# deterministic synthetic SPX session of the same size is generated. The
+# end-to-end case runs job_analyze_market against a local stub Tradier
+# server with the fake LLM backend; the share case exports to a local fake
+# Google Docs/Drive server.
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks")
+FIXTURE_DIR = os.path.join(BENCH_DIR, "fixtures")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+
+def load_fixtures():
+    chain_path = os.path.join(FIXTURE_DIR, "chain.json")
+    timesales_path = os.path.join(FIXTURE_DIR, "timesales.json")
+    if os.path.exists(chain_path) and os.path.exists(timesales_path):
+        with open(chain_path) as f:
+            chain = json.load(f)
+        with open(timesales_path) as f:
+            timesales = json.load(f)
+        return chain, timesales, "recorded"
+    return synthetic_chain(), synthetic_timesales(), "synthetic"
+
+def record_fixtures(symbol):
+    from services import tradier_service
+    today = datetime.date.today().strftime("%Y-%m-%d")
+    chain = tradier_service.fetch_option_chain(symbol, today)
+    timesales = tradier_service.get_historical_candles(symbol, interval="1min", start_date=today)
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for name, data in (("chain.json", chain), ("timesales.json", timesales)):
+        with open(os.path.join(FIXTURE_DIR, name), "w") as f:
+            json.dump(data, f)
+    print(f"Recorded {len(chain)} contracts and {len(timesales)} bars for {symbol} into {FIXTURE_DIR}")
+
+def measure(fn, repeat, number=1):
+    """Runs fn number times per sample, repeat samples; returns seconds per call."""
+    fn()  # warm-up
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number)
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "stdev": statistics.stdev(samples) if len(samples) > 1 else 0.0,
+        "repeat": repeat,
+        "number": number,
+    }
+
+def run_benchmarks(chain_raw, timesales, repeat, only=None):
+    import pandas as pd
+    from services import scheduler, market_cache, storage_service, google_docs_service
+    from services.llm_cache import cache as analysis_cache
+    from services.indicators import (calculate_gex_dex, calculate_rsi, calculate_macd,
+                                     calculate_volume_totals, top_open_interest, calculate_exposure_profile)
+    from services.option_chain import OptionChain
+    from services.pipeline import build_market_data
+    from services.pricing import time_to_expiry
+    from services.streaming_indicators import IndicatorEngine
+
+    chain = OptionChain.from_tradier(chain_raw)
+    bars_5min = resample(timesales, 5)
+    closes = pd.Series([b["close"] for b in timesales])
+    years = time_to_expiry(SESSION_DATE, now=datetime.datetime.strptime(
+        f"{SESSION_DATE} 12:00", "%Y-%m-%d %H:%M").replace(tzinfo=datetime.timezone(datetime.timedelta(hours=-5))))
+    engine = IndicatorEngine()
+    ind = engine.update("SPX", "5min", bars_5min)
+    vix_quote = {"last": 16.5, "prevclose": 17.0}
+
+    def full_session_indicators():
+        IndicatorEngine().update("SPX", "1min", timesales)
+
+    def end_to_end():
+        # Cold cycle every time: no cached responses, no indicator state, no cooldown
+        market_cache.cache.clear()
+        analysis_cache.clear()
+        scheduler.indicator_engine.states.clear()
+        scheduler.last_analysis_time = None
+        with contextlib.redirect_stdout(io.StringIO()):
+            outcome = scheduler.job_analyze_market()
+        if outcome != scheduler.OUTCOME_COMPLETED:
+            raise RuntimeError(f"end-to-end cycle returned {outcome}")
+
+    cases = {
+        "option_chain_parse": (lambda: OptionChain.from_tradier(chain_raw), 10),
+        "calculate_gex_dex": (lambda: calculate_gex_dex(chain, SPOT), 50),
+        "calculate_gex_dex_raw": (lambda: calculate_gex_dex(chain_raw, SPOT), 10),
+        "calculate_rsi": (lambda: calculate_rsi(closes), 50),
+        "calculate_macd": (lambda: calculate_macd(closes), 50),
+        "calculate_volume_totals": (lambda: calculate_volume_totals(chain), 100),
+        "top_open_interest": (lambda: top_open_interest(chain), 100),
+        "calculate_exposure_profile": (lambda: calculate_exposure_profile(chain, SPOT, years), 10),
+        "indicators_full_session": (full_session_indicators, 5),
+        "build_market_data": (lambda: build_market_data("SPX", SPOT, chain, ind, vix_quote, years), 10),
+        "job_analyze_market": (end_to_end, 1),
+        "share_export": (lambda: google_docs_service.append_or_create_analysis_doc(
+            f"0DTE Analysis - {SESSION_DATE}", "benchmark analysis text"), 20),
+    }
+
+    # Keep the end-to-end run from touching real reports and snapshots
+    reports_dir = tempfile.mkdtemp(prefix="bench-reports-")
+    storage_service.save_analysis_to_disk = lambda data: (os.path.join(reports_dir, "analysis.txt"), None)
+    scheduler.SNAPSHOT_STORE_ENABLED = False
+    scheduler.indicator_engine.checkpoint_path = os.path.join(reports_dir, "indicators.json")
+    scheduler.iv_history.path = os.path.join(reports_dir, "iv_history.json")
+
+    results = {}
+    for name, (fn, number) in cases.items():
+        if only and name not in only:
+            continue
+        results[name] = measure(fn, repeat, number)
+        print(f"{name:28s} median {results[name]['median'] * 1000:9.3f} ms   min {results[name]['min'] * 1000:9.3f} ms")
+    return results
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+def compare(results, baseline, threshold):
+    """Returns the names of benchmarks whose median regressed by more than threshold."""
+    regressions = []
+    for name, current in results.items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        ratio = current["median"] / previous["median"] if previous["median"] else float("inf")
+        flag = "REGRESSION" if ratio > 1 + threshold else ""
+        print(f"{name:28s} {previous['median'] * 1000:9.3f} -> {current['median'] * 1000:9.3f} ms  ({ratio:5.2f}x) {flag}")
+        if flag:
+            regressions.append(name)
+    return regressions
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the 0DTE analysis hot path")
+    parser.add_argument("--repeat", type=int, default=7, help="samples per benchmark")
+    parser.add_argument("--only", nargs="*", help="benchmark names to run")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--compare", action="store_true", help="exit non-zero on regressions against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed slowdown before flagging (0.2 = 20%%)")
+    parser.add_argument("--record", metavar="SYMBOL", nargs="?", const="SPX",
+                        help="record today's live chain and timesales as fixtures, then exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        sys.exit(0)
+
+    chain_raw, timesales, source = load_fixtures()
+    print(f"Fixtures: {source}, {len(chain_raw)} contracts, {len(timesales)} 1-minute bars")
+
+    # Must be configured before the services are imported
+    stub = StubTradier(chain_raw, timesales).start()
+    docs_stub = StubGoogleDocs().start()
+    os.environ.update({
+        "TRADIER_BASE_URL": stub.url,
+        "GOOGLE_API_ENDPOINT": docs_stub.url,
+        "TRADIER_API_KEY": "benchmark",
+        "LLM_BACKEND": "fake",
+        "SYMBOLS": "SPX",
+        "METRICS_JSON_LOGS": "false",
+        "SNAPSHOT_STORE_ENABLED": "false",
+    })
+    try:
+        results = run_benchmarks(chain_raw, timesales, args.repeat, args.only)
+    finally:
+        stub.stop()
+        docs_stub.stop()
+
+    report = {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "fixtures": {"source": source, "contracts": len(chain_raw), "bars": len(timesales)},
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        print(f"Compared with baseline from revision {baseline.get('revision')}:")
+        regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+
+    if args.compare and regressions:
+        print(f"{len(regressions)} benchmark(s) regressed: {', '.join(regressions)}")
+        sys.exit(1)
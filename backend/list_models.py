@@ -1,16 +1,22 @@
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
+from services.llm_service import router, load_genai, GOOGLE_API_KEY
 
-load_dotenv()
+# Capability probe: checks every configured LLM route (LLM_PROVIDERS) the way
+# the server does at startup, then lists the other models the key can use.
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+print("Configured LLM routes (primary first):")
+for provider in router.probe():
+    capabilities = provider["capabilities"] or {}
+    state = "OK" if provider["available"] else f"UNAVAILABLE ({capabilities.get('reason', 'probe failed')})"
+    limits = ""
+    if capabilities.get("input_token_limit"):
+        limits = f" - input {capabilities['input_token_limit']} / output {capabilities['output_token_limit']} tokens"
+        limits += ", JSON output" if capabilities.get("json_output") else ""
+    print(f"- {provider['name']}: {state}{limits}")
 
 if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
     try:
         print("Listing available models:")
-        for m in genai.list_models():
+        for m in load_genai().list_models():
             if 'generateContent' in m.supported_generation_methods:
                 print(f"- {m.name}")
     except Exception as e:
@@ -1,12 +1,33 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
-from services.scheduler import start_scheduler, get_latest_analysis_data, job_analyze_market, pause_analysis, resume_analysis, get_scheduler_status
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from services.scheduler import start_scheduler, get_latest_analysis_data, get_all_latest_analyses, get_latest_analysis_version, pause_analysis, resume_analysis, get_scheduler_status, start_live_stream, get_live_data, STREAMING_ENABLED, PRIMARY_SYMBOL
+from services.event_bus import broadcaster
+from services.metrics import render_metrics
+from services.llm_service import router as llm_router, start_probe as start_llm_probe
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
 import contextlib
+import json
+import os
+import uuid
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
+    start_llm_probe()
     start_scheduler()
+    if STREAMING_ENABLED:
+        start_live_stream()
     yield
+    # Don't lose reports or snapshots still queued for the writer threads,
+    # or today's IV readings and indicator state (both written periodically)
+    from services.storage_service import report_writer
+    from services.snapshot_store import store as snapshot_store
+    from services.scheduler import iv_history, indicator_engine
+    report_writer.flush()
+    snapshot_store.flush()
+    iv_history.save()
+    indicator_engine.checkpoint()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -16,32 +37,154 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag"],
 )
 
+SSE_KEEPALIVE_SECONDS = 15
+
+# Blocking exports run on their own small pool instead of the shared
+# threadpool, so a slow Google Docs call never delays /api/latest. The pool
+# has a bounded backlog; beyond it requests are refused, not queued.
+EXPORT_WORKERS = int(os.getenv("EXPORT_WORKERS", "2"))
+EXPORT_MAX_PENDING = int(os.getenv("EXPORT_MAX_PENDING", "8"))
+share_executor = ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="share")
+_pending = {share_executor: 0}
+
+async def _offload(executor, fn, *args):
+    """Runs fn in the executor; None if its backlog is full."""
+    if _pending[executor] >= EXPORT_MAX_PENDING:
+        return None
+    _pending[executor] += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, fn, *args)
+    finally:
+        _pending[executor] -= 1
+
 @app.get("/api/status")
-def get_status():
+async def get_status():
     status = get_scheduler_status()
-    return {"status": "running", "paused": status["paused"]}
+    return {"status": "running", "paused": status["paused"], "symbols": status["symbols"], "llm": llm_router.status()}
+
+# The version counter restarts with the process; the nonce keeps a client's
+# ETag from an earlier run from matching a different analysis
+ETAG_NONCE = uuid.uuid4().hex[:8]
+
+def _not_modified(request, response):
+    """Sets the analysis ETag; returns a 304 response if the client has it."""
+    etag = f'"{ETAG_NONCE}-{get_latest_analysis_version()}"'
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return None
 
 @app.get("/api/latest")
-def get_latest_analysis():
-    return get_latest_analysis_data()
+async def get_latest_analysis(request: Request, response: Response, symbol: str = None):
+    return _not_modified(request, response) or get_latest_analysis_data(symbol)
+
+@app.get("/api/latest/all")
+async def get_latest_analyses(request: Request, response: Response):
+    return _not_modified(request, response) or get_all_latest_analyses()
+
+def _sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+@app.get("/api/events")
+async def stream_events(request: Request):
+    """Server-sent events: pushes each new analysis and pause/resume change."""
+    queue = broadcaster.subscribe()
+
+    async def event_stream():
+        try:
+            # Current state first, so a client never needs an initial poll
+            yield _sse("status", get_scheduler_status())
+            for analysis in get_all_latest_analyses().values():
+                yield _sse("analysis", analysis)
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield _sse(event, data)
+        finally:
+            broadcaster.unsubscribe(queue)
+
+    headers = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers=headers)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+@app.get("/api/live")
+async def get_live():
+    return get_live_data()
+
+@app.get("/api/cache/stats")
+async def get_cache_stats():
+    from services.market_cache import get_cache_stats
+    return get_cache_stats()
+
+@app.get("/api/snapshots")
+def get_snapshots(symbol: str, date: str, start: float = None, end: float = None):
+    from services.snapshot_store import store
+    try:
+        return store.query_cycles(date, symbol.upper(), start, end)
+    except ValueError as e:
+        return {"error": str(e)}
+
+@app.get("/api/snapshots/chain")
+def get_snapshot_chain(symbol: str, date: str, start: float = None, end: float = None,
+                       strike_min: float = None, strike_max: float = None):
+    from services.snapshot_store import store
+    try:
+        columns = store.query_chain(date, symbol.upper(), start, end, strike_min, strike_max)
+    except ValueError as e:
+        return {"error": str(e)}
+    # NaN (missing greeks/IV) is not valid JSON
+    return {name: values if isinstance(values, list) else [None if v != v else v for v in values.tolist()]
+            for name, values in columns.items()}
+
+@app.get("/api/history")
+async def get_history(symbol: str = PRIMARY_SYMBOL, since: float = None, range_pct: float = 0.03):
+    """OI and GEX change by strike between today's in-memory snapshots."""
+    from services.history import history
+    changes = history.changes(symbol.upper(), since, range_pct)
+    if changes is None:
+        return {"error": f"Need at least two snapshots of {symbol.upper()} today", "stats": history.stats()}
+    changes["snapshots"] = [s.describe() for s in history.snapshots(symbol.upper())]
+    return changes
 
 @app.post("/api/analyze")
-def trigger_analysis():
-    job_analyze_market()
-    return {"message": "Analysis triggered", "result": get_latest_analysis_data()}
+async def trigger_analysis():
+    from services.job_service import submit_analysis
+    job, coalesced = submit_analysis()
+    return {"message": "Analysis triggered", "job_id": job["id"], "status": job["status"], "coalesced": coalesced}
+
+@app.get("/api/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    from services.job_service import get_job
+    job = get_job(job_id)
+    if not job:
+        return {"error": "Job not found"}
+    return job
 
 @app.post("/api/share")
-def share_analysis():
+async def share_analysis(symbol: str = None):
+    data = get_latest_analysis_data(symbol)
+    if not data or not data.get("text"):
+        return {"error": "No analysis available to share"}
+    if data.get("partial"):
+        return {"error": "Analysis is still being generated"}
+    result = await _offload(share_executor, _share, data)
+    return result or {"error": "Too many share requests in progress"}
+
+def _share(data):
     from services.google_docs_service import append_or_create_analysis_doc
     import datetime
     from zoneinfo import ZoneInfo
-    
-    data = get_latest_analysis_data()
-    if not data or not data.get("text"):
-        return {"error": "No analysis available to share"}
-        
+
     try:
         # Title is now just the date
         today_str = datetime.date.today().strftime("%Y-%m-%d")
@@ -63,7 +206,8 @@ def share_analysis():
                 print(f"Error formatting time: {e}")
                 formatted_time = timestamp_str
 
-        content = f"Analysis Time: {formatted_time}\n\n{data.get('text')}"
+        symbol_line = f"Symbol: {data['data']['symbol']}\n" if data.get("data", {}).get("symbol") else ""
+        content = f"Analysis Time: {formatted_time}\n{symbol_line}\n{data.get('text')}"
         
         doc_url = append_or_create_analysis_doc(title, content)
         return {"url": doc_url}
@@ -71,10 +215,13 @@ def share_analysis():
         return {"error": str(e)}
 
 @app.post("/api/save_local")
-def save_local_analysis():
+async def save_local_analysis(symbol: str = None):
     from services.storage_service import save_analysis_to_disk
     
-    data = get_latest_analysis_data()
+    data = get_latest_analysis_data(symbol)
+    if data.get("partial"):
+        return {"error": "Analysis is still being generated"}
+    # Only queues the write for the report writer thread
     filepath, error = save_analysis_to_disk(data)
     
     if error:
@@ -83,14 +230,17 @@ def save_local_analysis():
     return {"message": f"Saved to {filepath}", "path": filepath}
 
 @app.post("/api/pause")
-def pause_server():
+async def pause_server():
     pause_analysis()
     return {"message": "Analysis paused"}
 
 @app.post("/api/resume")
-def resume_server():
+async def resume_server():
+    from services.job_service import submit_analysis
     resume_analysis()
-    return {"message": "Analysis resumed"}
+    # Trigger one run right away without holding the request open
+    job, _ = submit_analysis()
+    return {"message": "Analysis resumed", "job_id": job["id"]}
 
 if __name__ == "__main__":
     import uvicorn
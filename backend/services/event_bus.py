@@ -0,0 +1,50 @@
+import asyncio
+import threading
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+class EventBroadcaster:
+    """Fans events out to connected clients (e.g. SSE streams).
+
+    publish() may be called from any thread (the scheduler runs in
+    APScheduler's worker threads); each subscriber gets the event on its
+    own asyncio queue via its event loop. A slow client's queue is bounded
+    and loses its oldest events first rather than growing without limit.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def subscribe(self):
+        """Must be called from the event loop that will read the queue."""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.add((asyncio.get_running_loop(), queue))
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers = {(loop, q) for loop, q in self._subscribers if q is not queue}
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(_put_latest, queue, (event, data))
+            except RuntimeError:
+                # Loop already closed; the client is gone
+                self.unsubscribe(queue)
+
+def _put_latest(queue, item):
+    if queue.full():
+        queue.get_nowait()
+    queue.put_nowait(item)
+
+broadcaster = EventBroadcaster()
@@ -1,63 +1,64 @@
-import google.generativeai as genai
-import os
-from dotenv import load_dotenv
-import json
+from . import metrics, prompt_builder
+from .llm_service import LLMError, router
+from .prompt_builder import STRUCTURED_OUTPUT
 
-load_dotenv()
+def set_backend(backend):
+    """Routes every generation to this provider alone (e.g. StubProvider
+    for offline runs)."""
+    router.set_providers([backend])
 
-GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+def build_prompt(market_data):
+    prompt, info = prompt_builder.build_prompt(market_data)
+    metrics.llm_prompt_tokens.observe(info["tokens"])
+    if info["dropped"]:
+        print(f"Prompt over budget, dropped: {', '.join(info['dropped'])}")
+    return prompt
 
-if GOOGLE_API_KEY:
-    genai.configure(api_key=GOOGLE_API_KEY)
+def finish_analysis(text):
+    """(display_text, structured) for a complete reply.
 
-def analyze_market(market_data):
-    if not GOOGLE_API_KEY:
-        return {"error": "Google API Key not configured"}
-
-    model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    prompt = f"""
-    You are a professional 0DTE (Zero Days to Expiration) options trader.
-    Analyze the following market data for {market_data.get('symbol')} and provide a trading suggestion.
-    
-    Current Price: {market_data.get('spot_price')}
-    VIX Level: {market_data.get('vix_current')}
-    VIX Trend (1hr): {market_data.get('vix_trend')}
-    
-    Data Summary:
-    - Call Volume: {market_data.get('call_volume')}
-    - Put Volume: {market_data.get('put_volume')}
-    - Top Open Interest Strikes: {market_data.get('top_oi_strikes')}
-    
-    Technical Indicators (5min):
-    - RSI (14): {market_data.get('rsi_5min')}
-    - MACD: {market_data.get('macd_5min')}
-    - Recent Trend: {market_data.get('recent_trend_5min')}
-    
-    Gamma & Delta Exposure:
-    - Total GEX: {market_data.get('total_gex')}
-    - Total DEX: {market_data.get('total_dex')}
-    
-    Please provide:
-    1. Market Sentiment (Bullish/Bearish/Neutral)
-    2. Predicted Closing Price Range
-    3. Predicted Specific Closing Price Target (within 10 points)
-    4. Suggested Strategy (e.g., Iron Condor, Butterfly, Diagonal, Calendar, Ratio Spread, Long Call/Put, etc.)
-       - Choose the most appropriate structure based on volatility (IV Rank/Skew) and trend.
-    5. Recommended Exit Criteria:
-       - Profit Target (e.g., 20% or specific price)
-       - Stop Loss (e.g., -10% or specific price)
-       - Time Exit (e.g., "Close by 3:30 PM if target not met")
-    6. Key Support/Resistance Levels
-    
-    Keep the response concise and suitable for a text-to-speech summary.
+    With structured output the JSON reply is validated and rendered as
+    text; a reply that fails validation is shown as-is with structured
+    None.
+    """
+    if not STRUCTURED_OUTPUT or not text:
+        return text, None
+    try:
+        structured = prompt_builder.parse_analysis(text)
+    except ValueError as e:
+        print(f"Invalid structured reply ({e}), showing raw text")
+        metrics.llm_output_total.inc(result="invalid")
+        return text, None
+    metrics.llm_output_total.inc(result="valid")
+    return prompt_builder.render_text(structured), structured
+
+def cacheable(text, structured):
+    """Whether a finished reply may be cached and served again: it has text
+    and, with structured output, parsed (see finish_analysis)."""
+    return bool(text) and (structured is not None or not STRUCTURED_OUTPUT)
+
+def partial_text(text):
+    """The displayable part of a reply still being generated: the text
+    itself, or with structured output the JSON reply's summary so far (the
+    other fields are only shown once the reply is complete and parsed)."""
+    return prompt_builder.partial_summary(text) if STRUCTURED_OUTPUT else text
+
+def analyze_market_stream(market_data):
+    """Yields the analysis text chunk by chunk as the model produces it.
+
+    Raises LLMError if generation fails.
     """
-    
+    yield from router.stream(build_prompt(market_data), json_output=STRUCTURED_OUTPUT)
+
+def error_text(error):
+    """User-facing text for a failed generation."""
+    if error.rate_limited:
+        return "Analysis unavailable: Rate limit exceeded. Please try again in a minute."
+    return f"Error generating analysis: {error}"
+
+def analyze_market(market_data):
     try:
-        response = model.generate_content(prompt)
-        return response.text
-    except Exception as e:
-        error_msg = str(e)
-        if "429" in error_msg:
-            return "Analysis unavailable: Rate limit exceeded. Please try again in a minute."
-        return f"Error generating analysis: {error_msg}"
+        text, _ = finish_analysis("".join(analyze_market_stream(market_data)))
+        return text
+    except LLMError as e:
+        return error_text(e)
@@ -1,14 +1,38 @@
+import datetime
 import os.path
-import pickle
+import threading
+import time
+from concurrent.futures import Future, TimeoutError
+from google.auth.credentials import AnonymousCredentials
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
+from googleapiclient.errors import HttpError
 
-# If modifying these scopes, delete the file token.json.
 # If modifying these scopes, delete the file token.json.
 SCOPES = ['https://www.googleapis.com/auth/documents', 'https://www.googleapis.com/auth/drive.file']
 
+# Sends Docs and Drive calls to another server, e.g. a local fake for testing
+# (Docs paths start with /v1/documents, Drive paths with /files). Without a
+# token.json the calls are then made unauthenticated.
+GOOGLE_API_ENDPOINT = os.getenv("GOOGLE_API_ENDPOINT")
+EXPORT_TIMEOUT_SECONDS = float(os.getenv("EXPORT_TIMEOUT_SECONDS", "60"))
+# The access token is refreshed in the background this long before it expires
+TOKEN_REFRESH_MARGIN_SECONDS = 300
+TOKEN_CHECK_SECONDS = 60
+
+SEPARATOR = "\n" + "-"*20 + "\n\n"
+
+_clients = None
+_clients_lock = threading.Lock()
+# The day's document: {"title", "id", "end_index"}; only the export worker touches it
+_daily_doc = {}
+
+def _save_token(creds):
+    with open('token.json', 'w') as token:
+        token.write(creds.to_json())
+
 def get_credentials():
     creds = None
     # The file token.json stores the user's access and refresh tokens, and is
@@ -16,7 +40,9 @@ def get_credentials():
     # time.
     if os.path.exists('token.json'):
         creds = Credentials.from_authorized_user_file('token.json', SCOPES)
-    
+    elif GOOGLE_API_ENDPOINT:
+        return AnonymousCredentials()
+
     # If there are no (valid) credentials available, let the user log in.
     if not creds or not creds.valid:
         if creds and creds.expired and creds.refresh_token:
@@ -24,24 +50,56 @@ def get_credentials():
         else:
             if not os.path.exists('credentials.json'):
                 raise FileNotFoundError("credentials.json not found. Please download it from Google Cloud Console.")
-                
+
             flow = InstalledAppFlow.from_client_secrets_file(
                 'credentials.json', SCOPES)
             creds = flow.run_local_server(port=0)
-            
+
         # Save the credentials for the next run
-        with open('token.json', 'w') as token:
-            token.write(creds.to_json())
-            
+        _save_token(creds)
+
     return creds
 
-def find_daily_doc(service, title):
+def _refresh_loop(creds):
+    """Keeps the access token fresh so no export waits on a token refresh."""
+    while True:
+        time.sleep(TOKEN_CHECK_SECONDS)
+        expiry = getattr(creds, "expiry", None)  # naive UTC
+        if not expiry or not getattr(creds, "refresh_token", None):
+            continue
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        if (expiry - now).total_seconds() > TOKEN_REFRESH_MARGIN_SECONDS:
+            continue
+        try:
+            creds.refresh(Request())
+            _save_token(creds)
+        except Exception as e:
+            print(f"Google token refresh failed: {e}")
+
+def get_clients():
+    """(documents, files) API resources, built once and reused across exports.
+
+    Building a resource renders its method docstrings from the discovery
+    document, which costs more than a request; the built ones are kept.
+    """
+    global _clients
+    with _clients_lock:
+        if _clients is None:
+            creds = get_credentials()
+            options = {"api_endpoint": GOOGLE_API_ENDPOINT} if GOOGLE_API_ENDPOINT else None
+            # The discovery documents ship with the client library; no fetch needed
+            _clients = (build('docs', 'v1', credentials=creds, client_options=options, static_discovery=True).documents(),
+                        build('drive', 'v3', credentials=creds, client_options=options, static_discovery=True).files())
+            threading.Thread(target=_refresh_loop, args=(creds,), daemon=True, name="google-token-refresh").start()
+        return _clients
+
+def find_daily_doc(files, title):
     """Finds a file with the exact title in Drive."""
     try:
         # drive.file scope allows access to files created by this app
         # We search for non-trashed files with the exact name
         query = f"name = '{title}' and trashed = false and mimeType = 'application/vnd.google-apps.document'"
-        results = service.files().list(q=query, fields="files(id, name)").execute()
+        results = files.list(q=query, fields="files(id, name)").execute()
         files = results.get('files', [])
         if files:
             return files[0]['id']
@@ -50,53 +108,129 @@ def find_daily_doc(service, title):
         print(f"Error searching for doc: {e}")
         return None
 
+def _utf16_len(text):
+    # Docs indexes count UTF-16 code units
+    return len(text.encode("utf-16-le")) // 2
+
+def _end_index(documents, document_id):
+    # Only the element end indexes, not the document text
+    doc = documents.get(documentId=document_id, fields="body/content/endIndex").execute()
+    return doc.get('body').get('content')[-1].get('endIndex')
+
+def _resolve_daily_doc(title):
+    """Finds or creates the day's document; the ID is cached until the title
+    changes. The end index is re-read on every call, since the document may
+    have been edited elsewhere."""
+    documents, files = get_clients()
+    if _daily_doc.get("title") == title:
+        _daily_doc["end_index"] = _end_index(documents, _daily_doc["id"])
+        return _daily_doc
+    document_id = find_daily_doc(files, title)
+    if document_id:
+        print(f"Found existing doc: {document_id}")
+        end_index = _end_index(documents, document_id)
+    else:
+        doc = documents.create(body={'title': title}).execute()
+        document_id = doc.get('documentId')
+        end_index = 2  # A new document holds just its final newline
+        print(f"Created new doc: {document_id}")
+    _daily_doc.clear()
+    _daily_doc.update(title=title, id=document_id, end_index=end_index)
+    return _daily_doc
+
+def _append(doc, contents):
+    text = ""
+    for content in contents:
+        if doc["end_index"] <= 2 and not text:
+            text = content + "\n\n"
+        else:
+            text += SEPARATOR + content + "\n"
+    documents, _ = get_clients()
+    requests = [{'insertText': {'location': {'index': doc["end_index"] - 1}, 'text': text}}]
+    documents.batchUpdate(documentId=doc["id"], body={'requests': requests}).execute()
+    doc["end_index"] += _utf16_len(text)
+
+def write_analyses(title, contents):
+    """Appends the contents to the day's document in a single batchUpdate.
+
+    The document ID is cached, so a warm export is two round-trips: reading
+    the current end index and the update. If either is rejected (e.g. the
+    document was deleted elsewhere) the document is looked up again and the
+    write retried once.
+    """
+    try:
+        doc = _resolve_daily_doc(title)
+        _append(doc, contents)
+    except HttpError as e:
+        if e.resp.status not in (400, 404):
+            raise
+        print(f"Doc write rejected ({e.resp.status}), reloading document")
+        _daily_doc.clear()
+        doc = _resolve_daily_doc(title)
+        _append(doc, contents)
+    return f"https://docs.google.com/document/d/{doc['id']}/edit"
+
+class ExportQueue:
+    """Background writer for document exports.
+
+    A single worker thread owns the API clients. Everything queued while a
+    write is in flight goes out together, one batchUpdate per document.
+    """
+
+    def __init__(self, write):
+        self._write = write
+        self._pending = []
+        self._cond = threading.Condition()
+        self._thread = None
+
+    def submit(self, title, content):
+        """Queues content for the titled document; returns a Future of its URL."""
+        future = Future()
+        with self._cond:
+            self._pending.append((title, content, future))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name="docs-export")
+                self._thread.start()
+            self._cond.notify()
+        return future
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._pending:
+                    self._cond.wait()
+                batch, self._pending = self._pending, []
+            by_title = {}
+            for title, content, future in batch:
+                # Requests that timed out were cancelled and are not written
+                if future.set_running_or_notify_cancel():
+                    by_title.setdefault(title, []).append((content, future))
+            for title, items in by_title.items():
+                if len(items) > 1:
+                    print(f"Exporting {len(items)} analyses to '{title}' in one update")
+                try:
+                    url = self._write(title, [content for content, _ in items])
+                except Exception as e:
+                    print(f"Error handling doc: {e}")
+                    for _, future in items:
+                        future.set_exception(e)
+                else:
+                    for _, future in items:
+                        future.set_result(url)
+
+export_queue = ExportQueue(write_analyses)
+
 def append_or_create_analysis_doc(title, content):
-    """Creates a new Google Doc or appends to existing one for the day."""
+    """Creates a new Google Doc or appends to existing one for the day.
+
+    If the export hasn't started within EXPORT_TIMEOUT_SECONDS it is dropped
+    and TimeoutError raised; one already being written is waited for, so a
+    reported failure never leaves the analysis in the document.
+    """
+    future = export_queue.submit(title, content)
     try:
-        creds = get_credentials()
-        docs_service = build('docs', 'v1', credentials=creds)
-        drive_service = build('drive', 'v3', credentials=creds)
-
-        # Check if doc exists
-        document_id = find_daily_doc(drive_service, title)
-        
-        if not document_id:
-            # Create new document
-            body = {'title': title}
-            doc = docs_service.documents().create(body=body).execute()
-            document_id = doc.get('documentId')
-            print(f"Created new doc: {document_id}")
-            
-            # Insert initial content
-            requests = [
-                {
-                    'insertText': {
-                        'location': {'index': 1},
-                        'text': content + "\n\n"
-                    }
-                }
-            ]
-        else:
-            print(f"Found existing doc: {document_id}")
-            # Get document bounds to append to the end
-            doc = docs_service.documents().get(documentId=document_id).execute()
-            content_len = doc.get('body').get('content')[-1].get('endIndex')
-            
-            # Append content with a separator
-            requests = [
-                {
-                    'insertText': {
-                        'location': {'index': content_len - 1},
-                        'text': "\n" + "-"*20 + "\n\n" + content + "\n"
-                    }
-                }
-            ]
-        
-        docs_service.documents().batchUpdate(
-            documentId=document_id, body={'requests': requests}).execute()
-            
-        return f"https://docs.google.com/document/d/{document_id}/edit"
-        
-    except Exception as e:
-        print(f"Error handling doc: {e}")
-        raise e
+        return future.result(timeout=EXPORT_TIMEOUT_SECONDS)
+    except TimeoutError:
+        if future.cancel():
+            raise TimeoutError(f"Export not started within {EXPORT_TIMEOUT_SECONDS:g}s") from None
+        return future.result()
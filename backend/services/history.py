@@ -0,0 +1,166 @@
+import datetime
+import os
+import threading
+from collections import deque
+import numpy as np
+from .pricing import MARKET_TZ
+
+HISTORY_MAX_CYCLES = int(os.getenv("HISTORY_MAX_CYCLES", "100"))
+HISTORY_MAX_MB = float(os.getenv("HISTORY_MAX_MB", "64"))
+
+# One row per contract, 26 bytes instead of a ~2 KB Tradier dict
+CONTRACT_DTYPE = np.dtype([
+    ("strike", np.float32),
+    ("expiry", np.uint8),
+    ("is_call", np.bool_),
+    ("open_interest", np.float32),
+    ("volume", np.float32),
+    ("iv", np.float32),
+    ("gamma", np.float32),
+    ("delta", np.float32),
+])
+
+class ChainSnapshot:
+    """One cycle's chain for one symbol as a structured array."""
+
+    __slots__ = ("ts", "spot", "expirations", "rows", "summary")
+
+    def __init__(self, ts, spot, expirations, rows, summary=None):
+        self.ts = ts
+        self.spot = spot
+        self.expirations = expirations
+        self.rows = rows
+        self.summary = summary or {}
+
+    @classmethod
+    def from_chain(cls, ts, spot, chain, summary=None):
+        rows = np.empty(len(chain), dtype=CONTRACT_DTYPE)
+        rows["strike"] = chain.strike
+        rows["expiry"] = chain.expiry
+        rows["is_call"] = chain.is_call
+        rows["open_interest"] = chain.open_interest
+        rows["volume"] = chain.volume
+        rows["iv"] = chain.iv
+        rows["gamma"] = chain.gamma
+        rows["delta"] = chain.delta
+        return cls(ts, spot, list(chain.expirations), rows, summary)
+
+    @property
+    def nbytes(self):
+        return self.rows.nbytes
+
+    def gex(self):
+        """Dealer-signed GEX per contract at this snapshot's spot (NaN -> 0)."""
+        rows = self.rows
+        sign = np.where(rows["is_call"], 1.0, -1.0)
+        return np.nan_to_num(rows["gamma"].astype(np.float64) * rows["open_interest"] * 100 * self.spot * sign)
+
+    def describe(self):
+        return {"ts": self.ts, "time": datetime.datetime.fromtimestamp(self.ts, MARKET_TZ).isoformat(),
+                "spot": self.spot, "contracts": len(self.rows), "expirations": self.expirations, **self.summary}
+
+def _by_strike(snapshot, strikes):
+    """Call OI, put OI and net GEX of the snapshot on the given strike grid.
+
+    Rows without a finite strike are left out; searchsorted would put them
+    past the end of the grid.
+    """
+    rows = snapshot.rows
+    finite = np.isfinite(rows["strike"])
+    rows = rows[finite]
+    idx = np.searchsorted(strikes, rows["strike"])
+    n = len(strikes)
+    oi = np.nan_to_num(rows["open_interest"].astype(np.float64))
+    call_oi = np.bincount(idx, weights=np.where(rows["is_call"], oi, 0.0), minlength=n)
+    put_oi = np.bincount(idx, weights=np.where(rows["is_call"], 0.0, oi), minlength=n)
+    net_gex = np.bincount(idx, weights=snapshot.gex()[finite], minlength=n)
+    return call_oi, put_oi, net_gex
+
+class IntradayHistory:
+    """Ring buffer of the day's chain snapshots per symbol.
+
+    Keeps at most max_cycles snapshots per symbol and evicts the oldest
+    snapshot of any symbol while the total exceeds max_bytes. A snapshot
+    from a new trading day clears that symbol's buffer.
+    """
+
+    def __init__(self, max_cycles=HISTORY_MAX_CYCLES, max_bytes=HISTORY_MAX_MB * 1024 * 1024):
+        self.max_cycles = max_cycles
+        self.max_bytes = max_bytes
+        self._buffers = {}
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, symbol, ts, spot, chain, summary=None):
+        snapshot = ChainSnapshot.from_chain(ts, spot, chain, summary)
+        day = datetime.datetime.fromtimestamp(ts, MARKET_TZ).date()
+        with self._lock:
+            buffer = self._buffers.get(symbol)
+            if buffer and datetime.datetime.fromtimestamp(buffer[-1].ts, MARKET_TZ).date() != day:
+                self._bytes -= sum(s.nbytes for s in buffer)
+                buffer.clear()
+            if buffer is None:
+                buffer = self._buffers[symbol] = deque()
+            buffer.append(snapshot)
+            self._bytes += snapshot.nbytes
+            if len(buffer) > self.max_cycles:
+                self._bytes -= buffer.popleft().nbytes
+            while self._bytes > self.max_bytes:
+                oldest = min((b for b in self._buffers.values() if len(b) > 1), key=lambda b: b[0].ts, default=None)
+                if oldest is None:
+                    break
+                self._bytes -= oldest.popleft().nbytes
+        return snapshot
+
+    def snapshots(self, symbol):
+        with self._lock:
+            return list(self._buffers.get(symbol, ()))
+
+    def stats(self):
+        with self._lock:
+            return {"bytes": self._bytes, "max_bytes": self.max_bytes, "max_cycles": self.max_cycles,
+                    "cycles": {symbol: len(buffer) for symbol, buffer in self._buffers.items()}}
+
+    def changes(self, symbol, since=None, range_pct=0.03):
+        """OI and GEX change by strike between two snapshots.
+
+        Compares the latest snapshot with the last one taken at or before
+        since (epoch seconds), or with the previous snapshot when since is
+        None. Strikes are limited to range_pct around the latest spot.
+        Returns None when fewer than two snapshots exist.
+        """
+        snapshots = self.snapshots(symbol)
+        if len(snapshots) < 2:
+            return None
+        latest = snapshots[-1]
+        if since is None:
+            base = snapshots[-2]
+        else:
+            earlier = [s for s in snapshots[:-1] if s.ts <= since]
+            base = earlier[-1] if earlier else snapshots[0]
+
+        strikes = np.union1d(latest.rows["strike"], base.rows["strike"])
+        strikes = strikes[np.isfinite(strikes)]
+        call_now, put_now, gex_now = _by_strike(latest, strikes)
+        call_then, put_then, gex_then = _by_strike(base, strikes)
+        near = np.abs(strikes / latest.spot - 1) <= range_pct
+
+        return {
+            "symbol": symbol,
+            "from": base.describe(),
+            "to": latest.describe(),
+            "totals": {
+                "call_oi_change": round(float(call_now.sum() - call_then.sum())),
+                "put_oi_change": round(float(put_now.sum() - put_then.sum())),
+                "net_gex_change": round(float(gex_now.sum() - gex_then.sum())),
+            },
+            "strikes": [
+                {"strike": float(k), "call_oi_change": round(float(c1 - c0)), "put_oi_change": round(float(p1 - p0)),
+                 "net_gex": round(float(g1)), "net_gex_change": round(float(g1 - g0))}
+                for k, c0, c1, p0, p1, g0, g1 in zip(
+                    strikes[near], call_then[near], call_now[near], put_then[near], put_now[near],
+                    gex_then[near], gex_now[near])
+            ],
+        }
+
+history = IntradayHistory()
@@ -1,5 +1,7 @@
 import pandas as pd
 import numpy as np
+from .option_chain import OptionChain
+from .pricing import bs_gamma
 
 def calculate_rsi(prices, period=14):
     delta = prices.diff()
@@ -22,44 +24,199 @@ def calculate_macd(prices, fast=12, slow=26, signal=9):
         "histogram": macd.iloc[-1] - signal_line.iloc[-1]
     }
 
+def _as_chain(chain):
+    if isinstance(chain, OptionChain):
+        return chain
+    return OptionChain.from_tradier(chain)
+
 def calculate_gex_dex(chain, spot_price):
-    total_gex = 0
-    total_dex = 0
-    
-    for opt in chain:
-        try:
-            # Basic checks
-            if 'greeks' not in opt or not opt['greeks']:
-                continue
-                
-            gamma = opt['greeks'].get('gamma', 0)
-            delta = opt['greeks'].get('delta', 0)
-            oi = opt.get('open_interest', 0)
-            
-            if gamma is None or delta is None or oi is None:
-                continue
-                
-            # Standard GEX formula: Gamma * OI * 100 * Spot
-            # Call Gamma is positive, Put Gamma is usually treated as positive for the option but negative for the dealer (short gamma).
-            # Common dealer positioning assumption: Dealers are long calls (positive gamma) and short puts (negative gamma)? 
-            # Actually, standard GEX assumption: Dealers are short calls (negative gamma) and long puts (positive gamma)?
-            # Let's use the SpotGamma / SqueezeMetrics convention:
-            # Call GEX = Gamma * OI * 100 * Spot (Positive)
-            # Put GEX = Gamma * OI * 100 * Spot * -1 (Negative)
-            
-            gex_contribution = gamma * oi * 100 * spot_price
-            if opt['option_type'] == 'put':
-                gex_contribution *= -1
-                
-            total_gex += gex_contribution
-            
-            # DEX (Delta Exposure)
-            # Call DEX = Delta * OI * 100 * Spot
-            # Put DEX = Delta * OI * 100 * Spot (Delta is already negative for puts)
-            dex_contribution = delta * oi * 100 * spot_price
-            total_dex += dex_contribution
-            
-        except Exception:
-            continue
-            
+    """Total gamma and delta exposure of the chain at spot_price.
+
+    Accepts an OptionChain or the raw Tradier list of dicts. Contracts
+    without gamma, delta or open interest are left out.
+    """
+    chain = _as_chain(chain)
+
+    # SpotGamma / SqueezeMetrics convention:
+    # Call GEX = Gamma * OI * 100 * Spot (Positive)
+    # Put GEX = Gamma * OI * 100 * Spot * -1 (Negative)
+    # DEX = Delta * OI * 100 * Spot (Delta is already negative for puts)
+    valid = _valid_exposure(chain)
+    notional = chain.open_interest[valid] * 100 * spot_price
+    sign = np.where(chain.is_call[valid], 1.0, -1.0)
+
+    total_gex = float(np.dot(chain.gamma[valid] * sign, notional))
+    total_dex = float(np.dot(chain.delta[valid], notional))
     return total_gex, total_dex
+
+def calculate_volume_totals(chain):
+    """Returns (call_volume, put_volume) for the chain."""
+    chain = _as_chain(chain)
+    volume = np.nan_to_num(chain.volume)
+    call_vol = volume[chain.is_call].sum()
+    put_vol = volume[chain.is_put].sum()
+    return int(call_vol), int(put_vol)
+
+def top_open_interest(chain, n=5):
+    """Returns [(strike, option_type), ...] for the n largest open interest
+    contracts, highest first."""
+    chain = _as_chain(chain)
+    if len(chain) == 0:
+        return []
+
+    oi = np.nan_to_num(chain.open_interest, nan=-1.0)
+    n = min(n, len(oi))
+    # argpartition finds the top n in O(len); only those n get sorted
+    idx = np.argpartition(oi, -n)[-n:]
+    idx = idx[np.argsort(-oi[idx], kind="stable")]
+    types = chain.option_types()
+    return [(float(chain.strike[i]), str(types[i])) for i in idx]
+
+# Signed distance-from-spot bucket edges (fraction of spot)
+EXPOSURE_BUCKET_EDGES = (-0.02, -0.01, -0.005, -0.0025, 0.0, 0.0025, 0.005, 0.01, 0.02)
+
+def _bucket_labels(edges):
+    bounds = [None] + list(edges) + [None]
+    labels = []
+    for lo, hi in zip(bounds[:-1], bounds[1:]):
+        if lo is None:
+            labels.append(f"< {hi:+.2%}")
+        elif hi is None:
+            labels.append(f">= {lo:+.2%}")
+        else:
+            labels.append(f"{lo:+.2%} to {hi:+.2%}")
+    return labels
+
+def find_zero_gamma(chain, spot_price, years_to_expiry, grid_pct=0.05, grid_points=201):
+    """Spot level where net dealer gamma changes sign.
+
+    Re-prices gamma for every contract across a grid of hypothetical spots
+    as one contracts x spots Black-Scholes matrix, then interpolates the
+    sign change closest to the current spot. Returns None if net gamma
+    does not flip inside the grid or no contract has an IV.
+    years_to_expiry is a scalar or one value per contract.
+    """
+    chain = _as_chain(chain)
+    oi = np.nan_to_num(chain.open_interest)
+    iv = chain.iv
+    usable = (oi > 0) & (iv > 0)
+    if not usable.any():
+        return None
+
+    strike = chain.strike[usable][:, None]
+    contract_iv = iv[usable][:, None]
+    weight = (oi[usable] * np.where(chain.is_call[usable], 1.0, -1.0))[:, None]
+    t = np.asarray(years_to_expiry, dtype=np.float64)
+    if t.ndim:
+        t = t[usable][:, None]
+
+    spots = spot_price * np.linspace(1 - grid_pct, 1 + grid_pct, grid_points)
+    gamma = bs_gamma(spots[None, :], strike, contract_iv, t)
+    net_gex = (weight * gamma).sum(axis=0) * 100 * spots
+
+    crossings = np.nonzero(np.diff(np.sign(net_gex)) != 0)[0]
+    if len(crossings) == 0:
+        return None
+
+    i = crossings[np.argmin(np.abs(spots[crossings] - spot_price))]
+    x0, x1 = spots[i], spots[i + 1]
+    y0, y1 = net_gex[i], net_gex[i + 1]
+    return float(x0 - y0 * (x1 - x0) / (y1 - y0))
+
+def _valid_exposure(chain):
+    """Mask of contracts with gamma, delta and open interest."""
+    return ~(np.isnan(chain.gamma) | np.isnan(chain.delta) | np.isnan(chain.open_interest))
+
+def _walls(strike, is_call, gex):
+    """Call and put walls from per-contract dealer-signed GEX (puts negative).
+
+    The call wall is the strike with the largest call GEX, the put wall the
+    strike with the most negative put GEX; either is None when that side has
+    no exposure.
+    """
+    call_wall = put_wall = None
+    if len(strike) == 0:
+        return call_wall, put_wall
+    strikes, idx = np.unique(strike, return_inverse=True)
+    call_gex = np.bincount(idx, weights=np.where(is_call, gex, 0.0), minlength=len(strikes))
+    put_gex = np.bincount(idx, weights=np.where(is_call, 0.0, gex), minlength=len(strikes))
+    if call_gex.max() > 0:
+        call_wall = float(strikes[np.argmax(call_gex)])
+    if put_gex.min() < 0:
+        put_wall = float(strikes[np.argmin(put_gex)])
+    return call_wall, put_wall
+
+def calculate_exposure_profile(chain, spot_price, years_to_expiry, profile_pct=0.03):
+    """Per-strike gamma/delta exposure plus the levels derived from it.
+
+    Returns a JSON-serializable dict with total GEX/DEX, the zero-gamma
+    flip, call and put walls, net exposure bucketed by distance from spot
+    and the per-strike profile for strikes within profile_pct of spot.
+    """
+    chain = _as_chain(chain)
+    valid = _valid_exposure(chain)
+    strike = chain.strike[valid]
+    is_call = chain.is_call[valid]
+    notional = chain.open_interest[valid] * 100 * spot_price
+    gex = chain.gamma[valid] * notional * np.where(is_call, 1.0, -1.0)
+    dex = chain.delta[valid] * notional
+
+    profile = {
+        "total_gex": float(gex.sum()),
+        "total_dex": float(dex.sum()),
+        "zero_gamma": find_zero_gamma(chain, spot_price, years_to_expiry),
+        "call_wall": None,
+        "put_wall": None,
+        "buckets": [],
+        "strikes": [],
+    }
+    if len(strike) == 0:
+        return profile
+    profile["call_wall"], profile["put_wall"] = _walls(strike, is_call, gex)
+
+    # Aggregate contracts onto unique strikes in one bincount per column
+    strikes, idx = np.unique(strike, return_inverse=True)
+    n = len(strikes)
+    call_gex = np.bincount(idx, weights=np.where(is_call, gex, 0.0), minlength=n)
+    put_gex = np.bincount(idx, weights=np.where(is_call, 0.0, gex), minlength=n)
+    net_dex = np.bincount(idx, weights=dex, minlength=n)
+    net_gex = call_gex + put_gex
+
+    distance = strikes / spot_price - 1
+    bucket = np.digitize(distance, EXPOSURE_BUCKET_EDGES)
+    n_buckets = len(EXPOSURE_BUCKET_EDGES) + 1
+    bucket_gex = np.bincount(bucket, weights=net_gex, minlength=n_buckets)
+    bucket_dex = np.bincount(bucket, weights=net_dex, minlength=n_buckets)
+    profile["buckets"] = [
+        {"range": label, "gex": round(float(g)), "dex": round(float(d))}
+        for label, g, d in zip(_bucket_labels(EXPOSURE_BUCKET_EDGES), bucket_gex, bucket_dex)
+    ]
+
+    near = np.abs(distance) <= profile_pct
+    profile["strikes"] = [
+        {"strike": float(k), "call_gex": round(float(c)), "put_gex": round(float(p)),
+         "net_gex": round(float(g)), "net_dex": round(float(d))}
+        for k, c, p, g, d in zip(strikes[near], call_gex[near], put_gex[near], net_gex[near], net_dex[near])
+    ]
+    return profile
+
+def calculate_expiry_breakdown(chain, spot_price):
+    """Per-expiration GEX/DEX, walls and volume for a multi-expiry chain.
+
+    Each expiration is a view onto the shared chain arrays; returns one
+    JSON-serializable dict per expiration, front first.
+    """
+    chain = _as_chain(chain)
+    breakdown = []
+    for expiration, part in chain.by_expiration():
+        total_gex, total_dex = calculate_gex_dex(part, spot_price)
+        call_vol, put_vol = calculate_volume_totals(part)
+        entry = {"expiration": expiration, "contracts": len(part), "total_gex": round(total_gex),
+                 "total_dex": round(total_dex), "call_volume": call_vol, "put_volume": put_vol,
+                 "call_wall": None, "put_wall": None}
+        valid = _valid_exposure(part)
+        is_call = part.is_call[valid]
+        gex = part.gamma[valid] * part.open_interest[valid] * 100 * spot_price * np.where(is_call, 1.0, -1.0)
+        entry["call_wall"], entry["put_wall"] = _walls(part.strike[valid], is_call, gex)
+        breakdown.append(entry)
+    return breakdown
@@ -0,0 +1,78 @@
+import datetime
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from .scheduler import job_analyze_market, get_all_latest_analyses, OUTCOME_COMPLETED
+
+MAX_TRACKED_JOBS = 100
+
+# A single worker: analysis runs never overlap, and a trigger arriving while
+# one is queued or running joins it instead of starting another.
+analysis_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="analysis-job")
+jobs = OrderedDict()
+_jobs_lock = threading.Lock()
+_active_job_id = None
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+def _run_job(job_id):
+    global _active_job_id
+    with _jobs_lock:
+        job = jobs[job_id]
+        job["status"] = "running"
+        job["started_at"] = _now()
+
+    try:
+        outcome = job_analyze_market()
+        analyses = get_all_latest_analyses()
+        with _jobs_lock:
+            job["outcome"] = outcome
+            job["status"] = "succeeded" if outcome == OUTCOME_COMPLETED else "skipped" if outcome.startswith("skipped") else "failed"
+            # Skipped runs still report which (older) analyses are current
+            job["result"] = analyses
+    except Exception as e:
+        with _jobs_lock:
+            job["status"] = "failed"
+            job["error"] = str(e)
+    finally:
+        with _jobs_lock:
+            job["finished_at"] = _now()
+            if _active_job_id == job_id:
+                _active_job_id = None
+
+def submit_analysis():
+    """Queues an analysis run, or returns the one already queued/running.
+
+    Returns (job, coalesced).
+    """
+    global _active_job_id
+    with _jobs_lock:
+        if _active_job_id is not None:
+            return dict(jobs[_active_job_id]), True
+
+        job_id = uuid.uuid4().hex
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "outcome": None,
+            "submitted_at": _now(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        jobs[job_id] = job
+        while len(jobs) > MAX_TRACKED_JOBS:
+            jobs.popitem(last=False)
+        _active_job_id = job_id
+        snapshot = dict(job)
+
+    analysis_executor.submit(_run_job, job_id)
+    return snapshot, False
+
+def get_job(job_id):
+    with _jobs_lock:
+        job = jobs.get(job_id)
+        return dict(job) if job else None
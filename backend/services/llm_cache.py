@@ -0,0 +1,106 @@
+import hashlib
+import json
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+# A cached analysis is reused at most this long, even if nothing material moved
+LLM_CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE_SECONDS", "1800"))
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+# The last good analysis stands in for a failed generation only up to this age
+LLM_STALE_MAX_SECONDS = float(os.getenv("LLM_STALE_MAX_SECONDS", "3600"))
+
+# Quantization steps: inputs that stay inside the same buckets are treated as
+# unchanged and do not trigger a new generation.
+SPOT_BUCKET_PCT = float(os.getenv("LLM_CACHE_SPOT_PCT", "0.0025"))
+RSI_BUCKET = float(os.getenv("LLM_CACHE_RSI_STEP", "10"))
+VIX_BUCKET = float(os.getenv("LLM_CACHE_VIX_STEP", "1"))
+# GEX magnitude buckets per decade (2 = half-decades)
+GEX_BUCKETS_PER_DECADE = int(os.getenv("LLM_CACHE_GEX_STEPS", "2"))
+
+def _number(value):
+    return value if isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value) else None
+
+def _bucket(value, step):
+    value = _number(value)
+    return None if value is None else math.floor(value / step)
+
+def feature_vector(market_data):
+    """Quantized view of the inputs that materially change the analysis."""
+    spot = _number(market_data.get("spot_price"))
+    profile = market_data.get("gex_profile") or {}
+    gex = _number(profile.get("total_gex"))
+    zero_gamma = _number(market_data.get("zero_gamma"))
+
+    gex_bucket = None
+    if gex is not None:
+        magnitude = math.floor(math.log10(abs(gex)) * GEX_BUCKETS_PER_DECADE) if abs(gex) >= 1 else 0
+        gex_bucket = (1 if gex > 0 else -1 if gex < 0 else 0, magnitude)
+
+    return {
+        "symbol": market_data.get("symbol"),
+        # Log-spaced, so a bucket is the same relative move at any price level
+        "spot": math.floor(math.log(spot) / math.log1p(SPOT_BUCKET_PCT)) if spot else None,
+        "rsi": _bucket(market_data.get("rsi_5min"), RSI_BUCKET),
+        "trend": market_data.get("recent_trend_5min"),
+        "gex": gex_bucket,
+        "above_zero_gamma": spot > zero_gamma if spot is not None and zero_gamma is not None else None,
+        "vix": _bucket(market_data.get("vix_current"), VIX_BUCKET),
+    }
+
+def feature_key(market_data):
+    features = json.dumps(feature_vector(market_data), sort_keys=True, default=str)
+    return hashlib.sha1(features.encode()).hexdigest()
+
+class AnalysisCache:
+    """Generated analyses keyed by the hash of their quantized inputs.
+
+    get() returns a text generated for the same feature bucket within
+    max_age, so regeneration only happens when an input crosses a bucket
+    boundary or the entry ages out. The newest good text per symbol is also
+    kept regardless of key, as the fallback when generation fails, for up
+    to stale_max_age.
+    """
+
+    def __init__(self, max_age=LLM_CACHE_MAX_AGE, max_entries=LLM_CACHE_MAX_ENTRIES,
+                 stale_max_age=LLM_STALE_MAX_SECONDS):
+        self.max_age = max_age
+        self.max_entries = max_entries
+        self.stale_max_age = stale_max_age
+        self._entries = OrderedDict()  # key -> {"text", "structured", "generated_at", "created"}
+        self._last_good = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or time.time() - entry["created"] > self.max_age:
+                return None
+            self._entries.move_to_end(key)
+            return dict(entry)
+
+    def put(self, key, symbol, text, generated_at, structured=None):
+        entry = {"text": text, "structured": structured, "generated_at": generated_at, "created": time.time()}
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._last_good[symbol] = entry
+
+    def last_good(self, symbol):
+        with self._lock:
+            entry = self._last_good.get(symbol)
+            if entry is None or time.time() - entry["created"] > self.stale_max_age:
+                return None
+            return dict(entry)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_good.clear()
+
+cache = AnalysisCache()
@@ -0,0 +1,415 @@
+import abc
+import json
+import os
+import queue
+import threading
+import time
+from dotenv import load_dotenv
+from . import metrics, prompt_builder
+
+load_dotenv()
+
+GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
+# Ordered "kind:model" routes; the first is the primary, the rest are
+# fallbacks (and hedges). LLM_BACKEND=fake replaces them with the stub.
+LLM_PROVIDERS = os.getenv("LLM_PROVIDERS", "gemini:gemini-2.0-flash,gemini:gemini-2.0-flash-lite")
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini").lower()
+# Provider calls in flight across all symbols, hedges included
+LLM_CONCURRENCY = int(os.getenv("LLM_CONCURRENCY", "2"))
+# Abandoned calls (past the deadline or a losing hedge) that may still be
+# running without holding one of the LLM_CONCURRENCY slots; beyond this,
+# an abandoned call keeps its slot until it returns
+LLM_ABANDONED_MAX = int(os.getenv("LLM_ABANDONED_MAX", "2"))
+# Requests per minute per provider (0 = unlimited)
+LLM_RATE_PER_MINUTE = float(os.getenv("LLM_RATE_PER_MINUTE", "15"))
+# A provider that answered 429 is skipped for this long
+LLM_RATE_LIMIT_COOLDOWN = float(os.getenv("LLM_RATE_LIMIT_COOLDOWN_SECONDS", "60"))
+# Whole generation, first request to last chunk
+LLM_DEADLINE_SECONDS = float(os.getenv("LLM_DEADLINE_SECONDS", "60"))
+# Without a first token by then, the next provider is started in parallel (0 = never)
+LLM_HEDGE_AFTER_SECONDS = float(os.getenv("LLM_HEDGE_AFTER_SECONDS", "6"))
+LLM_MAX_OUTPUT_TOKENS = int(os.getenv("LLM_MAX_OUTPUT_TOKENS", "800"))
+LLM_PROBE_ON_STARTUP = os.getenv("LLM_PROBE_ON_STARTUP", "true").lower() in ("1", "true", "yes")
+
+class LLMError(Exception):
+    """Raised when the model cannot produce an analysis."""
+
+    def __init__(self, message, rate_limited=False):
+        super().__init__(message)
+        self.rate_limited = rate_limited
+
+class TokenBucket:
+    """Request rate limiter: rate_per_minute sustained, bursts up to burst."""
+
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60
+        self.capacity = burst or max(1.0, rate_per_minute / 6)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, timeout=0):
+        """Takes one token, waiting up to timeout seconds; False if none came."""
+        if self.rate <= 0:
+            return True
+        end = time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                wait = (1 - self.tokens) / self.rate
+            if now + wait > end:
+                return False
+            time.sleep(wait)
+
+class Provider(abc.ABC):
+    """A model endpoint the router can send prompts to.
+
+    Subclasses implement stream(prompt, json_output, timeout) yielding text
+    chunks (raising LLMError on failure) and may override probe(). timeout is
+    the time left before the router's deadline.
+    """
+
+    def __init__(self, name, rate_per_minute=LLM_RATE_PER_MINUTE):
+        self.name = name
+        self.bucket = TokenBucket(rate_per_minute)
+        self.cooldown_until = 0.0
+        # None until probed; the probe sets "available" and the model limits
+        self.capabilities = None
+
+    @property
+    def available(self):
+        return self.capabilities is None or self.capabilities.get("available", True)
+
+    def throttled(self):
+        return time.monotonic() < self.cooldown_until
+
+    def probe(self):
+        return {"available": True}
+
+    @abc.abstractmethod
+    def stream(self, prompt, json_output=False, timeout=LLM_DEADLINE_SECONDS):
+        pass
+
+_genai = None
+_genai_lock = threading.Lock()
+
+def load_genai():
+    """Imports and configures google.generativeai on first use."""
+    global _genai
+    with _genai_lock:
+        if _genai is None:
+            import google.generativeai as genai
+            if GOOGLE_API_KEY:
+                genai.configure(api_key=GOOGLE_API_KEY)
+            _genai = genai
+        return _genai
+
+class GeminiProvider(Provider):
+    def __init__(self, model_name='gemini-2.0-flash', **kwargs):
+        super().__init__(f"gemini:{model_name}", **kwargs)
+        self.model_name = model_name
+
+    def probe(self):
+        if not GOOGLE_API_KEY:
+            return {"available": False, "reason": "GOOGLE_API_KEY not set"}
+        genai = load_genai()
+        for m in genai.list_models():
+            if m.name.split("/")[-1] == self.model_name:
+                return {"available": 'generateContent' in m.supported_generation_methods,
+                        "input_token_limit": m.input_token_limit, "output_token_limit": m.output_token_limit,
+                        "json_output": not self.model_name.startswith(("gemini-1.0", "gemini-pro"))}
+        return {"available": False, "reason": "model not listed"}
+
+    def stream(self, prompt, json_output=False, timeout=LLM_DEADLINE_SECONDS):
+        if not GOOGLE_API_KEY:
+            raise LLMError("Google API Key not configured")
+
+        genai = load_genai()
+        capabilities = self.capabilities or {}
+        max_tokens = min(LLM_MAX_OUTPUT_TOKENS, capabilities.get("output_token_limit") or LLM_MAX_OUTPUT_TOKENS)
+        json_output = json_output and capabilities.get("json_output", True)
+        model = genai.GenerativeModel(self.model_name)
+        config = genai.GenerationConfig(max_output_tokens=max_tokens,
+                                        response_mime_type="application/json" if json_output else None)
+        chunk = None
+        try:
+            for chunk in model.generate_content(prompt, stream=True, generation_config=config,
+                                                request_options={"timeout": timeout}):
+                try:
+                    text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. safety metadata)
+                    continue
+                if text:
+                    yield text
+        except Exception as e:
+            error_msg = str(e)
+            raise LLMError(error_msg, rate_limited="429" in error_msg) from e
+
+        # The last streamed chunk carries the usage totals for the request
+        usage = getattr(chunk, "usage_metadata", None)
+        if usage is not None:
+            metrics.llm_tokens_total.inc(getattr(usage, "prompt_token_count", 0) or 0, kind="prompt")
+            metrics.llm_tokens_total.inc(getattr(usage, "candidates_token_count", 0) or 0, kind="completion")
+
+class StubProvider(Provider):
+    """Deterministic offline provider that streams a canned reply in small chunks.
+
+    The canned JSON reply centers its range on the spot price in the prompt.
+    first_token_delay and error simulate a slow or failing model.
+    """
+
+    def __init__(self, text=None, chunk_size=40, delay=0.0, first_token_delay=0.0, error=None,
+                 name="stub", rate_per_minute=0):
+        super().__init__(name, rate_per_minute)
+        self.text = text
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.first_token_delay = first_token_delay
+        self.error = error
+
+    def stream(self, prompt, json_output=False, timeout=LLM_DEADLINE_SECONDS):
+        if self.first_token_delay:
+            time.sleep(min(self.first_token_delay, timeout))
+            if self.first_token_delay > timeout:
+                raise LLMError(f"{self.name}: timed out")
+        if self.error is not None:
+            raise self.error
+        spot = prompt_builder.prompt_spot(prompt)
+        if self.text:
+            text = self.text
+        elif json_output and spot:
+            text = json.dumps({
+                "summary": f"Fake backend reply, prompt length {len(prompt)} chars.",
+                "sentiment": "Neutral", "range": [round(spot * 0.995), round(spot * 1.005)], "target": round(spot),
+                "strategy": "Iron Condor around the zero gamma level",
+                "exits": {"profit_target": "50% of credit", "stop_loss": "2x credit", "time_exit": "Close by 3:30 PM"},
+                "levels": {"support": [round(spot * 0.995)], "resistance": [round(spot * 1.005)]},
+            })
+        else:
+            text = (
+                "Market Sentiment: Neutral\n"
+                "Predicted Closing Range: N/A\n"
+                "Suggested Strategy: Iron Condor around the zero gamma level.\n"
+                f"(fake backend, prompt length {len(prompt)} chars)"
+            )
+        for i in range(0, len(text), self.chunk_size):
+            if self.delay:
+                time.sleep(self.delay)
+            yield text[i:i + self.chunk_size]
+        # Rough 4-characters-per-token estimate so offline runs exercise the metric
+        metrics.llm_tokens_total.inc(len(prompt) // 4, kind="prompt")
+        metrics.llm_tokens_total.inc(len(text) // 4, kind="completion")
+
+PROVIDER_KINDS = {"gemini": GeminiProvider, "stub": lambda model=None: StubProvider()}
+
+def providers_from_env():
+    if LLM_BACKEND == "fake":
+        return [StubProvider()]
+    providers = []
+    for route in filter(None, (r.strip() for r in LLM_PROVIDERS.split(","))):
+        kind, _, model = route.partition(":")
+        if kind not in PROVIDER_KINDS:
+            raise ValueError(f"Unknown LLM provider: {kind}")
+        providers.append(PROVIDER_KINDS[kind](model) if model else PROVIDER_KINDS[kind]())
+    return providers
+
+class _Attempt:
+    """One provider call, streamed into the router's queue from its own thread.
+
+    The call holds one router slot until its thread exits. When the router
+    abandons it, the slot is swapped for one of the abandoned allowance if
+    any is free, so a hung call doesn't block new ones; either way every
+    running call holds exactly one permit.
+    """
+
+    def __init__(self, provider, prompt, json_output, out, deadline, slots, abandoned):
+        self.provider = provider
+        self.cancelled = threading.Event()
+        self.started = time.perf_counter()
+        self._slots = slots
+        self._abandoned = abandoned
+        self._held = slots
+        self._permit_lock = threading.Lock()
+        self._args = (prompt, json_output, out, deadline)
+        threading.Thread(target=self._run, daemon=True, name=f"llm-{provider.name}").start()
+
+    def abandon(self):
+        self.cancelled.set()
+        with self._permit_lock:
+            if self._held is self._slots and self._abandoned.acquire(blocking=False):
+                self._held = self._abandoned
+                self._slots.release()
+
+    def _release(self):
+        with self._permit_lock:
+            held, self._held = self._held, None
+        if held is not None:
+            held.release()
+
+    def _run(self):
+        prompt, json_output, out, deadline = self._args
+        try:
+            for chunk in self.provider.stream(prompt, json_output=json_output,
+                                              timeout=max(0.0, deadline - time.monotonic())):
+                if self.cancelled.is_set():
+                    return
+                out.put((self, "chunk", chunk))
+            out.put((self, "done", None))
+        except LLMError as e:
+            out.put((self, "error", e))
+        except Exception as e:
+            out.put((self, "error", LLMError(str(e))))
+        finally:
+            self._release()
+
+class LLMRouter:
+    """Routes prompts over an ordered list of providers.
+
+    Calls are capped by a global semaphore (concurrency) and by each
+    provider's token bucket. A provider that is rate limited (bucket empty
+    or a recent 429) is skipped in favor of the next one; only the last
+    candidate waits for its bucket. If the running call has produced no
+    token after hedge_after seconds, the next provider is started as well
+    and whichever answers first is streamed, the other abandoned. Failures
+    before the first token fall through to the next provider. The whole
+    generation is bounded by deadline. Abandoned calls still running count
+    against concurrency unless one of abandoned_max extra permits is free,
+    so at most concurrency + abandoned_max calls are ever in flight.
+    """
+
+    def __init__(self, providers, concurrency=LLM_CONCURRENCY, deadline=LLM_DEADLINE_SECONDS,
+                 hedge_after=LLM_HEDGE_AFTER_SECONDS, abandoned_max=LLM_ABANDONED_MAX):
+        self.providers = list(providers)
+        self.deadline = deadline
+        self.hedge_after = hedge_after
+        self._slots = threading.BoundedSemaphore(concurrency)
+        self._abandoned = threading.BoundedSemaphore(abandoned_max)
+
+    def set_providers(self, providers):
+        self.providers = list(providers)
+
+    def probe(self):
+        """Checks every provider (model listed, limits) and records the result
+        as its capabilities; unavailable providers are skipped by routing."""
+        for provider in self.providers:
+            try:
+                provider.capabilities = provider.probe()
+            except Exception as e:
+                # Unknown rather than unavailable: a flaky probe shouldn't disable the model
+                provider.capabilities = None
+                print(f"LLM probe failed for {provider.name}: {e}")
+                continue
+            state = "available" if provider.available else f"unavailable ({provider.capabilities.get('reason', 'not supported')})"
+            print(f"LLM provider {provider.name}: {state}")
+        return self.status()
+
+    def status(self):
+        return [{"name": p.name, "available": p.available, "throttled": p.throttled(),
+                 "capabilities": p.capabilities} for p in self.providers]
+
+    def _launch(self, call, pending, running, errors, deadline, hedge):
+        """Starts the next usable provider from pending; False if none."""
+        while pending:
+            provider = pending[0]
+            last = len(pending) == 1 and not running
+            if provider.throttled() or not provider.bucket.acquire(max(0.0, deadline - time.monotonic()) if last and not hedge else 0):
+                pending.pop(0)
+                metrics.llm_requests_total.inc(provider=provider.name, outcome="throttled")
+                errors.append(LLMError(f"{provider.name}: rate limited", rate_limited=True))
+                continue
+            if not self._slots.acquire(timeout=0 if hedge else max(0.0, deadline - time.monotonic())):
+                # Token already spent; the call simply doesn't happen
+                if hedge:
+                    return False
+                errors.append(LLMError("no free LLM slot before the deadline"))
+                return False
+            pending.pop(0)
+            running.append(_Attempt(provider, *call, deadline, self._slots, self._abandoned))
+            return True
+        return False
+
+    def stream(self, prompt, json_output=False):
+        """Yields the reply chunk by chunk from the first provider to answer.
+
+        Raises LLMError (rate_limited if any provider was throttled) when no
+        provider produced a reply in time.
+        """
+        deadline = time.monotonic() + self.deadline
+        out = queue.Queue()
+        call = (prompt, json_output, out)
+        pending = [p for p in self.providers if p.available] or list(self.providers)
+        running, errors = [], []
+        winner = None
+        hedge_at = time.monotonic() + self.hedge_after if self.hedge_after > 0 else None
+
+        try:
+            if not self._launch(call, pending, running, errors, deadline, hedge=False):
+                raise _combined(errors)
+            while True:
+                now = time.monotonic()
+                if now >= deadline:
+                    for attempt in running:
+                        metrics.llm_requests_total.inc(provider=attempt.provider.name, outcome="deadline")
+                    raise LLMError(f"LLM deadline of {self.deadline:g}s exceeded")
+                timeout = deadline - now
+                if winner is None and hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+                try:
+                    attempt, kind, payload = out.get(timeout=timeout)
+                except queue.Empty:
+                    if winner is None and hedge_at is not None and time.monotonic() >= hedge_at:
+                        hedge_at = None
+                        if pending and self._launch(call, pending, running, errors, deadline, hedge=True):
+                            metrics.llm_hedges_total.inc()
+                            print(f"LLM slow to respond, hedging with {running[-1].provider.name}")
+                    continue
+                if winner is not None and attempt is not winner:
+                    continue
+
+                if kind == "chunk":
+                    if winner is None:
+                        winner = attempt
+                        for other in running:
+                            if other is not attempt:
+                                other.abandon()
+                                metrics.llm_requests_total.inc(provider=other.provider.name, outcome="abandoned")
+                    yield payload
+                elif kind == "done":
+                    running.remove(attempt)
+                    metrics.llm_requests_total.inc(provider=attempt.provider.name, outcome="ok")
+                    metrics.llm_request_seconds.observe(time.perf_counter() - attempt.started, provider=attempt.provider.name)
+                    return
+                else:
+                    running.remove(attempt)
+                    provider = attempt.provider
+                    if payload.rate_limited:
+                        provider.cooldown_until = time.monotonic() + LLM_RATE_LIMIT_COOLDOWN
+                    metrics.llm_requests_total.inc(provider=provider.name,
+                                                   outcome="rate_limited" if payload.rate_limited else "error")
+                    # Part of the reply is already out; another model can't continue it
+                    if attempt is winner:
+                        raise payload
+                    errors.append(LLMError(f"{provider.name}: {payload}", rate_limited=payload.rate_limited))
+                    if not running and not self._launch(call, pending, running, errors, deadline, hedge=False):
+                        raise _combined(errors)
+        finally:
+            for attempt in running:
+                attempt.abandon()
+
+def _combined(errors):
+    if not errors:
+        return LLMError("No LLM provider configured")
+    return LLMError("; ".join(str(e) for e in errors), rate_limited=any(e.rate_limited for e in errors))
+
+router = LLMRouter(providers_from_env())
+
+def start_probe():
+    """Probes the providers in the background (model availability and limits)."""
+    if LLM_PROBE_ON_STARTUP:
+        threading.Thread(target=router.probe, daemon=True, name="llm-probe").start()
@@ -0,0 +1,132 @@
+import datetime
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from . import tradier_service
+
+QUOTE_TTL = float(os.getenv("CACHE_TTL_QUOTES", "1"))
+CHAIN_TTL = float(os.getenv("CACHE_TTL_CHAIN", "10"))
+MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", "256"))
+# Seconds past a bar boundary before the new bar is expected from the API
+BAR_GRACE_SECONDS = 2
+
+class TTLCache:
+    """LRU cache with per-entry expiry and single-flight loading.
+
+    Concurrent callers asking for the same missing key share one loader
+    call: the first caller runs it, the others wait on its Future. Errors
+    are propagated to every waiter and never cached. Cached values are
+    shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._stats = {}
+
+    def _count(self, key, field):
+        stats = self._stats.setdefault(key[0], {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0, "evictions": 0})
+        stats[field] += 1
+
+    def get_or_load(self, key, ttl, loader):
+        """ttl is seconds, or a callable returning the absolute expiry time."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.time():
+                self._entries.move_to_end(key)
+                self._count(key, "hits")
+                return entry[1]
+
+            future = self._inflight.get(key)
+            if future is not None:
+                self._count(key, "coalesced")
+                leader = False
+            else:
+                future = self._inflight[key] = Future()
+                self._count(key, "misses")
+                leader = True
+
+        if not leader:
+            return future.result()
+
+        try:
+            value = loader()
+        except BaseException as e:
+            with self._lock:
+                self._count(key, "errors")
+                del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        expires_at = ttl() if callable(ttl) else time.time() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self._count(evicted, "evictions")
+            del self._inflight[key]
+        future.set_result(value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            endpoints = {name: dict(counts) for name, counts in self._stats.items()}
+            size = len(self._entries)
+        for counts in endpoints.values():
+            lookups = counts["hits"] + counts["misses"] + counts["coalesced"]
+            counts["hit_ratio"] = round((counts["hits"] + counts["coalesced"]) / lookups, 3) if lookups else None
+        return {"size": size, "max_entries": self.max_entries, "endpoints": endpoints}
+
+cache = TTLCache()
+
+def _interval_seconds(interval):
+    match = re.fullmatch(r"(\d+)min", interval or "")
+    return int(match.group(1)) * 60 if match else 60
+
+def _next_bar_boundary(interval):
+    step = _interval_seconds(interval)
+    return lambda: (time.time() // step + 1) * step + BAR_GRACE_SECONDS
+
+def get_quote(symbol: str):
+    return cache.get_or_load(("quotes", symbol), QUOTE_TTL, lambda: tradier_service.get_quote(symbol))
+
+def get_spot_price(symbol: str) -> float:
+    # Shares the quote entry, so spot and a quote for the same symbol cost one request
+    quote = get_quote(symbol)
+    if not quote:
+        raise ValueError("No quote data returned")
+    last = quote.get("last")
+    if last is not None:
+        return float(last)
+    raise ValueError("Could not determine price")
+
+def fetch_option_chain(symbol: str, expiration: str):
+    return cache.get_or_load(("chains", symbol, expiration), CHAIN_TTL,
+                             lambda: tradier_service.fetch_option_chain(symbol, expiration))
+
+def _next_market_midnight():
+    from .pricing import MARKET_TZ
+    tomorrow = datetime.datetime.now(MARKET_TZ).date() + datetime.timedelta(days=1)
+    return datetime.datetime.combine(tomorrow, datetime.time(0, 0), tzinfo=MARKET_TZ).timestamp()
+
+def get_option_expirations(symbol: str):
+    # Listings only change overnight
+    return cache.get_or_load(("expirations", symbol), _next_market_midnight,
+                             lambda: tradier_service.get_option_expirations(symbol))
+
+def get_historical_candles(symbol: str, interval: str = "1min", start_date: str = None):
+    return cache.get_or_load(("candles", symbol, interval, start_date), _next_bar_boundary(interval),
+                             lambda: tradier_service.get_historical_candles(symbol, interval=interval, start_date=start_date))
+
+def get_cache_stats():
+    return cache.stats()
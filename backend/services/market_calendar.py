@@ -0,0 +1,121 @@
+import datetime
+import functools
+from .pricing import MARKET_TZ
+
+REGULAR_OPEN = datetime.time(9, 30)
+REGULAR_CLOSE = datetime.time(16, 0)
+EARLY_CLOSE = datetime.time(13, 0)
+
+def _easter(year):
+    # Anonymous Gregorian algorithm
+    a = year % 19
+    b, c = divmod(year, 100)
+    d, e = divmod(b, 4)
+    f = (b + 8) // 25
+    g = (b - f + 1) // 3
+    h = (19 * a + b - d - g + 15) % 30
+    i, k = divmod(c, 4)
+    l = (32 + 2 * e + 2 * i - h - k) % 7
+    m = (a + 11 * h + 22 * l) // 451
+    month, day = divmod(h + l - 7 * m + 114, 31)
+    return datetime.date(year, month, day + 1)
+
+def _nth_weekday(year, month, weekday, n):
+    """n-th (1-based) weekday of the month; n=-1 is the last one."""
+    if n > 0:
+        first = datetime.date(year, month, 1)
+        return first + datetime.timedelta(days=(weekday - first.weekday()) % 7 + 7 * (n - 1))
+    last = datetime.date(year + month // 12, month % 12 + 1, 1) - datetime.timedelta(days=1)
+    return last - datetime.timedelta(days=(last.weekday() - weekday) % 7)
+
+def _observed(day):
+    if day.weekday() == 5:
+        return day - datetime.timedelta(days=1)
+    if day.weekday() == 6:
+        return day + datetime.timedelta(days=1)
+    return day
+
+@functools.lru_cache(maxsize=None)
+def nyse_holidays(year):
+    """Full-day NYSE closures for the year (standard rules; one-off closures
+    such as national days of mourning are not included)."""
+    holidays = {
+        _nth_weekday(year, 1, 0, 3),                    # Martin Luther King Jr. Day
+        _nth_weekday(year, 2, 0, 3),                    # Washington's Birthday
+        _easter(year) - datetime.timedelta(days=2),     # Good Friday
+        _nth_weekday(year, 5, 0, -1),                   # Memorial Day
+        _observed(datetime.date(year, 7, 4)),           # Independence Day
+        _nth_weekday(year, 9, 0, 1),                    # Labor Day
+        _nth_weekday(year, 11, 3, 4),                   # Thanksgiving
+        _observed(datetime.date(year, 12, 25)),         # Christmas
+    }
+    # New Year's Day on a Saturday is not observed on the prior Friday
+    new_year = datetime.date(year, 1, 1)
+    if new_year.weekday() != 5:
+        holidays.add(_observed(new_year))
+    if year >= 2022:
+        holidays.add(_observed(datetime.date(year, 6, 19)))  # Juneteenth
+    return frozenset(holidays)
+
+@functools.lru_cache(maxsize=None)
+def early_closes(year):
+    """Sessions that close at 1:00 PM ET."""
+    days = {
+        _nth_weekday(year, 11, 3, 4) + datetime.timedelta(days=1),  # Day after Thanksgiving
+        datetime.date(year, 12, 24),                                # Christmas Eve
+        datetime.date(year, 7, 3),                                  # Day before Independence Day
+    }
+    return frozenset(d for d in days if is_trading_day(d))
+
+def is_trading_day(day):
+    return day.weekday() < 5 and day not in nyse_holidays(day.year)
+
+def session_hours(day):
+    """(open, close) as ET datetimes, or None if the market is closed that day."""
+    if not is_trading_day(day):
+        return None
+    close = EARLY_CLOSE if day in early_closes(day.year) else REGULAR_CLOSE
+    return (datetime.datetime.combine(day, REGULAR_OPEN, tzinfo=MARKET_TZ),
+            datetime.datetime.combine(day, close, tzinfo=MARKET_TZ))
+
+def now_et():
+    return datetime.datetime.now(MARKET_TZ)
+
+def session_date(now=None):
+    """Today's date in New York, which names the 0DTE expiration."""
+    return (now or now_et()).astimezone(MARKET_TZ).date()
+
+def next_open(now=None):
+    """Start of the next regular session, or now if one is in progress."""
+    now = (now or now_et()).astimezone(MARKET_TZ)
+    day = now.date()
+    while True:
+        hours = session_hours(day)
+        if hours and now < hours[1]:
+            return max(hours[0], now)
+        day += datetime.timedelta(days=1)
+
+EXPIRATION_KINDS = ("0dte", "1dte", "weekly")
+
+def select_expirations(available, today, kinds=("0dte",)):
+    """Picks expirations ("YYYY-MM-DD") out of the listed ones.
+
+    "0dte" is the nearest expiration on or after today (today's when one is
+    listed), "1dte" the one after it and "weekly" the last expiration of
+    the front expiration's week (normally its Friday). Returns them sorted
+    and de-duplicated.
+    """
+    today = today if isinstance(today, datetime.date) else datetime.date.fromisoformat(today)
+    upcoming = sorted(d for d in (datetime.date.fromisoformat(s) for s in available) if d >= today)
+    if not upcoming:
+        return []
+    picked = set()
+    for kind in kinds:
+        if kind == "0dte":
+            picked.add(upcoming[0])
+        elif kind == "1dte" and len(upcoming) > 1:
+            picked.add(upcoming[1])
+        elif kind == "weekly":
+            friday = upcoming[0] + datetime.timedelta(days=(4 - upcoming[0].weekday()) % 7)
+            picked.add(max(d for d in upcoming if d <= friday))
+    return [d.isoformat() for d in sorted(picked)]
@@ -0,0 +1,191 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import os
+import threading
+import time
+
+# Structured JSON log lines for pipeline events (METRICS_JSON_LOGS=false to silence)
+JSON_LOGS_ENABLED = os.getenv("METRICS_JSON_LOGS", "true").lower() in ("1", "true", "yes")
+
+# Seconds; covers everything from a cached quote to a slow LLM generation
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+SIZE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 5e5, 1e6, 5e6)
+
+# Correlation ID of the analysis run the current thread is working on
+current_run_id = contextvars.ContextVar("run_id", default=None)
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = sorted(self._values.items())
+            lines.extend(self._render_items(items))
+        return lines
+
+    def _render_items(self, items):
+        return [f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}" for key, value in items]
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry["counts"][i] += 1
+                    break
+            entry["sum"] += value
+            entry["count"] += 1
+
+    def _render_items(self, items):
+        lines = []
+        for key, entry in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, entry["counts"]):
+                cumulative += count
+                labels = _format_labels(self.label_names, key, [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.label_names, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(entry['sum'])}")
+            lines.append(f"{self.name}_count{labels} {entry['count']}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+registry = Registry()
+
+stage_seconds = registry.register(Histogram(
+    "zerodte_stage_duration_seconds", "Duration of each analysis pipeline stage.", ("stage", "symbol")))
+cycles_total = registry.register(Counter(
+    "zerodte_cycles_total", "Analysis cycles by outcome (completed, skipped_paused, skipped_cooldown, ...).", ("outcome",)))
+symbol_outcomes_total = registry.register(Counter(
+    "zerodte_symbol_outcomes_total", "Per-symbol pipeline outcomes.", ("symbol", "outcome")))
+fetch_errors_total = registry.register(Counter(
+    "zerodte_fetch_errors_total", "Market data inputs that failed or timed out in a cycle.", ("symbol", "input")))
+tradier_requests_total = registry.register(Counter(
+    "zerodte_tradier_requests_total", "Tradier HTTP responses by endpoint and status code.", ("path", "status")))
+tradier_errors_total = registry.register(Counter(
+    "zerodte_tradier_errors_total", "Tradier connection errors and timeouts.", ("path",)))
+tradier_rate_limited_total = registry.register(Counter(
+    "zerodte_tradier_rate_limited_total", "Tradier 429 responses.", ("path",)))
+tradier_request_seconds = registry.register(Histogram(
+    "zerodte_tradier_request_duration_seconds", "Tradier request latency (one attempt).", ("path",)))
+tradier_response_bytes = registry.register(Histogram(
+    "zerodte_tradier_response_bytes", "Tradier response body size.", ("path",), buckets=BYTES_BUCKETS))
+payload_items = registry.register(Histogram(
+    "zerodte_payload_items", "Items fetched per cycle (option contracts, candles).", ("symbol", "kind"), buckets=SIZE_BUCKETS))
+llm_tokens_total = registry.register(Counter(
+    "zerodte_llm_tokens_total", "LLM tokens used (prompt/completion).", ("kind",)))
+llm_errors_total = registry.register(Counter(
+    "zerodte_llm_errors_total", "Failed LLM generations.", ("rate_limited",)))
+llm_requests_total = registry.register(Counter(
+    "zerodte_llm_requests_total", "LLM provider calls by outcome (ok, error, rate_limited, throttled, abandoned, deadline).",
+    ("provider", "outcome")))
+llm_request_seconds = registry.register(Histogram(
+    "zerodte_llm_request_duration_seconds", "Duration of successful LLM provider calls.", ("provider",)))
+llm_hedges_total = registry.register(Counter(
+    "zerodte_llm_hedges_total", "Hedge requests started because the provider was slow to answer."))
+llm_prompt_tokens = registry.register(Histogram(
+    "zerodte_llm_prompt_tokens", "Estimated prompt size after budget trimming.", (), buckets=SIZE_BUCKETS))
+llm_output_total = registry.register(Counter(
+    "zerodte_llm_output_total", "Structured replies by validation result (valid, invalid).", ("result",)))
+llm_cache_total = registry.register(Counter(
+    "zerodte_llm_cache_total", "Analysis cache lookups (hit, miss, stale fallback).", ("result",)))
+signal_latency_seconds = registry.register(Histogram(
+    "zerodte_signal_latency_seconds", "Time from market data fetch to a finished analysis.", ("symbol",)))
+last_signal_timestamp = registry.register(Gauge(
+    "zerodte_last_signal_timestamp_seconds", "Unix time of the latest finished analysis.", ("symbol",)))
+
+def log_event(event, **fields):
+    """Prints one JSON log line tagged with the current run ID."""
+    if not JSON_LOGS_ENABLED:
+        return
+    record = {"ts": datetime.datetime.now(datetime.timezone.utc).isoformat(), "event": event}
+    run_id = current_run_id.get()
+    if run_id:
+        record["run_id"] = run_id
+    record.update(fields)
+    # One write per line so lines from concurrent workers don't interleave
+    print(json.dumps(record, default=str) + "\n", end="", flush=True)
+
+@contextlib.contextmanager
+def span(stage, symbol="", **fields):
+    """Times a pipeline stage into zerodte_stage_duration_seconds and logs it."""
+    start = time.perf_counter()
+    status = "ok"
+    try:
+        yield
+    except BaseException:
+        status = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        stage_seconds.observe(elapsed, stage=stage, symbol=symbol)
+        log_event("stage", stage=stage, symbol=symbol, status=status, duration_ms=round(elapsed * 1000, 1), **fields)
+
+def render_metrics():
+    return registry.render()
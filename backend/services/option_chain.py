@@ -0,0 +1,113 @@
+import numpy as np
+from .pricing import time_to_expiry
+
+# Column order of the float matrix built while parsing a Tradier chain
+_FIELDS = ("strike", "open_interest", "volume", "bid", "ask", "iv", "gamma", "delta")
+_NO_GREEKS = {}
+
+class OptionChain:
+    """Columnar view of a Tradier option chain.
+
+    The list of option dicts is walked once in from_tradier(); afterwards
+    every aggregation works on the NumPy columns. Missing numeric fields
+    (including absent greeks) are stored as NaN.
+
+    A chain may span several expirations: expiry holds each row's index
+    into expirations, and rows of one expiration are contiguous, so
+    by_expiration() can hand out views without copying the columns.
+    """
+
+    __slots__ = ("symbols", "strike", "is_call", "open_interest", "volume",
+                 "bid", "ask", "iv", "gamma", "delta", "vanna", "charm", "expiry", "expirations")
+
+    def __init__(self, symbols, strike, is_call, open_interest, volume, bid, ask, iv, gamma, delta,
+                 vanna=None, charm=None, expiry=None, expirations=None):
+        self.symbols = symbols
+        self.strike = strike
+        self.is_call = is_call
+        self.open_interest = open_interest
+        self.volume = volume
+        self.bid = bid
+        self.ask = ask
+        self.iv = iv
+        self.gamma = gamma
+        self.delta = delta
+        # Only computed locally (vol_surface.fill_chain_greeks); None until then
+        self.vanna = vanna
+        self.charm = charm
+        self.expiry = expiry if expiry is not None else np.zeros(len(strike), dtype=np.int32)
+        self.expirations = list(expirations) if expirations else [None]
+
+    @classmethod
+    def from_tradier(cls, options, expiration=None):
+        return cls.from_expirations([(expiration, options)])
+
+    @classmethod
+    def from_expirations(cls, chains):
+        """One chain from [(expiration, options), ...], parsed in a single pass."""
+        expirations = [expiration for expiration, _ in chains]
+        if not any(options for _, options in chains):
+            empty = np.empty(0, dtype=np.float64)
+            return cls([], empty, np.empty(0, dtype=bool), empty, empty, empty, empty, empty, empty, empty,
+                       expirations=expirations)
+
+        rows = []
+        symbols = []
+        is_call = []
+        expiry = []
+        for i, (_, options) in enumerate(chains):
+            expiry.extend([i] * len(options or ()))
+        for opt in (opt for _, options in chains for opt in options or ()):
+            greeks = opt.get("greeks") or _NO_GREEKS
+            rows.append((
+                opt.get("strike"),
+                opt.get("open_interest"),
+                opt.get("volume"),
+                opt.get("bid"),
+                opt.get("ask"),
+                greeks.get("mid_iv") or greeks.get("smv_vol"),
+                greeks.get("gamma"),
+                greeks.get("delta"),
+            ))
+            symbols.append(opt.get("symbol"))
+            is_call.append(opt.get("option_type") == "call")
+
+        # None becomes NaN when converted with a float dtype
+        matrix = np.array(rows, dtype=np.float64)
+        columns = {name: np.ascontiguousarray(matrix[:, i]) for i, name in enumerate(_FIELDS)}
+        return cls(symbols=symbols, is_call=np.array(is_call, dtype=bool),
+                   expiry=np.array(expiry, dtype=np.int32), expirations=expirations, **columns)
+
+    def by_expiration(self):
+        """[(expiration, chain), ...] where each chain is a view sharing this
+        chain's arrays."""
+        bounds = np.searchsorted(self.expiry, np.arange(len(self.expirations) + 1))
+        views = []
+        for i, expiration in enumerate(self.expirations):
+            rows = slice(bounds[i], bounds[i + 1])
+            views.append((expiration, OptionChain(
+                self.symbols[rows], self.strike[rows], self.is_call[rows], self.open_interest[rows],
+                self.volume[rows], self.bid[rows], self.ask[rows], self.iv[rows], self.gamma[rows],
+                self.delta[rows],
+                vanna=self.vanna[rows] if self.vanna is not None else None,
+                charm=self.charm[rows] if self.charm is not None else None,
+                expiry=np.zeros(bounds[i + 1] - bounds[i], dtype=np.int32), expirations=[expiration])))
+        return views
+
+    def years_to_expiry(self, now=None, default=None):
+        """Time to expiry in years: a scalar for a single expiration, else one
+        value per row. Rows without a known expiration use default."""
+        years = [time_to_expiry(expiration or default, now=now) for expiration in self.expirations]
+        if len(years) == 1:
+            return years[0]
+        return np.array(years)[self.expiry]
+
+    def __len__(self):
+        return len(self.strike)
+
+    @property
+    def is_put(self):
+        return ~self.is_call
+
+    def option_types(self):
+        return np.where(self.is_call, "call", "put")
@@ -0,0 +1,105 @@
+from .indicators import calculate_volume_totals, top_open_interest, calculate_exposure_profile, calculate_expiry_breakdown
+from .vol_surface import fill_chain_greeks, smile_summary
+
+def build_market_data(symbol, spot, chain, ind, vix_quote, years_to_expiry):
+    """Turns one cycle's fetched inputs into the market_data dict for the
+    prompt and the API.
+
+    chain is an OptionChain, ind the IndicatorEngine values (or None) and
+    vix_quote the raw Tradier quote (or None). years_to_expiry is a scalar,
+    or one value per contract for a multi-expiry chain. Pure computation
+    with no I/O, shared by the live scheduler and the replay engine.
+    Missing IV and greeks are filled into chain in place before any
+    exposure is computed.
+    """
+    # 0. Local IV/greeks for contracts Tradier sent without them
+    greeks_filled = fill_chain_greeks(chain, spot, years_to_expiry)
+    vol = smile_summary(chain, spot)
+
+    # 1. Basic Volume Aggregation
+    call_vol, put_vol = calculate_volume_totals(chain)
+    
+    # 2. Top OI
+    top_oi = top_open_interest(chain, 5)
+    top_oi_strikes = [f"{strike} ({option_type})" for strike, option_type in top_oi]
+
+    # 3. Gamma & Delta Exposure (totals, per-strike profile, flip and walls)
+    gex_profile = calculate_exposure_profile(chain, spot, years_to_expiry)
+    total_gex = gex_profile["total_gex"]
+    total_dex = gex_profile["total_dex"]
+    expiry_breakdown = calculate_expiry_breakdown(chain, spot)
+
+    # 4. Technical Analysis (5min candles)
+    rsi_val = "N/A"
+    macd_val = "N/A"
+    macd_values = None
+    recent_trend = "N/A"
+    vwap_val = "N/A"
+    atr_val = "N/A"
+
+    if ind is not None:
+        if ind["rsi"] is not None:
+            rsi_val = round(ind["rsi"], 2)
+        if ind["macd"] is not None:
+            macd_data = ind["macd"]
+            macd_val = f"MACD: {macd_data['macd']:.2f}, Signal: {macd_data['signal']:.2f}, Hist: {macd_data['histogram']:.2f}"
+            macd_values = {k: round(macd_data[k], 4) for k in ("macd", "signal", "histogram")}
+        if ind["trend"] is not None:
+            recent_trend = ind["trend"]
+        if ind["vwap"] is not None:
+            vwap_val = round(ind["vwap"], 2)
+        if ind["atr"] is not None:
+            atr_val = round(ind["atr"], 2)
+
+    # 5. VIX Data
+    vix_current = "N/A"
+    vix_trend = "N/A"
+    vix_change = None
+    try:
+        if vix_quote:
+            vix_current = vix_quote.get("last")
+            change = vix_change = vix_quote.get("change", 0)
+            if change > 0:
+                vix_trend = f"Up {change}"
+            elif change < 0:
+                vix_trend = f"Down {change}"
+            else:
+                vix_trend = "Flat"
+    except Exception as e:
+        print(f"Error reading VIX quote: {e}")
+
+    market_data = {
+        "symbol": symbol,
+        "spot_price": spot,
+        "call_volume": call_vol,
+        "put_volume": put_vol,
+        "top_oi_strikes": top_oi_strikes,
+        "top_oi": top_oi,
+        "vix_current": vix_current,
+        "vix_trend": vix_trend,
+        "vix_change": vix_change,
+        "total_gex": f"${total_gex:,.0f}",
+        "total_dex": f"${total_dex:,.0f}",
+        "zero_gamma": gex_profile["zero_gamma"],
+        "call_wall": gex_profile["call_wall"],
+        "put_wall": gex_profile["put_wall"],
+        "gex_profile": gex_profile,
+        "expirations": chain.expirations,
+        "expiry_breakdown": expiry_breakdown,
+        "atm_iv": vol["atm_iv"],
+        "skew_25d": vol["skew_25d"],
+        "butterfly_25d": vol["butterfly_25d"],
+        "put_25d_iv": vol["put_25d_iv"],
+        "call_25d_iv": vol["call_25d_iv"],
+        "total_vanna": vol["total_vanna"],
+        "total_charm": vol["total_charm"],
+        "iv_rank": None,
+        "greeks_filled": greeks_filled,
+        "rsi_5min": rsi_val,
+        "macd_5min": macd_val,
+        "macd_values": macd_values,
+        "recent_trend_5min": recent_trend,
+        "vwap": vwap_val,
+        "atr_5min": atr_val
+    }
+    return market_data
@@ -0,0 +1,124 @@
+import datetime
+from zoneinfo import ZoneInfo
+import numpy as np
+
+MARKET_TZ = ZoneInfo("America/New_York")
+SECONDS_PER_YEAR = 365.0 * 24 * 3600
+# Floor on time to expiry so gamma stays finite into the close
+MIN_TIME_TO_EXPIRY = 5 * 60 / SECONDS_PER_YEAR
+RISK_FREE_RATE = 0.0
+
+_INV_SQRT_2PI = 1.0 / np.sqrt(2.0 * np.pi)
+
+def norm_pdf(x):
+    return _INV_SQRT_2PI * np.exp(-0.5 * x * x)
+
+def time_to_expiry(expiration, now=None):
+    """Years from now until the 4:00 PM ET close on the expiration date
+    ("YYYY-MM-DD" string or date)."""
+    if isinstance(expiration, str):
+        expiration = datetime.date.fromisoformat(expiration)
+    if now is None:
+        now = datetime.datetime.now(MARKET_TZ)
+    close = datetime.datetime.combine(expiration, datetime.time(16, 0), tzinfo=MARKET_TZ)
+    seconds = (close - now).total_seconds()
+    return max(seconds / SECONDS_PER_YEAR, MIN_TIME_TO_EXPIRY)
+
+def bs_d1(spot, strike, iv, t, r=RISK_FREE_RATE):
+    vol_sqrt_t = iv * np.sqrt(t)
+    return (np.log(spot / strike) + (r + 0.5 * iv * iv) * t) / vol_sqrt_t
+
+def bs_gamma(spot, strike, iv, t, r=RISK_FREE_RATE):
+    """Black-Scholes gamma. All arguments broadcast, so passing strikes as a
+    column and spots as a row prices a whole strikes x spots matrix at once."""
+    spot = np.asarray(spot, dtype=np.float64)
+    d1 = bs_d1(spot, strike, iv, t, r)
+    return norm_pdf(d1) / (spot * iv * np.sqrt(t))
+
+def norm_cdf(x):
+    """Standard normal CDF (Abramowitz & Stegun 26.2.17, |error| < 7.5e-8),
+    vectorized without SciPy."""
+    x = np.asarray(x, dtype=np.float64)
+    k = 1.0 / (1.0 + 0.2316419 * np.abs(x))
+    poly = k * (0.319381530 + k * (-0.356563782 + k * (1.781477937 + k * (-1.821255978 + k * 1.330274429))))
+    upper = 1.0 - norm_pdf(x) * poly
+    return np.where(x >= 0, upper, 1.0 - upper)
+
+def bs_price(spot, strike, iv, t, is_call, r=RISK_FREE_RATE):
+    d1 = bs_d1(spot, strike, iv, t, r)
+    d2 = d1 - iv * np.sqrt(t)
+    discount = np.exp(-r * t)
+    call = spot * norm_cdf(d1) - strike * discount * norm_cdf(d2)
+    # Put from put-call parity
+    return np.where(is_call, call, call - spot + strike * discount)
+
+def bs_vega(spot, strike, iv, t, r=RISK_FREE_RATE):
+    return spot * norm_pdf(bs_d1(spot, strike, iv, t, r)) * np.sqrt(t)
+
+IV_MIN = 1e-4
+IV_MAX = 10.0
+
+def implied_vol(price, spot, strike, t, is_call, r=RISK_FREE_RATE, tol=1e-6, max_iter=50):
+    """Black-Scholes implied volatility for arrays of option prices.
+
+    Newton steps on all contracts at once, each kept inside a per-contract
+    [lo, hi] bracket that shrinks every iteration; a step that would leave
+    the bracket (or stalls on tiny vega) falls back to bisection, so deep
+    OTM and near-expiry contracts still converge. Prices outside the
+    no-arbitrage bounds give NaN. t may be a scalar or one value per option.
+    """
+    price, strike, is_call, t = np.broadcast_arrays(
+        np.asarray(price, dtype=np.float64), np.asarray(strike, dtype=np.float64),
+        np.asarray(is_call, dtype=bool), np.asarray(t, dtype=np.float64))
+    discount = np.exp(-r * t)
+    intrinsic = np.where(is_call, np.maximum(spot - strike * discount, 0.0), np.maximum(strike * discount - spot, 0.0))
+    upper = np.where(is_call, spot, strike * discount)
+    solvable = np.isfinite(price) & (price > intrinsic) & (price < upper)
+
+    iv = np.full(price.shape, np.nan)
+    idx = np.nonzero(solvable)[0]
+    if len(idx) == 0:
+        return iv
+    p, k, c, t = price[idx], strike[idx], is_call[idx], t[idx]
+    lo = np.full(len(idx), IV_MIN)
+    hi = np.full(len(idx), IV_MAX)
+    # Brenner-Subrahmanyam start, clipped into the bracket
+    sigma = np.clip(np.sqrt(2 * np.pi / t) * p / spot, 0.05, 2.0)
+    active = np.ones(len(idx), dtype=bool)
+
+    for _ in range(max_iter):
+        a = np.nonzero(active)[0]
+        if len(a) == 0:
+            break
+        s = sigma[a]
+        diff = bs_price(spot, k[a], s, t[a], c[a], r) - p[a]
+        done = np.abs(diff) < tol
+        # Price rises with volatility, so the sign of diff moves one bracket end
+        hi[a] = np.where(diff > 0, s, hi[a])
+        lo[a] = np.where(diff < 0, s, lo[a])
+        vega = bs_vega(spot, k[a], s, t[a], r)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            newton = s - diff / vega
+        bisect = 0.5 * (lo[a] + hi[a])
+        inside = np.isfinite(newton) & (newton > lo[a]) & (newton < hi[a])
+        sigma[a] = np.where(done, s, np.where(inside, newton, bisect))
+        active[a] = ~done & (hi[a] - lo[a] > tol)
+
+    iv[idx] = sigma
+    return iv
+
+def bs_greeks(spot, strike, iv, t, is_call, r=RISK_FREE_RATE):
+    """Delta, gamma, vanna (d delta / d vol) and charm (d delta / d time, per
+    year of decay) for arrays of contracts. Returns a dict of arrays."""
+    sqrt_t = np.sqrt(t)
+    d1 = bs_d1(spot, strike, iv, t, r)
+    d2 = d1 - iv * sqrt_t
+    pdf = norm_pdf(d1)
+    call_delta = norm_cdf(d1)
+    return {
+        "delta": np.where(is_call, call_delta, call_delta - 1.0),
+        "gamma": pdf / (spot * iv * sqrt_t),
+        "vanna": -pdf * d2 / iv,
+        # Change in delta as time passes (the negative of d delta / d t)
+        "charm": -pdf * (2 * r * t - d2 * iv * sqrt_t) / (2 * t * iv * sqrt_t),
+    }
@@ -0,0 +1,248 @@
+import json
+import math
+import os
+import re
+
+# Approximate prompt size limit; lower-priority sections are dropped to fit
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1000"))
+# Ask the model for a JSON object instead of free text
+STRUCTURED_OUTPUT = os.getenv("LLM_STRUCTURED_OUTPUT", "true").lower() in ("1", "true", "yes")
+PROFILE_STRIKES = int(os.getenv("PROMPT_PROFILE_STRIKES", "10"))
+
+SENTIMENTS = ("Bullish", "Bearish", "Neutral")
+
+_ROLE = ("You are a professional 0DTE (Zero Days to Expiration) options trader. "
+         "Analyze the market data for {symbol} and provide a trading suggestion.")
+
+_UNITS = ("Data is compact JSON. Prices and levels in index points; gex/dex/vanna in $M notional, "
+          "dealer-signed (calls +, puts -); charm in $M per day; iv/skew/fly in vol points; "
+          "top_oi as strike+C/P; profile rows are [strike, net gex $M].")
+
+_STRUCTURED_REQUEST = """Choose the strategy structure (Iron Condor, Butterfly, Diagonal, Calendar, Ratio Spread, Long Call/Put, etc.) from volatility (IV rank, skew) and trend.
+Reply with only this JSON object, summary first:
+{"summary": "one or two sentences for text-to-speech", "sentiment": "Bullish|Bearish|Neutral",
+ "range": [low, high], "target": closing price within 10 points, "strategy": "structure with strikes",
+ "exits": {"profit_target": "...", "stop_loss": "...", "time_exit": "..."},
+ "levels": {"support": [prices], "resistance": [prices]}}"""
+
+_TEXT_REQUEST = """Please provide:
+1. Market Sentiment (Bullish/Bearish/Neutral)
+2. Predicted Closing Price Range
+3. Predicted Specific Closing Price Target (within 10 points)
+4. Suggested Strategy (e.g., Iron Condor, Butterfly, Diagonal, Calendar, Ratio Spread, Long Call/Put, etc.)
+   - Choose the most appropriate structure based on volatility (IV Rank/Skew) and trend.
+5. Recommended Exit Criteria: Profit Target, Stop Loss, Time Exit
+6. Key Support/Resistance Levels
+Keep the response concise and suitable for a text-to-speech summary."""
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token for English and JSON)."""
+    return math.ceil(len(text) / 4)
+
+def _num(value, digits=2):
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        return None
+    value = round(value, digits)
+    return int(value) if value == int(value) else value
+
+def _millions(value):
+    return _num(value / 1e6, 1) if _num(value) is not None else None
+
+def _compact(section):
+    """Drops missing values so they cost no tokens."""
+    return {k: v for k, v in section.items() if v is not None and v != [] and v != {}}
+
+def _sections(market_data):
+    """(name, priority, payload) per section; lower priority numbers are
+    kept longest and priority 0 is never dropped."""
+    profile = market_data.get("gex_profile") or {}
+    macd = market_data.get("macd_values") or {}
+    strikes = sorted(profile.get("strikes") or [], key=lambda row: -abs(row["net_gex"]))[:PROFILE_STRIKES]
+    return [
+        ("price", 0, {
+            "spot": _num(market_data.get("spot_price")),
+            "vix": _num(market_data.get("vix_current")),
+            "vix_chg": _num(market_data.get("vix_change")),
+        }),
+        ("gamma", 1, {
+            "gex": _millions(profile.get("total_gex")),
+            "dex": _millions(profile.get("total_dex")),
+            "zero_gamma": _num(market_data.get("zero_gamma"), 1),
+            "call_wall": _num(market_data.get("call_wall")),
+            "put_wall": _num(market_data.get("put_wall")),
+        }),
+        ("ta_5min", 2, {
+            "rsi": _num(market_data.get("rsi_5min"), 1),
+            "macd": [_num(macd.get(k)) for k in ("macd", "signal", "histogram")] if macd else None,
+            "trend": market_data.get("recent_trend_5min") if market_data.get("recent_trend_5min") != "N/A" else None,
+            "vwap": _num(market_data.get("vwap")),
+            "atr": _num(market_data.get("atr_5min")),
+        }),
+        ("vol", 3, {
+            "atm_iv": _num(market_data.get("atm_iv")),
+            "skew_25d": _num(market_data.get("skew_25d")),
+            "fly_25d": _num(market_data.get("butterfly_25d")),
+            "iv_rank": _num(market_data.get("iv_rank"), 0),
+            "vanna": _millions(market_data.get("total_vanna")),
+            "charm": _millions(market_data.get("total_charm")),
+        }),
+        ("flow", 4, {
+            "call_vol": _num(market_data.get("call_volume")),
+            "put_vol": _num(market_data.get("put_volume")),
+            "top_oi": [f"{_num(strike)}{kind[0].upper()}" for strike, kind in market_data.get("top_oi") or []],
+        }),
+        ("expiries", 5, {
+            e["expiration"]: {"gex": _millions(e["total_gex"]), "dex": _millions(e["total_dex"]),
+                              "call_wall": _num(e["call_wall"]), "put_wall": _num(e["put_wall"])}
+            for e in market_data.get("expiry_breakdown") or []
+        } if len(market_data.get("expiry_breakdown") or []) > 1 else {}),
+        ("profile", 6, {
+            "rows": [[_num(row["strike"]), _millions(row["net_gex"])] for row in sorted(strikes, key=lambda r: r["strike"])],
+        }),
+    ]
+
+def build_prompt(market_data, budget=PROMPT_TOKEN_BUDGET, structured=STRUCTURED_OUTPUT):
+    """Assembles the prompt from market_data's raw numbers.
+
+    Returns (prompt, info) where info has the estimated "tokens" and the
+    sections "dropped" to stay within budget (lowest priority first).
+    """
+    sections = [(name, priority, _compact(payload)) for name, priority, payload in _sections(market_data)]
+    sections = [s for s in sections if s[2]]
+    header = "\n".join([_ROLE.format(symbol=market_data.get("symbol")), _UNITS])
+    request = _STRUCTURED_REQUEST if structured else _TEXT_REQUEST
+
+    dropped = []
+    while True:
+        payload = json.dumps({name: data for name, _, data in sections}, separators=(",", ":"))
+        prompt = f"{header}\n{payload}\n{request}"
+        tokens = estimate_tokens(prompt)
+        droppable = [s for s in sections if s[1] > 0]
+        if tokens <= budget or not droppable:
+            return prompt, {"tokens": tokens, "dropped": dropped}
+        lowest = max(droppable, key=lambda s: s[1])
+        sections.remove(lowest)
+        dropped.append(lowest[0])
+
+def _number(value):
+    if isinstance(value, str):
+        value = value.replace(",", "").replace("$", "").strip()
+        try:
+            value = float(value)
+        except ValueError:
+            return None
+    return _num(value) if isinstance(value, (int, float)) else None
+
+def _text(value):
+    return value.strip() if isinstance(value, str) and value.strip() else None
+
+def _levels(value, name):
+    """A list of prices; a single number counts as a one-element list."""
+    if value is None:
+        return []
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        value = [value]
+    if not isinstance(value, list):
+        raise ValueError(f"levels.{name}: {value!r}")
+    return [n for n in (_number(v) for v in value) if n is not None]
+
+def parse_analysis(text):
+    """Parses and validates the model's JSON reply.
+
+    Returns the normalized dict (sentiment, range, target, strategy, exits,
+    levels, summary). Raises ValueError naming the first invalid field.
+    """
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object in reply")
+    try:
+        raw = json.loads(text[start:end + 1])
+    except json.JSONDecodeError as e:
+        raise ValueError(f"invalid JSON: {e}") from e
+    if not isinstance(raw, dict):
+        raise ValueError("reply is not a JSON object")
+
+    sentiment = next((s for s in SENTIMENTS if str(raw.get("sentiment", "")).strip().lower() == s.lower()), None)
+    if sentiment is None:
+        raise ValueError(f"sentiment: {raw.get('sentiment')!r}")
+    bounds = raw.get("range")
+    bounds = [_number(v) for v in bounds] if isinstance(bounds, list) and len(bounds) == 2 else [None]
+    if None in bounds:
+        raise ValueError(f"range: {raw.get('range')!r}")
+    target = _number(raw.get("target"))
+    if target is None:
+        raise ValueError(f"target: {raw.get('target')!r}")
+    strategy = _text(raw.get("strategy"))
+    if strategy is None:
+        raise ValueError("strategy: missing")
+
+    exits = raw.get("exits") if isinstance(raw.get("exits"), dict) else {}
+    levels = raw.get("levels") if isinstance(raw.get("levels"), dict) else {}
+    return {
+        "sentiment": sentiment,
+        "range": sorted(bounds),
+        "target": target,
+        "strategy": strategy,
+        "exits": {k: _text(str(exits[k]) if exits.get(k) is not None else None)
+                  for k in ("profit_target", "stop_loss", "time_exit")},
+        "levels": {k: _levels(levels.get(k), k) for k in ("support", "resistance")},
+        "summary": _text(raw.get("summary")),
+    }
+
+def _fmt(value):
+    return f"{value:,.0f}" if value == int(value) else f"{value:,.2f}"
+
+def render_text(analysis):
+    """Readable (and speakable) text of a parsed analysis, in the same
+    "Label: value" layout as free-text replies so reports and replay
+    parsing keep working."""
+    exits = analysis["exits"]
+    levels = analysis["levels"]
+    lines = [
+        f"Market Sentiment: {analysis['sentiment']}",
+        f"Predicted Closing Range: {_fmt(analysis['range'][0])} - {_fmt(analysis['range'][1])}",
+        f"Predicted Closing Price Target: {_fmt(analysis['target'])}",
+        f"Suggested Strategy: {analysis['strategy']}",
+    ]
+    exit_parts = [f"{label} {exits[key]}" for key, label in
+                  (("profit_target", "Profit target:"), ("stop_loss", "Stop loss:"), ("time_exit", "Time exit:"))
+                  if exits[key]]
+    if exit_parts:
+        lines.append("Exit Criteria: " + "; ".join(exit_parts))
+    level_parts = [f"{label} {', '.join(_fmt(v) for v in levels[key])}" for key, label in
+                   (("support", "Support"), ("resistance", "Resistance")) if levels[key]]
+    if level_parts:
+        lines.append("Key Levels: " + "; ".join(level_parts))
+    if analysis["summary"]:
+        lines.append("")
+        lines.append(analysis["summary"])
+    return "\n".join(lines)
+
+_SPOT_RE = re.compile(r'"spot":([\d.]+)')
+
+def prompt_spot(prompt):
+    """The spot price embedded in a built prompt, or None."""
+    match = _SPOT_RE.search(prompt)
+    return float(match.group(1)) if match else None
+
+_SUMMARY_RE = re.compile(r'"summary"\s*:\s*"')
+
+def partial_summary(text):
+    """The "summary" string of a JSON reply that is still arriving, as far
+    as it has been received ("" until it starts), so it can be streamed."""
+    match = _SUMMARY_RE.search(text)
+    if not match:
+        return ""
+    start = end = match.end()
+    while end < len(text) and text[end] != '"':
+        if text[end] == "\\":
+            step = 6 if text[end + 1:end + 2] == "u" else 2
+            if end + step > len(text):
+                break
+            end += step
+        else:
+            end += 1
+    try:
+        return json.loads('"' + text[start:end] + '"')
+    except ValueError:
+        return ""
@@ -0,0 +1,193 @@
+import copy
+import datetime
+import re
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from . import market_calendar
+from .option_chain import OptionChain
+from .pipeline import build_market_data
+from .pricing import MARKET_TZ
+from .snapshot_store import SnapshotStore, STORE_DIR
+from .streaming_indicators import IndicatorState
+
+INTERVAL_SECONDS = {"1min": 60, "5min": 300, "15min": 900}
+
+_NUMBER = r"\$?([\d,]+(?:\.\d+)?)"
+_RANGE_RE = re.compile(r"range[^\d\n]*?" + _NUMBER + r"\s*(?:-|–|to)\s*" + _NUMBER, re.IGNORECASE)
+_TARGET_RE = re.compile(r"target[^\d\n]*?" + _NUMBER, re.IGNORECASE)
+
+def _to_number(text):
+    return float(text.replace(",", ""))
+
+def parse_predictions(text):
+    """Extracts the predicted closing range and target from analysis text.
+
+    Returns {"range_low", "range_high", "target"}, with None for anything
+    the text does not state.
+    """
+    result = {"range_low": None, "range_high": None, "target": None}
+    if not text:
+        return result
+    match = _RANGE_RE.search(text)
+    if match:
+        low, high = sorted((_to_number(match.group(1)), _to_number(match.group(2))))
+        result["range_low"], result["range_high"] = low, high
+    match = _TARGET_RE.search(text)
+    if match:
+        result["target"] = _to_number(match.group(1))
+    return result
+
+def session_close(bars, day, bar_seconds):
+    """Close of the last bar ending at the session close, or None if that
+    bar wasn't recorded. Candles include extended hours, so the last bar of
+    the day is usually not the settlement price."""
+    hours = market_calendar.session_hours(day)
+    if hours is None:
+        return None
+    close_ts = hours[1].timestamp()
+    ended = [bar for bar in bars if bar["timestamp"] + bar_seconds <= close_ts]
+    if not ended or ended[-1]["timestamp"] + bar_seconds <= close_ts - bar_seconds:
+        return None
+    return ended[-1]["close"]
+
+def score_prediction(prediction, actual_close):
+    score = {"range_hit": None, "range_width": None, "target_error": None}
+    if actual_close is None:
+        return score
+    if prediction["range_low"] is not None:
+        score["range_hit"] = prediction["range_low"] <= actual_close <= prediction["range_high"]
+        score["range_width"] = prediction["range_high"] - prediction["range_low"]
+    if prediction["target"] is not None:
+        score["target_error"] = abs(prediction["target"] - actual_close)
+    return score
+
+def _load_chains(store, date_str, symbol):
+    """All chain snapshots of the day as {ts: OptionChain}, read in one query."""
+    cols = store.query_chain(date_str, symbol)
+    if len(cols["ts"]) == 0:
+        return {}
+    # Rows come back ordered by ts, so each snapshot is a contiguous slice
+    stamps, starts = np.unique(cols["ts"], return_index=True)
+    bounds = list(starts[1:]) + [len(cols["ts"])]
+    chains = {}
+    for ts, lo, hi in zip(stamps, starts, bounds):
+        # Within a snapshot rows are ordered by expiration, as OptionChain expects
+        row_expirations = cols["expiration"][lo:hi]
+        expirations = list(dict.fromkeys(row_expirations))
+        index = {expiration: i for i, expiration in enumerate(expirations)}
+        chains[float(ts)] = OptionChain(
+            symbols=cols["option_symbol"][lo:hi], strike=cols["strike"][lo:hi], is_call=cols["is_call"][lo:hi],
+            open_interest=cols["open_interest"][lo:hi], volume=cols["volume"][lo:hi],
+            bid=cols["bid"][lo:hi], ask=cols["ask"][lo:hi], iv=cols["iv"][lo:hi],
+            gamma=cols["gamma"][lo:hi], delta=cols["delta"][lo:hi],
+            expiry=np.array([index[e] for e in row_expirations], dtype=np.int32), expirations=expirations)
+    return chains
+
+def _llm_text(llm, market_data, recorded_text):
+    if llm == "recorded":
+        return recorded_text or ""
+    if llm == "fake":
+        from .gemini_service import build_prompt, finish_analysis, STRUCTURED_OUTPUT
+        from .llm_service import StubProvider
+        reply = "".join(StubProvider().stream(build_prompt(market_data), json_output=STRUCTURED_OUTPUT))
+        return finish_analysis(reply)[0]
+    raise ValueError(f"Unknown replay LLM mode: {llm}")
+
+def replay_day(date_str, symbol, store_dir=STORE_DIR, llm="recorded", step="cycle", interval="5min"):
+    """Replays one recorded day through the live indicator and GEX code.
+
+    step="cycle" evaluates at every recorded analysis cycle; step="bar"
+    evaluates at every candle close using the latest chain recorded by
+    then. Only bars that had closed by the evaluation time are used, so
+    nothing from the future leaks in. llm is "recorded" (the text stored
+    with the cycle) or "fake" (offline stub backend).
+    """
+    store = SnapshotStore(store_dir)
+    cycles = store.query_cycles(date_str, symbol)
+    chains = _load_chains(store, date_str, symbol)
+    candles = store.query_candles(date_str, symbol, interval)
+    bar_seconds = INTERVAL_SECONDS.get(interval, 60)
+
+    bars = [{
+        "time": datetime.datetime.fromtimestamp(c["ts"], MARKET_TZ).strftime("%Y-%m-%dT%H:%M:%S"),
+        "timestamp": c["ts"], "open": c["open"], "high": c["high"], "low": c["low"],
+        "close": c["close"], "volume": c["volume"],
+    } for c in candles if c["close"] is not None]
+
+    actual_close = session_close(bars, datetime.date.fromisoformat(date_str), bar_seconds)
+
+    if step == "bar":
+        cycle_by_ts = {c["ts"]: c for c in cycles}
+        chain_times = sorted(chains)
+        points = []
+        for bar in bars:
+            eval_ts = bar["timestamp"] + bar_seconds
+            # Latest chain recorded at or before this bar's close
+            idx = np.searchsorted(chain_times, eval_ts, side="right") - 1
+            if idx < 0:
+                continue
+            ts = chain_times[idx]
+            cycle = cycle_by_ts.get(ts, {})
+            points.append((eval_ts, ts, bar["close"], cycle))
+    else:
+        points = [(c["ts"], c["ts"], c["spot"], c) for c in cycles if c["ts"] in chains]
+
+    state = IndicatorState()
+    next_bar = 0
+    results = []
+    for eval_ts, chain_ts, spot, cycle in points:
+        while next_bar < len(bars) and bars[next_bar]["timestamp"] + bar_seconds <= eval_ts:
+            state.update(bars[next_bar])
+            next_bar += 1
+        if spot is None:
+            continue
+
+        now = datetime.datetime.fromtimestamp(eval_ts, MARKET_TZ)
+        vix_quote = (cycle.get("quotes") or {}).get("vix")
+        ind = state.values() if state.bars else None
+        # Several bars can share one snapshot and fill_chain_greeks replaces
+        # its columns, so each evaluation fills a copy of the raw chain
+        chain = copy.copy(chains[chain_ts])
+        market_data = build_market_data(symbol, spot, chain, ind, vix_quote,
+                                        chain.years_to_expiry(now=now, default=date_str))
+        text = _llm_text(llm, market_data, cycle.get("analysis"))
+        prediction = parse_predictions(text)
+        results.append({
+            "ts": eval_ts,
+            "time": now.isoformat(),
+            "spot": spot,
+            "zero_gamma": market_data["zero_gamma"],
+            "rsi": market_data["rsi_5min"],
+            "prediction": prediction,
+            "score": score_prediction(prediction, actual_close),
+        })
+
+    return {"date": date_str, "symbol": symbol, "actual_close": actual_close,
+            "evaluations": len(results), "results": results, "summary": summarize(results)}
+
+def summarize(results):
+    hits = [r["score"]["range_hit"] for r in results if r["score"]["range_hit"] is not None]
+    errors = [r["score"]["target_error"] for r in results if r["score"]["target_error"] is not None]
+    widths = [r["score"]["range_width"] for r in results if r["score"]["range_width"] is not None]
+    return {
+        "evaluations": len(results),
+        "scored_ranges": len(hits),
+        "range_hit_rate": round(sum(hits) / len(hits), 3) if hits else None,
+        "mean_range_width": round(float(np.mean(widths)), 2) if widths else None,
+        "scored_targets": len(errors),
+        "mean_target_error": round(float(np.mean(errors)), 2) if errors else None,
+        "median_target_error": round(float(np.median(errors)), 2) if errors else None,
+    }
+
+def run_backtest(symbol, dates=None, store_dir=STORE_DIR, llm="recorded", step="cycle", interval="5min", workers=None):
+    """Replays each date in its own process and aggregates the scores."""
+    if dates is None:
+        dates = SnapshotStore(store_dir).available_dates()
+    days = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(replay_day, date_str, symbol, store_dir, llm, step, interval) for date_str in dates]
+        for future in futures:
+            days.append(future.result())
+    all_results = [r for day in days for r in day["results"]]
+    return {"symbol": symbol, "dates": list(dates), "summary": summarize(all_results),
+            "days": [{k: v for k, v in day.items() if k != "results"} for day in days]}
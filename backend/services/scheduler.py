@@ -1,153 +1,622 @@
 from apscheduler.schedulers.background import BackgroundScheduler
-from .tradier_service import get_spot_price, fetch_option_chain, get_historical_candles, get_quote
-from .gemini_service import analyze_market
-from .indicators import calculate_rsi, calculate_macd, calculate_gex_dex
+from .market_cache import get_spot_price, fetch_option_chain, get_historical_candles, get_quote, get_option_expirations
+from .gemini_service import analyze_market_stream, finish_analysis, cacheable, partial_text, error_text, LLMError
+from .indicators import calculate_gex_dex
+from .pipeline import build_market_data
+from .pricing import implied_vol
+from .streaming_indicators import IndicatorEngine
+from .stream_service import StreamIngestor, TradierStreamFeed
+from .event_bus import broadcaster
+from .option_chain import OptionChain
+from .snapshot_store import store as snapshot_store
+from .llm_cache import cache as analysis_cache, feature_key, LLM_CACHE_ENABLED
+from .market_calendar import session_hours, session_date, next_open, now_et, select_expirations, EXPIRATION_KINDS
+from .vol_surface import IVHistory
+from .history import history as intraday_history
+from . import metrics
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+import numpy as np
+import contextvars
+import copy
 import datetime
-import pandas as pd
+import os
+import threading
+import time
+import uuid
 
-latest_analysis = {
+# Underlyings analysed every cycle; the first one is the default for the API
+SYMBOLS = [s.strip().upper() for s in os.getenv("SYMBOLS", "SPX").split(",") if s.strip()]
+PRIMARY_SYMBOL = SYMBOLS[0]
+
+WAITING_ANALYSIS = {
     "timestamp": None,
     "text": "Waiting for initial analysis...",
     "data": {}
 }
 
+# Latest analysis per symbol
+latest_analyses = {}
+
+# Bumped on every change to latest_analyses; used as the ETag. Symbol
+# workers set analyses concurrently, so both change under analysis_lock.
+analysis_version = 0
+analysis_lock = threading.Lock()
+
 is_paused = False
 last_analysis_time = None
 
+# Market data fetches are independent network round-trips, so they are issued
+# together on a small bounded pool and the cycle waits for the slowest one.
+# The pool is shared by all symbols, so its size is the global cap on
+# concurrent Tradier requests. Each fetch gets FETCH_TIMEOUT_SECONDS from
+# when a worker picks it up, so time spent queued behind other symbols'
+# fetches doesn't count against it.
+FETCH_TIMEOUT_SECONDS = float(os.getenv("FETCH_TIMEOUT_SECONDS", "15"))
+TRADIER_CONCURRENCY = int(os.getenv("TRADIER_CONCURRENCY", "4"))
+fetch_executor = ThreadPoolExecutor(max_workers=TRADIER_CONCURRENCY, thread_name_prefix="market-fetch")
+
+# Each symbol's fetch -> compute -> LLM pipeline runs on its own worker, so one
+# symbol's LLM call overlaps the next symbol's fetches. LLM calls are capped
+# separately by the LLM router (see llm_service).
+SYMBOL_WORKERS = int(os.getenv("SYMBOL_WORKERS", str(min(len(SYMBOLS), 4))))
+symbol_executor = ThreadPoolExecutor(max_workers=max(SYMBOL_WORKERS, 1), thread_name_prefix="symbol-pipeline")
+
+# Outcome of each symbol in the most recent cycle
+last_cycle_outcomes = {}
+
+# Adaptive cadence: cycles run every CADENCE_NORMAL_MINUTES during the
+# session, every CADENCE_FAST_MINUTES in the first/last minutes of it or
+# when the primary symbol or VIX moved sharply since the last cycle, and not
+# at all outside NYSE hours (SCHEDULE_OFF_HOURS=true overrides for testing).
+CADENCE_NORMAL_MINUTES = float(os.getenv("CADENCE_NORMAL_MINUTES", "10"))
+CADENCE_FAST_MINUTES = float(os.getenv("CADENCE_FAST_MINUTES", "3"))
+OPEN_WINDOW_MINUTES = float(os.getenv("OPEN_WINDOW_MINUTES", "30"))
+CLOSE_WINDOW_MINUTES = float(os.getenv("CLOSE_WINDOW_MINUTES", "60"))
+SPIKE_SPOT_PCT = float(os.getenv("SPIKE_SPOT_PCT", "0.3"))
+SPIKE_VIX_PCT = float(os.getenv("SPIKE_VIX_PCT", "5"))
+SCHEDULER_TICK_SECONDS = int(os.getenv("SCHEDULER_TICK_SECONDS", "60"))
+SCHEDULE_OFF_HOURS = os.getenv("SCHEDULE_OFF_HOURS", "false").lower() in ("1", "true", "yes")
+
+# A cycle holds this for its whole run; a trigger that finds it taken is skipped
+cycle_lock = threading.Lock()
+last_cycle_attempt = None
+# Primary symbol's spot and VIX when the last cycle fetched them
+cycle_marks = {"spot": None, "vix": None}
+schedule_state = {"phase": None, "cadence_minutes": None, "reason": None, "next_open": None}
+
+# Persist every cycle's chain, candles, quotes, indicators and text
+SNAPSHOT_STORE_ENABLED = os.getenv("SNAPSHOT_STORE_ENABLED", "true").lower() in ("1", "true", "yes")
+
+# Which listed expirations to analyse together: any of 0dte, 1dte, weekly
+EXPIRATIONS = [k.strip().lower() for k in os.getenv("EXPIRATIONS", "0dte").split(",")
+               if k.strip().lower() in EXPIRATION_KINDS] or ["0dte"]
+
+CANDLE_INTERVAL = "5min"
+# Running RSI/MACD/VWAP/ATR state, checkpointed so a restart only needs the
+# bars since the last run instead of the whole timesales history. Written on
+# a timer and at shutdown, not on every analysis cycle.
+INDICATOR_CHECKPOINT_SECONDS = int(os.getenv("INDICATOR_CHECKPOINT_SECONDS", "300"))
+INDICATOR_CHECKPOINT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "state", "indicators.json")
+indicator_engine = IndicatorEngine(INDICATOR_CHECKPOINT)
+# Daily ATM IV per symbol for IV rank
+iv_history = IVHistory(os.path.join(os.path.dirname(INDICATOR_CHECKPOINT), "iv_history.json"))
+
+# Live quote streaming between analysis cycles (STREAMING_ENABLED=true)
+STREAMING_ENABLED = os.getenv("STREAMING_ENABLED", "false").lower() in ("1", "true", "yes")
+STREAM_OPTION_COUNT = int(os.getenv("STREAM_OPTION_COUNT", "40"))
+stream_ingestor = None
+live_context = {"symbol": None, "chain": None, "profile": None, "analysis_spot": None,
+                "option_rows": np.empty(0, dtype=np.intp), "option_symbols": frozenset()}
+live_metrics = {}
+
+def near_the_money_rows(chain, spot, count=STREAM_OPTION_COUNT):
+    """Row indices of the count contracts with strikes closest to spot
+    (contracts without an OCC symbol are left out)."""
+    if len(chain) == 0:
+        return np.empty(0, dtype=np.intp)
+    count = min(count, len(chain))
+    distance = np.abs(chain.strike - spot)
+    idx = np.argpartition(distance, count - 1)[:count]
+    return np.array([i for i in idx if chain.symbols[i]], dtype=np.intp)
+
+def live_atm_iv(chain, rows, spot, snapshot, now=None):
+    """ATM IV in percent solved from the streamed bid/ask mids of the
+    near-the-money rows: the call and put nearest spot, averaged. None
+    without a usable quote on either side."""
+    if chain is None or len(rows) == 0:
+        return None
+    quotes = [snapshot.get(chain.symbols[i]) for i in rows]
+    bid = np.array([q.get("bid") or np.nan for q in quotes], dtype=np.float64)
+    ask = np.array([q.get("ask") or np.nan for q in quotes], dtype=np.float64)
+    mid = np.where((bid > 0) & (ask >= bid), (bid + ask) / 2, np.nan)
+    if np.isnan(mid).all():
+        return None
+
+    now = now or now_et()
+    years = chain.years_to_expiry(now=now, default=now.date().isoformat())
+    if np.ndim(years):
+        years = years[rows]
+    strike, is_call = chain.strike[rows], chain.is_call[rows]
+    iv = implied_vol(mid, spot, strike, years, is_call)
+    atm = []
+    for side in (is_call, ~is_call):
+        usable = side & np.isfinite(iv)
+        if usable.any():
+            nearest = np.argmin(np.where(usable, np.abs(strike - spot), np.inf))
+            atm.append(iv[nearest])
+    if not atm:
+        return None
+    return round(100 * float(np.mean(atm)), 2)
+
+def _on_live_update(changed, snapshot):
+    global live_metrics
+    # One copy so the chain and its streamed rows always come from the same cycle
+    context = dict(live_context)
+    symbol = context["symbol"]
+    if not symbol or not (({symbol, "VIX"} | context["option_symbols"]) & changed):
+        return
+
+    spot = snapshot.get(symbol).get("last")
+    if spot is None:
+        return
+
+    live = {"symbol": symbol, "spot_price": spot, "vix_current": snapshot.get("VIX").get("last")}
+    if context["analysis_spot"]:
+        live["spot_change_since_analysis"] = round(spot - context["analysis_spot"], 2)
+
+    chain = context["chain"]
+    if chain is not None:
+        total_gex, total_dex = calculate_gex_dex(chain, spot)
+        live["total_gex"] = round(total_gex)
+        live["total_dex"] = round(total_dex)
+    # Streamed option marks refresh ATM IV between analysis cycles
+    live["atm_iv"] = live_atm_iv(chain, context["option_rows"], spot, snapshot)
+
+    profile = context["profile"] or {}
+    for level in ("zero_gamma", "call_wall", "put_wall"):
+        if profile.get(level) is not None:
+            live[f"distance_to_{level}"] = round(profile[level] - spot, 2)
+
+    live["updated_at"] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    live_metrics = live
+
+def start_live_stream(feed=None):
+    """Starts streaming ingestion; feed defaults to the Tradier market stream."""
+    global stream_ingestor
+    if stream_ingestor is not None:
+        return stream_ingestor
+    stream_ingestor = StreamIngestor(feed or TradierStreamFeed())
+    stream_ingestor.add_listener(_on_live_update)
+    stream_ingestor.start()
+    return stream_ingestor
+
+def _update_live_context(symbol, chain, spot, profile):
+    # Streaming follows the primary symbol only
+    if symbol != PRIMARY_SYMBOL:
+        return
+    rows = near_the_money_rows(chain, spot)
+    options = [chain.symbols[i] for i in rows]
+    live_context.update(symbol=symbol, chain=chain, profile=profile, analysis_spot=spot,
+                        option_rows=rows, option_symbols=frozenset(options))
+    if stream_ingestor is not None:
+        stream_ingestor.set_symbols([symbol, "VIX"] + options)
+
+def get_live_data():
+    if stream_ingestor is None:
+        return {"streaming": False, "metrics": live_metrics, "quotes": {}}
+    return {
+        "streaming": True,
+        "metrics": live_metrics,
+        "quotes": stream_ingestor.snapshot.all(),
+        "stats": dict(stream_ingestor.stats),
+    }
+
+def _timed_call(stage, symbol, fn, *args, **kwargs):
+    with metrics.span(stage, symbol):
+        return fn(*args, **kwargs)
+
+def _mark_started(started, name, fn, *args, **kwargs):
+    started[name] = time.monotonic()
+    return fn(*args, **kwargs)
+
+def _submit(executor, fn, *args, **kwargs):
+    # Carries the caller's run ID into the worker thread
+    return executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)
+
+def target_expirations(symbol, today):
+    """The EXPIRATIONS picked from the symbol's listings (cached for the
+    day); falls back to today's date if the listing cannot be fetched."""
+    try:
+        expirations = select_expirations(get_option_expirations(symbol), today, EXPIRATIONS)
+    except Exception as e:
+        print(f"[{symbol}] Error fetching expirations: {e}")
+        expirations = []
+    return expirations or [today]
+
+def fetch_market_inputs(symbol, today):
+    """Fetches spot, the option chains, candles and VIX concurrently.
+
+    Returns (results, errors): both dicts keyed by input name. A fetch that
+    fails or exceeds FETCH_TIMEOUT_SECONDS is reported in errors and left
+    out of results, so callers can decide which inputs are required.
+    results["chain"] is [(expiration, options), ...] for every expiration
+    that was fetched; failed ones are reported as "chain <expiration>". If
+    the front expiration failed there is no "chain" at all, so a later
+    expiration never stands in for it.
+    """
+    started = {}
+    calls = {
+        "spot": ("fetch_spot", get_spot_price, (symbol,), {}),
+        "candles": ("fetch_candles", get_historical_candles, (symbol,),
+                    {"interval": CANDLE_INTERVAL, "start_date": indicator_engine.fetch_start(symbol, CANDLE_INTERVAL)}),
+        "vix": ("fetch_vix", get_quote, ("VIX",), {}),
+    }
+    expirations = target_expirations(symbol, today)
+    for expiration in expirations:
+        calls[f"chain {expiration}"] = ("fetch_chain", fetch_option_chain, (symbol, expiration), {})
+    futures = {name: _submit(fetch_executor, _mark_started, started, name, _timed_call, stage, symbol, fn, *args, **kwargs)
+               for name, (stage, fn, args, kwargs) in calls.items()}
+
+    # Fetches run concurrently, so the total wait is about one timeout, not
+    # one per input. Queued fetches aren't timed out: every Tradier request
+    # is itself bounded (TRADIER_REQUEST_DEADLINE), so they do start.
+    timed_out = set()
+    while True:
+        now = time.monotonic()
+        pending = [name for name, future in futures.items() if not future.done() and name not in timed_out]
+        for name in pending:
+            if name in started and started[name] + FETCH_TIMEOUT_SECONDS <= now:
+                timed_out.add(name)
+        pending = [name for name in pending if name not in timed_out]
+        if not pending:
+            break
+        # Re-checked at least every second to pick up fetches that just started
+        timeout = min([1.0] + [started[name] + FETCH_TIMEOUT_SECONDS - now for name in pending if name in started])
+        wait([futures[name] for name in pending], timeout=timeout, return_when=FIRST_COMPLETED)
+
+    results = {}
+    errors = {}
+    for name, future in futures.items():
+        if name in timed_out:
+            errors[name] = f"timed out after {FETCH_TIMEOUT_SECONDS:g}s"
+            continue
+        try:
+            results[name] = future.result()
+        except Exception as e:
+            errors[name] = str(e)
+    for name in errors:
+        metrics.fetch_errors_total.inc(symbol=symbol, input=name.split(" ")[0])
+
+    chains = [(name.split(" ", 1)[1], results.pop(name)) for name in list(results) if name.startswith("chain ")]
+    if f"chain {min(expirations)}" in errors:
+        print(f"[{symbol}] Front expiration {min(expirations)} unavailable; not using later ones in its place")
+    elif chains:
+        results["chain"] = sorted(chains)
+    return results, errors
+
+# Outcomes returned by job_analyze_market
+OUTCOME_COMPLETED = "completed"
+OUTCOME_PAUSED = "skipped_paused"
+OUTCOME_COOLDOWN = "skipped_cooldown"
+OUTCOME_BUSY = "skipped_busy"
+OUTCOME_ABORTED = "aborted"
+OUTCOME_ERROR = "error"
+
 def job_analyze_market():
-    global latest_analysis, last_analysis_time, is_paused
+    """Runs one analysis cycle over SYMBOLS and returns one of the OUTCOME_*
+    values (completed if at least one symbol completed). Never overlaps a
+    cycle that is already running."""
+    if not cycle_lock.acquire(blocking=False):
+        print(f"[{datetime.datetime.now()}] Skipping analysis: previous cycle still running")
+        outcome = OUTCOME_BUSY
+    else:
+        try:
+            outcome = _run_cycle()
+        finally:
+            cycle_lock.release()
+    metrics.cycles_total.inc(outcome=outcome)
+    return outcome
+
+def _run_cycle():
+    global last_analysis_time, is_paused
     
     if is_paused:
         print(f"[{datetime.datetime.now()}] Analysis skipped: Scheduler is PAUSED.")
-        return
+        return OUTCOME_PAUSED
 
     now = datetime.datetime.now()
     if last_analysis_time and (now - last_analysis_time).total_seconds() < 60:
         print(f"[{now}] Skipping analysis: Cooldown active (wait 60s)")
-        return
+        return OUTCOME_COOLDOWN
 
-    print(f"[{now}] Running scheduled analysis...")
+    print(f"[{now}] Running scheduled analysis for {', '.join(SYMBOLS)}...")
     last_analysis_time = now
+    today = session_date().strftime("%Y-%m-%d")
+    run_id = uuid.uuid4().hex
+    # Every log line and span of this cycle carries the run ID
+    token = metrics.current_run_id.set(run_id)
     try:
-        symbol = "SPX" # Default to SPX for 0DTE
-        today = datetime.date.today().strftime("%Y-%m-%d")
-        
-        spot = get_spot_price(symbol)
-        chain = fetch_option_chain(symbol, today)
-        
-        # 1. Basic Volume Aggregation
-        call_vol = sum(opt['volume'] for opt in chain if opt['option_type'] == 'call')
-        put_vol = sum(opt['volume'] for opt in chain if opt['option_type'] == 'put')
-        
-        # 2. Top OI
-        sorted_oi = sorted(chain, key=lambda x: x['open_interest'], reverse=True)[:5]
-        top_oi_strikes = [f"{opt['strike']} ({opt['option_type']})" for opt in sorted_oi]
+        with metrics.span("cycle", symbols=SYMBOLS):
+            futures = {symbol: _submit(symbol_executor, analyze_symbol, symbol, today, run_id) for symbol in SYMBOLS}
+            outcomes = {}
+            for symbol, future in futures.items():
+                try:
+                    outcomes[symbol] = future.result()
+                except Exception as e:
+                    print(f"[{symbol}] Error in analysis pipeline: {e}")
+                    outcomes[symbol] = OUTCOME_ERROR
+                metrics.symbol_outcomes_total.inc(symbol=symbol, outcome=outcomes[symbol])
+        metrics.log_event("cycle_complete", outcomes=outcomes)
+    finally:
+        metrics.current_run_id.reset(token)
+    last_cycle_outcomes.clear()
+    last_cycle_outcomes.update(outcomes)
 
-        # 3. Gamma & Delta Exposure
-        total_gex, total_dex = calculate_gex_dex(chain, spot)
+    if OUTCOME_COMPLETED in outcomes.values():
+        return OUTCOME_COMPLETED
+    if OUTCOME_ERROR in outcomes.values():
+        return OUTCOME_ERROR
+    return OUTCOME_ABORTED
 
-        # 4. Technical Analysis (5min candles)
-        candles = get_historical_candles(symbol, interval="5min")
-        rsi_val = "N/A"
-        macd_val = "N/A"
-        recent_trend = "N/A"
-        
-        if candles and len(candles) > 20:
-            df = pd.DataFrame(candles)
-            if 'close' in df.columns:
-                df['close'] = df['close'].astype(float)
-                
-                # Calculate Indicators
-                rsi_val = round(calculate_rsi(df['close']), 2)
-                macd_data = calculate_macd(df['close'])
-                macd_val = f"MACD: {macd_data['macd']:.2f}, Signal: {macd_data['signal']:.2f}, Hist: {macd_data['histogram']:.2f}"
-                
-                # Simple Trend (Last 5 candles)
-                last_5 = df['close'].tail(5).tolist()
-                start_p = last_5[0]
-                end_p = last_5[-1]
-                if end_p > start_p:
-                    recent_trend = "Up"
-                elif end_p < start_p:
-                    recent_trend = "Down"
-                else:
-                    recent_trend = "Flat"
-
-        # 5. Fetch VIX Data
-        vix_current = "N/A"
-        vix_trend = "N/A"
-        try:
-            vix_quote = get_quote("VIX")
-            if vix_quote:
-                vix_current = vix_quote.get("last")
-                change = vix_quote.get("change", 0)
-                if change > 0:
-                    vix_trend = f"Up {change}"
-                elif change < 0:
-                    vix_trend = f"Down {change}"
-                else:
-                    vix_trend = "Flat"
-        except Exception as e:
-            print(f"Error fetching VIX: {e}")
-
-        market_data = {
-            "symbol": symbol,
-            "spot_price": spot,
-            "call_volume": call_vol,
-            "put_volume": put_vol,
-            "top_oi_strikes": top_oi_strikes,
-            "vix_current": vix_current,
-            "vix_trend": vix_trend,
-            "total_gex": f"${total_gex:,.0f}",
-            "total_dex": f"${total_dex:,.0f}",
-            "rsi_5min": rsi_val,
-            "macd_5min": macd_val,
-            "recent_trend_5min": recent_trend
-        }
-        
-        analysis_text = analyze_market(market_data)
+def analyze_symbol(symbol, today, run_id=None):
+    """Fetch -> compute -> LLM pipeline for one symbol; returns an OUTCOME_*."""
+    try:
+        fetched_at = time.time()
+        inputs, fetch_errors = fetch_market_inputs(symbol, today)
+        for name, err in fetch_errors.items():
+            print(f"[{symbol}] Error fetching {name}: {err}")
+
+        # Spot and chain are required; candles and VIX degrade to "N/A".
+        if "spot" not in inputs or "chain" not in inputs:
+            print(f"[{symbol}] Analysis aborted: spot price or option chain unavailable.")
+            return OUTCOME_ABORTED
+
+        spot = inputs["spot"]
+        if symbol == PRIMARY_SYMBOL:
+            vix_quote = inputs.get("vix") or {}
+            cycle_marks.update(spot=spot, vix=vix_quote.get("last"))
+        metrics.payload_items.observe(sum(len(options or ()) for _, options in inputs["chain"]),
+                                      symbol=symbol, kind="contracts")
+        if "candles" in inputs:
+            metrics.payload_items.observe(len(inputs["candles"]), symbol=symbol, kind="candles")
+
+        # Parse all expirations once into shared columns; every aggregation below reuses them
+        with metrics.span("parse_chain", symbol):
+            chain = OptionChain.from_expirations(inputs["chain"])
+
+        # Candle indicators: only bars since the last run are applied
+        ind = None
+        if "candles" in inputs:
+            with metrics.span("indicators", symbol):
+                ind = indicator_engine.update(symbol, CANDLE_INTERVAL, inputs["candles"])
+
+        # fill_chain_greeks replaces the IV/greek columns with filled ones;
+        # the shallow copy keeps Tradier's raw columns for the snapshot store
+        raw_chain = copy.copy(chain)
+        with metrics.span("compute", symbol):
+            market_data = build_market_data(symbol, spot, chain, ind, inputs.get("vix"),
+                                            chain.years_to_expiry(default=today))
+        market_data["iv_rank"] = iv_history.record(symbol, today, market_data["atm_iv"], now_et())
+        intraday_history.add(symbol, fetched_at, spot, chain,
+                             {"total_gex": market_data["gex_profile"].get("total_gex"),
+                              "zero_gamma": market_data["zero_gamma"]})
+        _update_live_context(symbol, chain, spot, market_data["gex_profile"])
         
-        latest_analysis = {
-            "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(),
-            "text": analysis_text,
-            "data": market_data
-        }
+        analysis = generate_analysis(market_data)
+        metrics.signal_latency_seconds.observe(time.time() - fetched_at, symbol=symbol)
+        metrics.last_signal_timestamp.set(time.time(), symbol=symbol)
+
+        if SNAPSHOT_STORE_ENABLED:
+            with metrics.span("snapshot_enqueue", symbol):
+                snapshot_store.record_cycle(
+                    today, run_id, fetched_at, symbol, chain=raw_chain, candles=inputs.get("candles"),
+                    interval=CANDLE_INTERVAL, spot=spot,
+                    vix=market_data["vix_current"] if isinstance(market_data["vix_current"], (int, float)) else None,
+                    quotes={"vix": inputs.get("vix")}, indicators=ind, analysis=analysis["text"])
         
-        # Auto-save to disk
-        from .storage_service import save_analysis_to_disk
-        path, err = save_analysis_to_disk(latest_analysis)
-        if path:
-            print(f"Auto-saved analysis to {path}")
-        else:
-            print(f"Failed to auto-save: {err}")
+        # Auto-save to disk (a reused analysis is already in the report)
+        if not analysis.get("cached"):
+            from .storage_service import save_analysis_to_disk
+            with metrics.span("report_enqueue", symbol):
+                path, err = save_analysis_to_disk(analysis)
+            if path:
+                print(f"Queued analysis for {path}")
+            else:
+                print(f"Failed to auto-save: {err}")
             
-        print("Analysis complete.")
+        print(f"[{symbol}] Analysis complete.")
+        return OUTCOME_COMPLETED
         
     except Exception as e:
-        print(f"Error in analysis job: {e}")
+        print(f"[{symbol}] Error in analysis job: {e}")
+        return OUTCOME_ERROR
+
+def generate_analysis(market_data):
+    """Streams the LLM analysis into the symbol's latest analysis as it is
+    generated.
+
+    Clients get an "analysis_start" event with the market data, one
+    "analysis_delta" per chunk and a final "analysis" event once the text
+    is complete. With structured output the reply is JSON, so only its
+    summary is streamed; the final analysis replaces it with the rendered
+    text and carries the parsed fields ("structured"). Returns the final
+    analysis dict.
+
+    If the quantized inputs match an analysis generated within the cache's
+    max age, that text is reused without calling the LLM ("cached": True).
+    On a rate-limit error the symbol's last good text is served instead
+    ("stale": True).
+    """
+    symbol = market_data["symbol"]
+    timestamp = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    key = feature_key(market_data)
+    if LLM_CACHE_ENABLED:
+        cached = analysis_cache.get(key)
+        if cached is not None:
+            metrics.llm_cache_total.inc(result="hit")
+            final = {"timestamp": timestamp, "text": cached["text"], "data": market_data,
+                     "structured": cached["structured"], "cached": True, "generated_at": cached["generated_at"]}
+            set_latest_analysis(symbol, final)
+            return final
+        metrics.llm_cache_total.inc(result="miss")
+
+    analysis = {"timestamp": timestamp, "text": "", "data": market_data, "partial": True}
+    set_latest_analysis(symbol, analysis, event="analysis_start")
+
+    chunks = []
+    streamed = ""
+    try:
+        with metrics.span("llm", symbol):
+            started = time.perf_counter()
+            for chunk in analyze_market_stream(market_data):
+                if not chunks:
+                    metrics.stage_seconds.observe(time.perf_counter() - started, stage="llm_first_token", symbol=symbol)
+                chunks.append(chunk)
+                text = partial_text("".join(chunks))
+                if len(text) > len(streamed):
+                    delta, streamed = text[len(streamed):], text
+                    set_latest_analysis(symbol, dict(analysis, text=streamed), event=None)
+                    broadcaster.publish("analysis_delta", {"symbol": symbol, "timestamp": timestamp, "delta": delta})
+        text, structured = finish_analysis("".join(chunks))
+        final = {"timestamp": timestamp, "text": text, "data": market_data, "structured": structured}
+        # An unparsed structured reply is shown once but never reused
+        if cacheable(text, structured):
+            analysis_cache.put(key, symbol, text, timestamp, structured)
+    except LLMError as e:
+        print(f"[{symbol}] LLM generation failed: {e}")
+        metrics.llm_errors_total.inc(rate_limited=str(e.rate_limited).lower())
+        previous = analysis_cache.last_good(symbol) if e.rate_limited else None
+        if previous is not None:
+            metrics.llm_cache_total.inc(result="stale")
+            final = {"timestamp": timestamp, "text": previous["text"], "data": market_data,
+                     "structured": previous["structured"], "cached": True, "stale": True,
+                     "generated_at": previous["generated_at"]}
+        else:
+            final = {"timestamp": timestamp, "text": error_text(e), "data": market_data}
+    except Exception as e:
+        # Never leave the partial analysis from analysis_start in place
+        set_latest_analysis(symbol, {"timestamp": timestamp, "text": f"Error generating analysis: {e}",
+                                     "data": market_data})
+        raise
+
+    set_latest_analysis(symbol, final)
+    return final
+
+def market_phase(now=None):
+    """"closed", "open" (opening window), "close" (closing window) or "regular"."""
+    now = now or now_et()
+    hours = session_hours(now.date())
+    if hours is None or not hours[0] <= now < hours[1]:
+        return "closed"
+    if now < hours[0] + datetime.timedelta(minutes=OPEN_WINDOW_MINUTES):
+        return "open"
+    if now >= hours[1] - datetime.timedelta(minutes=CLOSE_WINDOW_MINUTES):
+        return "close"
+    return "regular"
+
+def _pct_change(current, previous):
+    try:
+        return abs(float(current) - float(previous)) / abs(float(previous)) * 100
+    except (TypeError, ValueError, ZeroDivisionError):
+        return 0.0
+
+def detect_spike():
+    """Reason string if spot or VIX moved past the spike thresholds since the
+    last cycle, else None. Uses the live stream when it is running, otherwise
+    (cached) quotes."""
+    if cycle_marks["spot"] is None:
+        return None
+    if stream_ingestor is not None:
+        spot = stream_ingestor.snapshot.get(PRIMARY_SYMBOL).get("last")
+        vix = stream_ingestor.snapshot.get("VIX").get("last")
+    else:
+        try:
+            spot = get_spot_price(PRIMARY_SYMBOL)
+            vix = (get_quote("VIX") or {}).get("last")
+        except Exception as e:
+            print(f"Spike check failed: {e}")
+            return None
+    spot_move = _pct_change(spot, cycle_marks["spot"])
+    if spot_move >= SPIKE_SPOT_PCT:
+        return f"spot moved {spot_move:.2f}%"
+    vix_move = _pct_change(vix, cycle_marks["vix"])
+    if vix_move >= SPIKE_VIX_PCT:
+        return f"VIX moved {vix_move:.1f}%"
+    return None
+
+def scheduler_tick():
+    """Runs every SCHEDULER_TICK_SECONDS and starts a cycle when one is due
+    for the current session phase."""
+    global last_cycle_attempt
+    now = now_et()
+    phase = market_phase(now)
+    schedule_state.update(phase=phase, next_open=next_open(now).isoformat())
+    if phase == "closed" and not SCHEDULE_OFF_HOURS:
+        schedule_state.update(cadence_minutes=None, reason="market closed")
+        return
+
+    cadence = CADENCE_FAST_MINUTES if phase in ("open", "close") else CADENCE_NORMAL_MINUTES
+    reason = f"{phase} session"
+    # Manual runs count too, so a triggered analysis resets the clock
+    last_times = [t for t in (last_cycle_attempt, last_analysis_time) if t is not None]
+    elapsed = (datetime.datetime.now() - max(last_times)).total_seconds() / 60 if last_times else None
+
+    if elapsed is not None and cadence > CADENCE_FAST_MINUTES and elapsed >= CADENCE_FAST_MINUTES and not is_paused:
+        spike = detect_spike()
+        if spike:
+            cadence, reason = CADENCE_FAST_MINUTES, spike
+    schedule_state.update(cadence_minutes=cadence, reason=reason)
+
+    if elapsed is not None and elapsed < cadence:
+        return
+    last_cycle_attempt = datetime.datetime.now()
+    print(f"[{now}] Cycle due ({reason}, every {cadence:g} min)")
+    job_analyze_market()
 
 scheduler = BackgroundScheduler()
-scheduler.add_job(job_analyze_market, 'interval', minutes=10)
 
-def get_latest_analysis_data():
-    return latest_analysis
+def set_latest_analysis(symbol, analysis, event="analysis"):
+    """Replaces the symbol's latest analysis and, unless event is None,
+    pushes it to connected clients under that event name."""
+    global analysis_version
+    with analysis_lock:
+        latest_analyses[symbol] = analysis
+        analysis_version += 1
+    if event:
+        broadcaster.publish(event, analysis)
+
+def get_latest_analysis_data(symbol=None):
+    symbol = (symbol or PRIMARY_SYMBOL).upper()
+    return latest_analyses.get(symbol) or dict(WAITING_ANALYSIS, data={"symbol": symbol})
+
+def get_all_latest_analyses():
+    return {symbol: get_latest_analysis_data(symbol) for symbol in SYMBOLS}
+
+def get_latest_analysis_version():
+    return analysis_version
 
 def start_scheduler():
+    if indicator_engine.restore():
+        print("Restored indicator state from checkpoint.")
     scheduler.start()
-    # Run once immediately for testing
-    scheduler.add_job(job_analyze_market, 'date', run_date=datetime.datetime.now() + datetime.timedelta(seconds=5))
+    # First tick shortly after startup: runs a cycle right away if the market is open
+    scheduler.add_job(scheduler_tick, 'interval', seconds=SCHEDULER_TICK_SECONDS, max_instances=1, coalesce=True,
+                      next_run_time=datetime.datetime.now() + datetime.timedelta(seconds=5))
+    scheduler.add_job(indicator_engine.checkpoint, 'interval', seconds=INDICATOR_CHECKPOINT_SECONDS,
+                      max_instances=1, coalesce=True)
 
 def pause_analysis():
     global is_paused
     is_paused = True
     print("Scheduler PAUSED.")
+    broadcaster.publish("status", get_scheduler_status())
 
 def resume_analysis():
     global is_paused
     is_paused = False
     print("Scheduler RESUMED.")
-    # Optionally trigger one immediately
-    job_analyze_market()
+    broadcaster.publish("status", get_scheduler_status())
 
 def get_scheduler_status():
-    return {"paused": is_paused}
+    return {"paused": is_paused, "symbols": SYMBOLS, "last_cycle": dict(last_cycle_outcomes),
+            "schedule": dict(schedule_state), "running": cycle_lock.locked()}
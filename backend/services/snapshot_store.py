@@ -0,0 +1,268 @@
+import datetime
+import json
+import os
+import pathlib
+import queue
+import re
+import sqlite3
+import threading
+import numpy as np
+
+STORE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
+WRITE_BATCH_SIZE = int(os.getenv("STORE_BATCH_SIZE", "50"))
+WRITE_FLUSH_SECONDS = float(os.getenv("STORE_FLUSH_SECONDS", "2"))
+
+# One append-only table per record kind. Chain rows are stored one contract
+# per row so range queries by time and strike hit an index directly.
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS cycles (
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    spot REAL,
+    vix REAL,
+    quotes TEXT,
+    indicators TEXT,
+    analysis TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_cycles_symbol_ts ON cycles (symbol, ts);
+
+CREATE TABLE IF NOT EXISTS chain_rows (
+    run_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    symbol TEXT NOT NULL,
+    option_symbol TEXT,
+    strike REAL NOT NULL,
+    is_call INTEGER NOT NULL,
+    open_interest REAL,
+    volume REAL,
+    bid REAL,
+    ask REAL,
+    iv REAL,
+    gamma REAL,
+    delta REAL,
+    expiration TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_chain_symbol_ts_strike ON chain_rows (symbol, ts, strike);
+
+CREATE TABLE IF NOT EXISTS candles (
+    symbol TEXT NOT NULL,
+    interval TEXT NOT NULL,
+    ts REAL NOT NULL,
+    open REAL,
+    high REAL,
+    low REAL,
+    close REAL,
+    volume REAL,
+    PRIMARY KEY (symbol, interval, ts)
+);
+"""
+
+_DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+
+def _nan_to_none(values):
+    return [None if v != v else float(v) for v in values]
+
+class SnapshotStore:
+    """Embedded time-series store for everything a cycle fetched and produced.
+
+    Rows go into per-date SQLite files (data/snapshots_YYYY-MM-DD.db) in WAL
+    mode. Writers only enqueue; a single background thread drains the queue
+    and commits rows in batches of up to WRITE_BATCH_SIZE records or every
+    WRITE_FLUSH_SECONDS, so disk I/O stays off the analysis path.
+    """
+
+    def __init__(self, base_dir=STORE_DIR, batch_size=WRITE_BATCH_SIZE, flush_seconds=WRITE_FLUSH_SECONDS):
+        self.base_dir = base_dir
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _path(self, date_str):
+        """Database file for date_str; raises ValueError unless it is an ISO
+        YYYY-MM-DD date, so request input never reaches the path."""
+        if not isinstance(date_str, str) or not _DATE_RE.fullmatch(date_str):
+            raise ValueError(f"Invalid snapshot date: {date_str!r}")
+        datetime.date.fromisoformat(date_str)
+        return os.path.join(self.base_dir, f"snapshots_{date_str}.db")
+
+    def _connect(self, date_str):
+        """Writer connection: creates the file and brings the schema up to date."""
+        path = self._path(date_str)
+        os.makedirs(self.base_dir, exist_ok=True)
+        conn = sqlite3.connect(path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(_SCHEMA)
+        # Files written before multi-expiry support lack the expiration column
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(chain_rows)")}
+        if "expiration" not in columns:
+            conn.execute("ALTER TABLE chain_rows ADD COLUMN expiration TEXT")
+        return conn
+
+    def _connect_reader(self, date_str):
+        """Read-only connection, or None if nothing was recorded that day.
+        Readers never create files or touch the schema."""
+        path = self._path(date_str)
+        if not os.path.exists(path):
+            return None
+        return sqlite3.connect(pathlib.Path(path).resolve().as_uri() + "?mode=ro", uri=True)
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="snapshot-writer", daemon=True)
+                self._thread.start()
+
+    def record_cycle(self, date_str, run_id, ts, symbol, chain=None, candles=None, interval=None,
+                     spot=None, vix=None, quotes=None, indicators=None, analysis=None):
+        """Queues one cycle's data. chain is an OptionChain; candles the raw
+        timesales bars."""
+        self.start()
+        records = [("cycles", (run_id, ts, symbol, spot, vix,
+                               json.dumps(quotes, default=str) if quotes is not None else None,
+                               json.dumps(indicators, default=str) if indicators is not None else None,
+                               analysis))]
+        if chain is not None and len(chain):
+            # Columns are converted in bulk, then zipped into row tuples
+            n = len(chain)
+            rows = list(zip(
+                [run_id] * n, [ts] * n, [symbol] * n, chain.symbols,
+                chain.strike.tolist(), chain.is_call.astype(int).tolist(),
+                _nan_to_none(chain.open_interest), _nan_to_none(chain.volume),
+                _nan_to_none(chain.bid), _nan_to_none(chain.ask), _nan_to_none(chain.iv),
+                _nan_to_none(chain.gamma), _nan_to_none(chain.delta),
+                np.array(chain.expirations, dtype=object)[chain.expiry].tolist(),
+            ))
+            records.append(("chain_rows", rows))
+        if candles:
+            rows = [(symbol, interval, float(bar["timestamp"]), bar.get("open"), bar.get("high"),
+                     bar.get("low"), bar.get("close"), bar.get("volume"))
+                    for bar in candles if bar.get("timestamp") is not None]
+            records.append(("candles", rows))
+        self.queue.put((date_str, records))
+
+    def flush(self, timeout=10):
+        """Blocks until everything queued so far has been written."""
+        done = threading.Event()
+        self.start()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            markers = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=self.flush_seconds if len(batch) == 1 else 0.05))
+                except queue.Empty:
+                    break
+
+            by_date = {}
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    continue
+                date_str, records = item
+                by_date.setdefault(date_str, []).extend(records)
+
+            for date_str, records in by_date.items():
+                try:
+                    self._write(date_str, records)
+                except Exception as e:
+                    print(f"Snapshot store write failed for {date_str}: {e}")
+            for marker in markers:
+                marker.set()
+
+    def _write(self, date_str, records):
+        conn = self._connect(date_str)
+        try:
+            with conn:
+                for table, rows in records:
+                    if table == "cycles":
+                        conn.execute("INSERT INTO cycles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    elif table == "chain_rows":
+                        conn.executemany("INSERT INTO chain_rows VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+                    elif table == "candles":
+                        conn.executemany("INSERT OR REPLACE INTO candles VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        finally:
+            conn.close()
+
+    def available_dates(self):
+        if not os.path.isdir(self.base_dir):
+            return []
+        return sorted(name[len("snapshots_"):-len(".db")] for name in os.listdir(self.base_dir)
+                      if name.startswith("snapshots_") and name.endswith(".db"))
+
+    def query_cycles(self, date_str, symbol, start_ts=None, end_ts=None):
+        conn = self._connect_reader(date_str)
+        if conn is None:
+            return []
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM cycles WHERE symbol = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (symbol, start_ts if start_ts is not None else float("-inf"),
+                 end_ts if end_ts is not None else float("inf"))).fetchall()
+        finally:
+            conn.close()
+        result = []
+        for row in rows:
+            record = dict(row)
+            for key in ("quotes", "indicators"):
+                if record[key]:
+                    record[key] = json.loads(record[key])
+            result.append(record)
+        return result
+
+    def query_chain(self, date_str, symbol, start_ts=None, end_ts=None, strike_min=None, strike_max=None):
+        """Chain rows for a time and strike range as a dict of NumPy columns."""
+        columns = ("ts", "option_symbol", "strike", "is_call", "open_interest", "volume",
+                   "bid", "ask", "iv", "gamma", "delta", "expiration")
+        conn = self._connect_reader(date_str)
+        if conn is None:
+            return {name: np.empty(0) for name in columns}
+        try:
+            # Files written before multi-expiry support lack the expiration column
+            present = {row[1] for row in conn.execute("PRAGMA table_info(chain_rows)")}
+            select = [name if name in present else f"NULL AS {name}" for name in columns]
+            rows = conn.execute(
+                f"SELECT {', '.join(select)} FROM chain_rows "
+                "WHERE symbol = ? AND ts >= ? AND ts <= ? AND strike >= ? AND strike <= ? ORDER BY ts, expiration, strike",
+                (symbol,
+                 start_ts if start_ts is not None else float("-inf"),
+                 end_ts if end_ts is not None else float("inf"),
+                 strike_min if strike_min is not None else float("-inf"),
+                 strike_max if strike_max is not None else float("inf"))).fetchall()
+        finally:
+            conn.close()
+        if not rows:
+            return {name: np.empty(0) for name in columns}
+        data = list(zip(*rows))
+        result = {}
+        for name, values in zip(columns, data):
+            if name in ("option_symbol", "expiration"):
+                result[name] = list(values)
+            elif name == "is_call":
+                result[name] = np.array(values, dtype=bool)
+            else:
+                result[name] = np.array(values, dtype=np.float64)
+        return result
+
+    def query_candles(self, date_str, symbol, interval, start_ts=None, end_ts=None):
+        conn = self._connect_reader(date_str)
+        if conn is None:
+            return []
+        try:
+            conn.row_factory = sqlite3.Row
+            rows = conn.execute(
+                "SELECT * FROM candles WHERE symbol = ? AND interval = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (symbol, interval, start_ts if start_ts is not None else float("-inf"),
+                 end_ts if end_ts is not None else float("inf"))).fetchall()
+        finally:
+            conn.close()
+        return [dict(row) for row in rows]
+
+store = SnapshotStore()
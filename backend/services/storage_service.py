@@ -1,53 +1,183 @@
+import datetime
+import gzip
+import json
 import os
+import queue
+import re
+import shutil
+import threading
+from .pricing import MARKET_TZ
+
+REPORTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "reports")
+REPORT_BATCH_SIZE = int(os.getenv("REPORT_BATCH_SIZE", "20"))
+REPORT_FLUSH_SECONDS = float(os.getenv("REPORT_FLUSH_SECONDS", "1"))
+# Day files older than this many days are gzipped; compressed ones are
+# deleted after REPORT_RETENTION_DAYS (0 keeps them forever)
+REPORT_COMPRESS_AFTER_DAYS = int(os.getenv("REPORT_COMPRESS_AFTER_DAYS", "1"))
+REPORT_RETENTION_DAYS = int(os.getenv("REPORT_RETENTION_DAYS", "0"))
+
+_DAY_FILE = re.compile(r"analysis_(\d{4}-\d{2}-\d{2})\.(txt|jsonl)(\.gz)?")
+
+def _report_date(data):
+    # Generate filename based on date only (YYYY-MM-DD)
+    return (data.get("timestamp") or "").split("T")[0] or datetime.date.today().strftime("%Y-%m-%d")
+
+def _format_text(data):
+    timestamp_str = data.get('timestamp')
+    formatted_time = timestamp_str
+    try:
+        if timestamp_str:
+            dt = datetime.datetime.fromisoformat(timestamp_str)
+            formatted_time = dt.astimezone(MARKET_TZ).strftime("%b %d, %Y at %I:%M %p ET")
+    except Exception as e:
+        print(f"Error formatting time for local save: {e}")
+
+    lines = [f"\n{'='*40}\n", f"TIME: {formatted_time}\n"]
+    symbol = (data.get("data") or {}).get("symbol")
+    if symbol:
+        lines.append(f"SYMBOL: {symbol}\n")
+    lines.append(f"{'='*40}\n\n")
+    lines.append(data.get("text"))
+
+    # Append data summary if available
+    if data.get("data"):
+        lines.append("\n\n--- Data Summary ---\n")
+        for k, v in data["data"].items():
+            # Nested structures (e.g. the per-strike GEX profile) are too large for the text report
+            if isinstance(v, dict):
+                continue
+            lines.append(f"{k}: {v}\n")
+    lines.append("\n\n") # Extra spacing between entries
+    return "".join(lines)
+
+def _format_json(data):
+    record = {
+        "timestamp": data.get("timestamp"),
+        "generated_at": data.get("generated_at"),
+        "symbol": (data.get("data") or {}).get("symbol"),
+        "text": data.get("text"),
+        "structured": data.get("structured"),
+        "data": data.get("data"),
+    }
+    return json.dumps(record, default=str) + "\n"
+
+class ReportWriter:
+    """Daily analysis reports, written by one background thread.
+
+    Each analysis goes to reports/analysis_YYYY-MM-DD.txt and, as one JSON
+    object per line, to analysis_YYYY-MM-DD.jsonl. Callers only enqueue;
+    the writer drains the queue in batches of up to REPORT_BATCH_SIZE or
+    every REPORT_FLUSH_SECONDS and opens each file once per batch, so all
+    file access is serialized on that thread. When a new day starts, older
+    day files are gzipped.
+    """
+
+    def __init__(self, base_dir=REPORTS_DIR, batch_size=REPORT_BATCH_SIZE, flush_seconds=REPORT_FLUSH_SECONDS):
+        self.base_dir = base_dir
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._latest_date = None
+
+    def path(self, date_str, ext="txt"):
+        return os.path.join(self.base_dir, f"analysis_{date_str}.{ext}")
+
+    def start(self):
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._writer_loop, name="report-writer", daemon=True)
+                self._thread.start()
+
+    def enqueue(self, data):
+        """Queues the analysis; returns the text report path it will go to."""
+        self.start()
+        date_str = _report_date(data)
+        self.queue.put((date_str, dict(data)))
+        return self.path(date_str)
+
+    def flush(self, timeout=10):
+        """Blocks until everything queued so far has been written."""
+        done = threading.Event()
+        self.start()
+        self.queue.put(done)
+        done.wait(timeout)
+
+    def _writer_loop(self):
+        while True:
+            batch = [self.queue.get()]
+            markers = []
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=self.flush_seconds if len(batch) == 1 else 0.05))
+                except queue.Empty:
+                    break
+
+            by_date = {}
+            for item in batch:
+                if isinstance(item, threading.Event):
+                    markers.append(item)
+                    continue
+                date_str, data = item
+                by_date.setdefault(date_str, []).append(data)
+
+            for date_str, entries in sorted(by_date.items()):
+                try:
+                    self._write(date_str, entries)
+                except Exception as e:
+                    print(f"Report write failed for {date_str}: {e}")
+            if by_date and max(by_date) != self._latest_date:
+                self._latest_date = max(by_date)
+                try:
+                    self.rotate(self._latest_date)
+                except Exception as e:
+                    print(f"Report rotation failed: {e}")
+            for marker in markers:
+                marker.set()
+
+    def _append(self, path, text):
+        # A late entry for a day that was already compressed becomes another
+        # gzip member, which readers see as one continuous file
+        if not os.path.exists(path) and os.path.exists(path + ".gz"):
+            with gzip.open(path + ".gz", "at") as f:
+                f.write(text)
+        else:
+            with open(path, "a") as f:
+                f.write(text)
+
+    def _write(self, date_str, entries):
+        os.makedirs(self.base_dir, exist_ok=True)
+        self._append(self.path(date_str), "".join(_format_text(data) for data in entries))
+        self._append(self.path(date_str, "jsonl"), "".join(_format_json(data) for data in entries))
+
+    def rotate(self, current_date):
+        """Gzips day files older than REPORT_COMPRESS_AFTER_DAYS before
+        current_date and drops compressed ones past REPORT_RETENTION_DAYS."""
+        today = datetime.date.fromisoformat(current_date)
+        compress_before = (today - datetime.timedelta(days=REPORT_COMPRESS_AFTER_DAYS)).isoformat()
+        delete_before = (today - datetime.timedelta(days=REPORT_RETENTION_DAYS)).isoformat() if REPORT_RETENTION_DAYS else None
+        for name in os.listdir(self.base_dir):
+            match = _DAY_FILE.fullmatch(name)
+            if not match:
+                continue
+            path = os.path.join(self.base_dir, name)
+            date_str, compressed = match.group(1), match.group(3)
+            if delete_before and date_str < delete_before:
+                os.remove(path)
+            elif not compressed and date_str < compress_before:
+                with open(path, "rb") as f_in, gzip.open(path + ".gz", "ab") as f_out:
+                    shutil.copyfileobj(f_in, f_out)
+                os.remove(path)
+                print(f"Compressed report {name}")
+
+report_writer = ReportWriter()
 
 def save_analysis_to_disk(data):
-    """Saves the analysis data to a local text file in the 'reports' directory."""
+    """Queues the analysis for the daily report files in the 'reports' directory.
+
+    Returns (path, error) without waiting for the write.
+    """
     if not data or not data.get("text"):
         return None, "No analysis available to save"
-        
-    try:
-        # Create 'reports' directory if not exists
-        # Use absolute path relative to the backend directory
-        base_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        reports_dir = os.path.join(base_dir, "reports")
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Generate filename based on date only (YYYY-MM-DD)
-        date_str = data.get("timestamp", "").split("T")[0]
-        if not date_str:
-            import datetime
-            date_str = datetime.date.today().strftime("%Y-%m-%d")
-            
-        filename = f"analysis_{date_str}.txt"
-        filepath = os.path.join(reports_dir, filename)
-        
-        # Open in append mode
-        with open(filepath, "a") as f:
-            # Format timestamp
-            timestamp_str = data.get('timestamp')
-            formatted_time = timestamp_str
-            try:
-                import datetime
-                from zoneinfo import ZoneInfo
-                if timestamp_str:
-                    dt = datetime.datetime.fromisoformat(timestamp_str)
-                    et_dt = dt.astimezone(ZoneInfo("America/New_York"))
-                    formatted_time = et_dt.strftime("%b %d, %Y at %I:%M %p ET")
-            except Exception as e:
-                print(f"Error formatting time for local save: {e}")
-
-            f.write(f"\n{'='*40}\n")
-            f.write(f"TIME: {formatted_time}\n")
-            f.write(f"{'='*40}\n\n")
-            f.write(data.get("text"))
-            
-            # Append data summary if available
-            if data.get("data"):
-                f.write("\n\n--- Data Summary ---\n")
-                for k, v in data["data"].items():
-                    f.write(f"{k}: {v}\n")
-            f.write("\n\n") # Extra spacing between entries
-            
-        return filepath, None
-    except Exception as e:
-        return None, str(e)
+    return report_writer.enqueue(data), None
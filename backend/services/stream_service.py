@@ -0,0 +1,252 @@
+import abc
+import json
+import os
+import queue
+import threading
+import time
+import requests
+
+STREAM_URL = os.getenv("TRADIER_STREAM_URL", "https://stream.tradier.com/v1/markets/events")
+STREAM_QUEUE_SIZE = int(os.getenv("STREAM_QUEUE_SIZE", "5000"))
+STREAM_RECONNECT_MAX = 30
+
+class QuoteFeed(abc.ABC):
+    """A source of market events. events() yields dicts shaped like Tradier
+    stream messages ({"type": "quote"|"trade"|..., "symbol": ..., ...}) until
+    the feed ends or close() is called."""
+
+    @abc.abstractmethod
+    def events(self, symbols):
+        pass
+
+    def close(self):
+        pass
+
+class TradierStreamFeed(QuoteFeed):
+    """Tradier HTTP market stream (newline-delimited JSON)."""
+
+    def __init__(self, stream_url=STREAM_URL, read_timeout=30):
+        self.stream_url = stream_url
+        self.read_timeout = read_timeout
+        self._response = None
+
+    def events(self, symbols):
+        from .tradier_service import HEADERS, create_stream_session, CONNECT_TIMEOUT
+
+        _, session_id = create_stream_session()
+        data = {
+            "sessionid": session_id,
+            "symbols": ",".join(symbols),
+            "filter": "quote,trade,summary",
+            "linebreak": "true",
+        }
+        self._response = requests.post(self.stream_url, data=data, headers=HEADERS, stream=True,
+                                       timeout=(CONNECT_TIMEOUT, self.read_timeout))
+        self._response.raise_for_status()
+        for line in self._response.iter_lines():
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+    def close(self):
+        if self._response is not None:
+            self._response.close()
+
+class ReplayFeed(QuoteFeed):
+    """Replays recorded events from a list or a JSONL file, optionally paced
+    by their "ts" field (seconds) divided by speed, then goes quiet until
+    closed. Used for local development and tests without network access.
+
+    close() ends the current subscription, or the next one if none is
+    running. A new events() call resumes the recording where the previous
+    subscription stopped, like reconnecting to a live stream.
+    """
+
+    def __init__(self, source, speed=None):
+        self.source = source
+        self.speed = speed
+        self._closed = threading.Event()
+        self._pending = self._records()
+        self._prev_ts = None
+
+    def _records(self):
+        if isinstance(self.source, str):
+            with open(self.source) as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+        else:
+            yield from self.source
+
+    def events(self, symbols):
+        wanted = set(symbols)
+        try:
+            while not self._closed.is_set():
+                event = next(self._pending, None)
+                if event is None:
+                    # Stay connected but quiet once the recording is exhausted
+                    self._closed.wait()
+                    break
+                if self.speed and event.get("ts") is not None:
+                    if self._prev_ts is not None:
+                        time.sleep(max(0.0, (event["ts"] - self._prev_ts) / self.speed))
+                    self._prev_ts = event["ts"]
+                if not wanted or event.get("symbol") in wanted:
+                    yield event
+        finally:
+            # The close that ended this subscription doesn't carry over to the next
+            self._closed.clear()
+
+    def close(self):
+        self._closed.set()
+
+class LiveSnapshot:
+    """Latest quote/trade fields per symbol."""
+
+    def __init__(self):
+        self._data = {}
+        self._lock = threading.Lock()
+
+    def apply(self, event):
+        """Merges an event; returns True if any stored value changed."""
+        symbol = event.get("symbol")
+        kind = event.get("type")
+        if not symbol or kind not in ("quote", "trade", "summary"):
+            return False
+
+        if kind == "quote":
+            fields = {"bid": event.get("bid"), "ask": event.get("ask")}
+        elif kind == "trade":
+            fields = {"last": event.get("last") or event.get("price"), "volume": event.get("cvol")}
+        else:
+            fields = {"open": event.get("open"), "high": event.get("high"),
+                      "low": event.get("low"), "prev_close": event.get("prevClose")}
+        fields = {k: _to_float(v) for k, v in fields.items() if v is not None}
+
+        with self._lock:
+            current = self._data.setdefault(symbol, {})
+            changed = any(current.get(k) != v for k, v in fields.items())
+            if changed:
+                current.update(fields)
+                current["updated_at"] = time.time()
+            return changed
+
+    def get(self, symbol):
+        with self._lock:
+            return dict(self._data.get(symbol, {}))
+
+    def all(self):
+        with self._lock:
+            return {symbol: dict(fields) for symbol, fields in self._data.items()}
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return value
+
+class StreamIngestor:
+    """Consumes a QuoteFeed on a reader thread into a bounded queue and
+    applies events to a LiveSnapshot on a processor thread.
+
+    When the queue is full the oldest event is dropped (quotes are
+    superseded by newer ones anyway) and counted. The processor drains
+    everything queued before notifying listeners, so a burst of ticks
+    triggers one recompute with the changed symbols rather than one each.
+    """
+
+    def __init__(self, feed, symbols=(), max_queue=STREAM_QUEUE_SIZE):
+        self.feed = feed
+        self.snapshot = LiveSnapshot()
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.listeners = []
+        self.stats = {"received": 0, "dropped": 0, "applied": 0, "reconnects": 0}
+        self._symbols = list(symbols)
+        self._resubscribe = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+
+    def add_listener(self, callback):
+        """callback(changed_symbols, snapshot) runs on the processor thread."""
+        self.listeners.append(callback)
+
+    def set_symbols(self, symbols):
+        symbols = list(dict.fromkeys(symbols))
+        if symbols != self._symbols:
+            self._symbols = symbols
+            self._resubscribe.set()
+            self.feed.close()
+
+    def start(self):
+        for target, name in ((self._read_loop, "stream-reader"), (self._process_loop, "stream-processor")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        self._stop.set()
+        self.feed.close()
+
+    def _enqueue(self, event):
+        self.stats["received"] += 1
+        while True:
+            try:
+                self.queue.put_nowait(event)
+                return
+            except queue.Full:
+                try:
+                    self.queue.get_nowait()
+                    self.stats["dropped"] += 1
+                except queue.Empty:
+                    pass
+
+    def _read_loop(self):
+        delay = 1
+        while not self._stop.is_set():
+            self._resubscribe.clear()
+            if not self._symbols:
+                self._resubscribe.wait(1)
+                continue
+            try:
+                for event in self.feed.events(self._symbols):
+                    if self._stop.is_set() or self._resubscribe.is_set():
+                        break
+                    self._enqueue(event)
+                    delay = 1
+            except Exception as e:
+                if not self._stop.is_set() and not self._resubscribe.is_set():
+                    print(f"Stream feed error: {e}")
+            if self._stop.is_set():
+                break
+            if not self._resubscribe.is_set():
+                # Feed ended or failed: reconnect with capped backoff
+                self.stats["reconnects"] += 1
+                self._stop.wait(delay)
+                delay = min(delay * 2, STREAM_RECONNECT_MAX)
+
+    def _process_loop(self):
+        while not self._stop.is_set():
+            try:
+                event = self.queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+
+            changed = set()
+            while True:
+                if self.snapshot.apply(event):
+                    changed.add(event["symbol"])
+                self.stats["applied"] += 1
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if changed:
+                for callback in self.listeners:
+                    try:
+                        callback(changed, self.snapshot)
+                    except Exception as e:
+                        print(f"Stream listener error: {e}")
@@ -0,0 +1,238 @@
+import copy
+import datetime
+import json
+import os
+import threading
+from collections import deque
+
+class IndicatorState:
+    """O(1) running state for one symbol/interval bar series.
+
+    Maintains Wilder RSI, EMA-based MACD (same recursion as pandas
+    ewm(adjust=False)), Wilder ATR and session VWAP. Bars are applied one
+    at a time with update(); values() reads the current indicators,
+    optionally including a still-forming bar without committing it.
+    """
+
+    def __init__(self, rsi_period=14, macd_fast=12, macd_slow=26, macd_signal=9, atr_period=14, trend_bars=5):
+        self.rsi_period = rsi_period
+        self.macd_fast = macd_fast
+        self.macd_slow = macd_slow
+        self.macd_signal = macd_signal
+        self.atr_period = atr_period
+        self.trend_bars = trend_bars
+
+        self.bars = 0
+        self.last_timestamp = None
+        self.last_time = None
+        self.prev_close = None
+        self.recent_closes = deque(maxlen=trend_bars)
+
+        # RSI: sums while seeding, Wilder averages afterwards
+        self.rsi_count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+        self.ema_fast = None
+        self.ema_slow = None
+        self.ema_signal = None
+
+        self.atr_count = 0
+        self.atr = 0.0
+
+        self.vwap_session = None
+        self.cum_pv = 0.0
+        self.cum_volume = 0.0
+
+    def update(self, bar):
+        close = float(bar["close"])
+        high = float(bar.get("high", close))
+        low = float(bar.get("low", close))
+        volume = float(bar.get("volume") or 0)
+
+        if self.prev_close is not None:
+            change = close - self.prev_close
+            gain = max(change, 0.0)
+            loss = max(-change, 0.0)
+            p = self.rsi_period
+            if self.rsi_count < p:
+                self.avg_gain += gain / p
+                self.avg_loss += loss / p
+            else:
+                self.avg_gain = (self.avg_gain * (p - 1) + gain) / p
+                self.avg_loss = (self.avg_loss * (p - 1) + loss) / p
+            self.rsi_count += 1
+
+        if self.ema_fast is None:
+            self.ema_fast = self.ema_slow = close
+        else:
+            self.ema_fast += (close - self.ema_fast) * 2 / (self.macd_fast + 1)
+            self.ema_slow += (close - self.ema_slow) * 2 / (self.macd_slow + 1)
+        macd = self.ema_fast - self.ema_slow
+        if self.ema_signal is None:
+            self.ema_signal = macd
+        else:
+            self.ema_signal += (macd - self.ema_signal) * 2 / (self.macd_signal + 1)
+
+        if self.prev_close is None:
+            true_range = high - low
+        else:
+            true_range = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        p = self.atr_period
+        if self.atr_count < p:
+            self.atr += true_range / p
+        else:
+            self.atr = (self.atr * (p - 1) + true_range) / p
+        self.atr_count += 1
+
+        session = _bar_time(bar)[:10]
+        if session != self.vwap_session:
+            self.vwap_session = session
+            self.cum_pv = 0.0
+            self.cum_volume = 0.0
+        self.cum_pv += (high + low + close) / 3 * volume
+        self.cum_volume += volume
+
+        self.prev_close = close
+        self.recent_closes.append(close)
+        self.last_timestamp = _bar_timestamp(bar)
+        self.last_time = _bar_time(bar)
+        self.bars += 1
+
+    def values(self, pending=None):
+        """Current indicator values; a pending bar is applied to a copy."""
+        if pending is not None:
+            state = copy.deepcopy(self)
+            state.update(pending)
+            return state.values()
+
+        rsi = None
+        if self.rsi_count >= self.rsi_period:
+            if self.avg_loss == 0:
+                rsi = 100.0
+            else:
+                rsi = 100 - 100 / (1 + self.avg_gain / self.avg_loss)
+
+        macd = None
+        if self.bars >= self.macd_slow:
+            line = self.ema_fast - self.ema_slow
+            macd = {"macd": line, "signal": self.ema_signal, "histogram": line - self.ema_signal}
+
+        trend = None
+        if len(self.recent_closes) >= 2:
+            start_p, end_p = self.recent_closes[0], self.recent_closes[-1]
+            trend = "Up" if end_p > start_p else "Down" if end_p < start_p else "Flat"
+
+        return {
+            "rsi": rsi,
+            "macd": macd,
+            "atr": self.atr if self.atr_count >= self.atr_period else None,
+            "vwap": self.cum_pv / self.cum_volume if self.cum_volume else None,
+            "trend": trend,
+            "bars": self.bars,
+            "last_time": self.last_time,
+        }
+
+    def to_dict(self):
+        data = dict(self.__dict__)
+        data["recent_closes"] = list(self.recent_closes)
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        state = cls()
+        state.__dict__.update(data)
+        state.recent_closes = deque(data.get("recent_closes", []), maxlen=state.trend_bars)
+        return state
+
+def _bar_time(bar):
+    return str(bar.get("time", ""))
+
+def _bar_timestamp(bar):
+    ts = bar.get("timestamp")
+    if ts is not None:
+        return int(ts)
+    return int(datetime.datetime.fromisoformat(_bar_time(bar)).timestamp())
+
+class IndicatorEngine:
+    """Keeps one IndicatorState per (symbol, interval) and feeds it only the
+    bars it has not seen yet.
+
+    The newest bar returned by the API may still be forming, so it is never
+    committed: it is shown through values(pending=...) and re-fetched next
+    cycle, which starts from the last committed bar. State is per session:
+    the first bar of a new date starts a fresh IndicatorState, so the prior
+    day's bars do not seed today's RSI, MACD, ATR or VWAP.
+    """
+
+    def __init__(self, checkpoint_path=None):
+        self.checkpoint_path = checkpoint_path
+        self.states = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+
+    def fetch_start(self, symbol, interval):
+        """Start time ("YYYY-MM-DD HH:MM") for the next timesales request, or
+        None when the full history is needed."""
+        with self._lock:
+            state = self.states.get((symbol, interval))
+            if state is None or not state.last_time:
+                return None
+            return state.last_time.replace("T", " ")[:16]
+
+    def update(self, symbol, interval, bars):
+        with self._lock:
+            state = self.states.get((symbol, interval))
+            if bars:
+                session = _bar_time(bars[-1])[:10]
+                bars = [b for b in bars if _bar_time(b)[:10] == session]
+                if state is not None and state.last_time and state.last_time[:10] != session:
+                    state = None
+            if state is None:
+                state = self.states[(symbol, interval)] = IndicatorState()
+
+            if state.last_timestamp is not None:
+                bars = [b for b in bars if _bar_timestamp(b) > state.last_timestamp]
+            if not bars:
+                return state.values()
+
+            for bar in bars[:-1]:
+                state.update(bar)
+            if len(bars) > 1:
+                self._dirty = True
+            return state.values(pending=bars[-1])
+
+    def checkpoint(self):
+        """Writes the committed state to disk if it changed since the last
+        checkpoint."""
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            if not self._dirty:
+                return
+            payload = {f"{symbol}|{interval}": state.to_dict() for (symbol, interval), state in self.states.items()}
+            self._dirty = False
+        with self._io_lock:
+            os.makedirs(os.path.dirname(self.checkpoint_path), exist_ok=True)
+            tmp_path = self.checkpoint_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(payload, f)
+            os.replace(tmp_path, self.checkpoint_path)
+
+    def restore(self):
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        try:
+            with open(self.checkpoint_path) as f:
+                payload = json.load(f)
+            states = {}
+            for key, data in payload.items():
+                symbol, interval = key.split("|", 1)
+                states[(symbol, interval)] = IndicatorState.from_dict(data)
+        except Exception as e:
+            print(f"Ignoring unreadable indicator checkpoint: {e}")
+            return False
+        with self._lock:
+            self.states = states
+        return True
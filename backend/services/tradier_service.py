@@ -1,20 +1,160 @@
 import requests
+from requests.adapters import HTTPAdapter
 import os
+import random
+import threading
+import time
 from dotenv import load_dotenv
+from . import metrics
 
 load_dotenv()
 
 TRADIER_TOKEN = os.getenv("TRADIER_API_KEY")
+TRADIER_BASE_URL = os.getenv("TRADIER_BASE_URL", "https://api.tradier.com").rstrip("/")
 HEADERS = {
     "Authorization": f"Bearer {TRADIER_TOKEN}",
     "Accept": "application/json"
 }
 
+# (connect, read) timeouts in seconds. Without a read timeout a stalled socket
+# would block the scheduler thread forever.
+CONNECT_TIMEOUT = float(os.getenv("TRADIER_CONNECT_TIMEOUT", "3.05"))
+READ_TIMEOUT = float(os.getenv("TRADIER_READ_TIMEOUT", "10"))
+MAX_RETRIES = int(os.getenv("TRADIER_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("TRADIER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("TRADIER_BACKOFF_MAX", "8"))
+POOL_SIZE = int(os.getenv("TRADIER_POOL_SIZE", "10"))
+# Overall bound on one request including rate limit waits and retries
+REQUEST_DEADLINE = float(os.getenv("TRADIER_REQUEST_DEADLINE", "20"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+_session = None
+_session_lock = threading.Lock()
+
+def get_session():
+    """Returns the shared keep-alive session, creating it on first use."""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                session = requests.Session()
+                session.headers.update(HEADERS)
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                _session = session
+    return _session
+
+class RateLimitBudget:
+    """Tracks Tradier's X-Ratelimit-* headers and holds requests back when the
+    current window is exhausted, instead of spending them on 429s."""
+
+    def __init__(self, reserve=1):
+        self.reserve = reserve
+        self.available = None
+        self.allowed = None
+        self.expiry = None  # epoch seconds when the window resets
+        self._lock = threading.Lock()
+
+    def update(self, headers):
+        try:
+            available = headers.get("X-Ratelimit-Available")
+            allowed = headers.get("X-Ratelimit-Allowed")
+            expiry = headers.get("X-Ratelimit-Expiry")
+            with self._lock:
+                if available is not None:
+                    self.available = int(available)
+                if allowed is not None:
+                    self.allowed = int(allowed)
+                if expiry is not None:
+                    # Tradier reports the reset time in epoch milliseconds
+                    self.expiry = int(expiry) / 1000.0
+        except (TypeError, ValueError):
+            pass
+
+    def wait_time(self):
+        with self._lock:
+            if self.available is None or self.expiry is None:
+                return 0
+            remaining = self.expiry - time.time()
+            if remaining <= 0:
+                self.available = None
+                return 0
+            if self.available > self.reserve:
+                self.available -= 1
+                return 0
+            return remaining
+
+    def snapshot(self):
+        with self._lock:
+            return {"available": self.available, "allowed": self.allowed, "expiry": self.expiry}
+
+rate_limit = RateLimitBudget()
+
+def _backoff_delay(attempt, retry_after=None):
+    if retry_after:
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            pass
+    # Full jitter: spreads retries from concurrent callers apart
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+def _get(path: str, params: dict, deadline: float = None):
+    """GET with rate limit waits and retries, all within deadline (a
+    time.monotonic() value, REQUEST_DEADLINE from now by default). A wait or
+    retry that would end past it is not made; the last error is raised."""
+    url = f"{TRADIER_BASE_URL}{path}"
+    session = get_session()
+    if deadline is None:
+        deadline = time.monotonic() + REQUEST_DEADLINE
+    attempt = 0
+    while True:
+        delay = rate_limit.wait_time()
+        if delay > 0:
+            delay = min(delay, BACKOFF_MAX)
+            if time.monotonic() + delay >= deadline:
+                raise requests.Timeout(f"Tradier rate limit budget exhausted until after the deadline for {path}")
+            print(f"Tradier rate limit budget exhausted, waiting {delay:.1f}s")
+            time.sleep(delay)
+
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise requests.Timeout(f"Tradier request deadline passed for {path}")
+        started = time.perf_counter()
+        try:
+            resp = session.get(url, params=params, timeout=(CONNECT_TIMEOUT, min(READ_TIMEOUT, remaining)))
+        except (requests.ConnectionError, requests.Timeout) as e:
+            metrics.tradier_errors_total.inc(path=path)
+            delay = _backoff_delay(attempt)
+            if attempt >= MAX_RETRIES or time.monotonic() + delay >= deadline:
+                raise
+            print(f"Tradier request to {path} failed ({e}), retrying")
+            time.sleep(delay)
+            attempt += 1
+            continue
+
+        metrics.tradier_request_seconds.observe(time.perf_counter() - started, path=path)
+        metrics.tradier_requests_total.inc(path=path, status=resp.status_code)
+        metrics.tradier_response_bytes.observe(len(resp.content), path=path)
+        if resp.status_code == 429:
+            metrics.tradier_rate_limited_total.inc(path=path)
+
+        rate_limit.update(resp.headers)
+        if resp.status_code in RETRY_STATUSES and attempt < MAX_RETRIES:
+            delay = _backoff_delay(attempt, resp.headers.get("Retry-After"))
+            if time.monotonic() + delay < deadline:
+                print(f"Tradier {path} returned {resp.status_code}, retrying")
+                time.sleep(delay)
+                attempt += 1
+                continue
+
+        resp.raise_for_status()
+        return resp.json()
+
 def get_spot_price(symbol: str) -> float:
-    url = "https://api.tradier.com/v1/markets/quotes"
-    resp = requests.get(url, headers=HEADERS, params={"symbols": symbol})
-    resp.raise_for_status()
-    data = resp.json()
+    data = _get("/v1/markets/quotes", {"symbols": symbol})
 
     quote = data.get("quotes", {}).get("quote")
     if not quote:
@@ -26,55 +166,66 @@ def get_spot_price(symbol: str) -> float:
     last = quote.get("last")
     if last is not None:
         return float(last)
-    
+
     raise ValueError("Could not determine price")
 
 def get_quote(symbol: str):
-    url = "https://api.tradier.com/v1/markets/quotes"
-    resp = requests.get(url, headers=HEADERS, params={"symbols": symbol})
-    resp.raise_for_status()
-    data = resp.json()
+    data = _get("/v1/markets/quotes", {"symbols": symbol})
     quote = data.get("quotes", {}).get("quote")
     if isinstance(quote, list):
         return quote[0]
     return quote
 
 def fetch_option_chain(symbol: str, expiration: str):
-    url = "https://api.tradier.com/v1/markets/options/chains"
     params = {"symbol": symbol, "expiration": expiration, "greeks": "true"}
-    resp = requests.get(url, headers=HEADERS, params=params)
-    resp.raise_for_status()
-    data = resp.json()
-    
+    data = _get("/v1/markets/options/chains", params)
+
     options = data.get("options")
     if not options:
         return []
-        
+
     option_list = options.get("option")
     if not option_list:
         return []
-        
+
     return option_list
 
+def get_option_expirations(symbol: str):
+    """Listed expiration dates ("YYYY-MM-DD"), all roots (e.g. SPX and SPXW)."""
+    data = _get("/v1/markets/options/expirations", {"symbol": symbol, "includeAllRoots": "true"})
+    dates = (data.get("expirations") or {}).get("date") or []
+    if isinstance(dates, str):
+        return [dates]
+    return dates
+
 def get_historical_candles(symbol: str, interval: str = "1min", start_date: str = None):
     # Use timesales endpoint as it supports intraday intervals reliably for this account
-    url = "https://api.tradier.com/v1/markets/timesales"
     params = {
-        "symbol": symbol, 
+        "symbol": symbol,
         "interval": interval,
         "session_filter": "all"
     }
     if start_date:
         params["start"] = start_date
-        
-    resp = requests.get(url, headers=HEADERS, params=params)
-    resp.raise_for_status()
-    data = resp.json()
-    
+
+    data = _get("/v1/markets/timesales", params)
+
     # Timesales structure: {'series': {'data': [...]}}
     candles = data.get("series", {}).get("data", [])
-    
+
     if not candles:
         return []
-        
+
     return candles
+
+def create_stream_session():
+    """Creates a market streaming session; returns (stream_url, session_id)."""
+    session = get_session()
+    resp = session.post(f"{TRADIER_BASE_URL}/v1/markets/events/session",
+                        timeout=(CONNECT_TIMEOUT, READ_TIMEOUT))
+    rate_limit.update(resp.headers)
+    resp.raise_for_status()
+    stream = resp.json().get("stream") or {}
+    if not stream.get("sessionid"):
+        raise ValueError("No streaming session returned")
+    return stream.get("url"), stream["sessionid"]
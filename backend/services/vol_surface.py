@@ -0,0 +1,189 @@
+import json
+import os
+import threading
+import numpy as np
+from .pricing import implied_vol, bs_greeks
+
+# Quotes with less time value than this (one SPX tick) say nothing reliable
+# about volatility; their IV comes from the interpolated smile instead.
+MIN_TIME_VALUE = 0.05
+SKEW_DELTA = 0.25
+IV_HISTORY_DAYS = 252
+# IV rank compares readings taken in the same slot of the trading day
+IV_SLOT_MINUTES = int(os.getenv("IV_SLOT_MINUTES", "30"))
+
+def _mid(chain):
+    bid, ask = chain.bid, chain.ask
+    valid = (bid >= 0) & (ask > 0) & (ask >= bid)
+    return np.where(valid, (bid + ask) / 2, np.nan)
+
+def _interp_smile(strike, iv, mask):
+    """Fills NaN IVs of the masked contracts by interpolating across strike
+    (flat beyond the quoted wings)."""
+    known = mask & np.isfinite(iv)
+    missing = mask & ~np.isfinite(iv)
+    if known.sum() >= 2 and missing.any():
+        order = np.argsort(strike[known])
+        iv[missing] = np.interp(strike[missing], strike[known][order], iv[known][order])
+
+def fill_chain_greeks(chain, spot, years_to_expiry):
+    """Completes the chain's IV and greeks in place and adds vanna/charm.
+
+    IV is solved from the bid/ask mid for every contract with a usable
+    quote; Tradier's IV is kept where present and the solved one fills the
+    gaps, then anything still missing is interpolated along each side's
+    smile of the same expiration. years_to_expiry is a scalar or per-row
+    array (see OptionChain.years_to_expiry). Delta and gamma are filled
+    from Black-Scholes where Tradier sent none. Returns {"iv_filled",
+    "delta_filled", "gamma_filled"} counts.
+    """
+    if len(chain) == 0:
+        chain.vanna = chain.charm = np.empty(0)
+        return {"iv_filled": 0, "delta_filled": 0, "gamma_filled": 0}
+
+    t = np.broadcast_to(np.asarray(years_to_expiry, dtype=np.float64), chain.strike.shape)
+    iv = chain.iv.copy()
+    missing_iv = ~(iv > 0)
+    mid = _mid(chain)
+    intrinsic = np.where(chain.is_call, np.maximum(spot - chain.strike, 0.0), np.maximum(chain.strike - spot, 0.0))
+    solvable = missing_iv & (mid - intrinsic >= MIN_TIME_VALUE)
+    if solvable.any():
+        iv[solvable] = implied_vol(mid[solvable], spot, chain.strike[solvable], t[solvable], chain.is_call[solvable])
+    iv[~(iv > 0)] = np.nan
+    for i in range(len(chain.expirations)):
+        same_expiry = chain.expiry == i
+        _interp_smile(chain.strike, iv, same_expiry & chain.is_call)
+        _interp_smile(chain.strike, iv, same_expiry & chain.is_put)
+
+    greeks = bs_greeks(spot, chain.strike, iv, t, chain.is_call)
+    missing_delta = np.isnan(chain.delta) & np.isfinite(greeks["delta"])
+    missing_gamma = np.isnan(chain.gamma) & np.isfinite(greeks["gamma"])
+    counts = {
+        "iv_filled": int((missing_iv & np.isfinite(iv)).sum()),
+        "delta_filled": int(missing_delta.sum()),
+        "gamma_filled": int(missing_gamma.sum()),
+    }
+    chain.iv = iv
+    chain.delta = np.where(missing_delta, greeks["delta"], chain.delta)
+    chain.gamma = np.where(missing_gamma, greeks["gamma"], chain.gamma)
+    chain.vanna = greeks["vanna"]
+    chain.charm = greeks["charm"]
+    return counts
+
+def _iv_at(x, xs, ivs):
+    ok = np.isfinite(xs) & np.isfinite(ivs)
+    if ok.sum() < 2:
+        return None
+    order = np.argsort(xs[ok])
+    xs, ivs = xs[ok][order], ivs[ok][order]
+    if not xs[0] <= x <= xs[-1]:
+        return None
+    return float(np.interp(x, xs, ivs))
+
+def smile_summary(chain, spot):
+    """ATM IV, 25-delta risk reversal / butterfly (front expiration) and
+    total vanna/charm exposure over the whole chain (dealer-signed like
+    GEX: calls +, puts -).
+
+    Volatilities are in percent; charm exposure is per calendar day.
+    """
+    summary = {"atm_iv": None, "put_25d_iv": None, "call_25d_iv": None, "skew_25d": None,
+               "butterfly_25d": None, "total_vanna": None, "total_charm": None}
+    if len(chain) == 0:
+        return summary
+
+    _, front = chain.by_expiration()[0]
+    calls, puts = front.is_call, front.is_put
+    atm = [v for v in (_iv_at(spot, front.strike[calls], front.iv[calls]),
+                       _iv_at(spot, front.strike[puts], front.iv[puts])) if v is not None]
+    call_25 = _iv_at(SKEW_DELTA, front.delta[calls], front.iv[calls])
+    put_25 = _iv_at(-SKEW_DELTA, front.delta[puts], front.iv[puts])
+
+    if atm:
+        summary["atm_iv"] = round(100 * sum(atm) / len(atm), 2)
+    if call_25 is not None:
+        summary["call_25d_iv"] = round(100 * call_25, 2)
+    if put_25 is not None:
+        summary["put_25d_iv"] = round(100 * put_25, 2)
+    if call_25 is not None and put_25 is not None:
+        summary["skew_25d"] = round(100 * (put_25 - call_25), 2) + 0.0
+        if atm:
+            summary["butterfly_25d"] = round(100 * ((put_25 + call_25) / 2 - sum(atm) / len(atm)), 2) + 0.0  # no "-0.0"
+
+    vanna = getattr(chain, "vanna", None)
+    charm = getattr(chain, "charm", None)
+    if vanna is not None and charm is not None:
+        weight = np.nan_to_num(chain.open_interest) * 100 * spot * np.where(chain.is_call, 1.0, -1.0)
+        summary["total_vanna"] = round(float(np.nansum(vanna * weight)))
+        summary["total_charm"] = round(float(np.nansum(charm * weight)) / 365)
+    return summary
+
+class IVHistory:
+    """ATM IV readings per symbol, day and IV_SLOT_MINUTES time slot, kept
+    for IV_HISTORY_DAYS, for the IV rank of the current reading.
+
+    ATM IV has an intraday pattern, so the rank compares a reading with the
+    other days' readings from the same time of day (their latest one at or
+    before it), not with their last reading. The JSON file is written when
+    a new day starts and by save(), not on every reading.
+    """
+
+    def __init__(self, path=None, max_days=IV_HISTORY_DAYS, slot_minutes=IV_SLOT_MINUTES):
+        self.path = path
+        self.max_days = max_days
+        self.slot_minutes = slot_minutes
+        self._data = {}  # symbol -> {date: {"HH:MM": iv}}
+        self._latest_date = None
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        if path and os.path.exists(path):
+            try:
+                with open(path) as f:
+                    data = json.load(f)
+                # Files from before time slots hold one float per day; those days are dropped
+                self._data = {symbol: {d: v for d, v in days.items() if isinstance(v, dict)}
+                              for symbol, days in data.items()}
+            except Exception as e:
+                print(f"Ignoring unreadable IV history: {e}")
+
+    def _slot(self, at):
+        minutes = at.hour * 60 + at.minute
+        minutes -= minutes % self.slot_minutes
+        return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+    def record(self, symbol, date_str, atm_iv, at):
+        """Stores the reading taken at `at` (market time) and returns its IV
+        rank (0-100), or None with fewer than two days to compare."""
+        if atm_iv is None:
+            return None
+        slot = self._slot(at)
+        with self._lock:
+            days = self._data.setdefault(symbol, {})
+            days.setdefault(date_str, {})[slot] = atm_iv
+            for old in sorted(days)[:-self.max_days]:
+                del days[old]
+            values = [atm_iv]
+            for day, readings in days.items():
+                earlier = [s for s in readings if s <= slot]
+                if day != date_str and earlier:
+                    values.append(readings[max(earlier)])
+            new_day = self._latest_date is not None and date_str > self._latest_date
+            self._latest_date = max(self._latest_date or date_str, date_str)
+        if new_day:
+            self.save()
+        low, high = min(values), max(values)
+        if len(values) < 2 or high == low:
+            return None
+        return round(100 * (atm_iv - low) / (high - low), 1)
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            payload = json.dumps(self._data)
+        with self._io_lock:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                f.write(payload)
+            os.replace(tmp_path, self.path)
@@ -0,0 +1,208 @@
+import datetime
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import numpy as np
+
+# Offline fakes shared by the tests and benchmark.py: a synthetic 0DTE chain
+# and session of bars, and local HTTP servers standing in for Tradier and
+# Google Docs/Drive.
+
+SPOT = 6000.0
+SESSION_DATE = "2025-11-03"
+
+def synthetic_chain(spot=SPOT, strike_step=5, low_pct=0.5, high_pct=1.3, seed=7):
+    """Tradier-shaped 0DTE chain: every strike from low_pct to high_pct of spot."""
+    rng = np.random.default_rng(seed)
+    strikes = np.arange(round(spot * low_pct / strike_step) * strike_step, spot * high_pct, strike_step)
+    options = []
+    for strike in strikes:
+        moneyness = (strike - spot) / spot
+        iv = 0.12 + 0.9 * moneyness ** 2 - 0.15 * moneyness
+        near = np.exp(-(moneyness / 0.01) ** 2)
+        gamma = 0.02 * near
+        for option_type in ("call", "put"):
+            call = option_type == "call"
+            intrinsic = max(spot - strike, 0) if call else max(strike - spot, 0)
+            mid = intrinsic + 8 * near + 0.05
+            delta = 1 / (1 + np.exp(moneyness * 400)) if call else -1 / (1 + np.exp(-moneyness * 400))
+            options.append({
+                "symbol": f"SPXW251103{'C' if call else 'P'}{int(strike * 1000):08d}",
+                "description": f"SPXW Nov 3 2025 {strike:.0f} {'Call' if call else 'Put'}",
+                "underlying": "SPX",
+                "strike": float(strike),
+                "option_type": option_type,
+                "expiration_date": SESSION_DATE,
+                "bid": round(max(mid - 0.1, 0), 2),
+                "ask": round(mid + 0.1, 2),
+                "last": round(mid, 2),
+                "volume": int(rng.poisson(5000 * near + 5)),
+                "open_interest": int(rng.poisson(3000 * near + 50)),
+                "greeks": {
+                    "delta": float(delta),
+                    "gamma": float(gamma),
+                    "theta": float(-2 * near),
+                    "vega": float(0.3 * near),
+                    "mid_iv": float(iv),
+                    "smv_vol": float(iv),
+                },
+            })
+    return options
+
+def synthetic_timesales(spot=SPOT, bars=390, seed=11):
+    """One regular session of 1-minute bars as a random walk around spot."""
+    rng = np.random.default_rng(seed)
+    start = datetime.datetime.strptime(SESSION_DATE, "%Y-%m-%d").replace(hour=9, minute=30)
+    closes = spot + np.cumsum(rng.normal(0, 1.5, bars))
+    series = []
+    for i, close in enumerate(closes):
+        open_ = closes[i - 1] if i else spot
+        when = start + datetime.timedelta(minutes=i)
+        series.append({
+            "time": when.strftime("%Y-%m-%dT%H:%M:%S"),
+            "timestamp": int(when.timestamp()),
+            "open": round(float(open_), 2),
+            "high": round(float(max(open_, close) + abs(rng.normal(0, 0.5))), 2),
+            "low": round(float(min(open_, close) - abs(rng.normal(0, 0.5))), 2),
+            "close": round(float(close), 2),
+            "price": round(float(close), 2),
+            "volume": int(rng.integers(1000, 5000)),
+            "vwap": round(float(close), 2),
+        })
+    return series
+
+def resample(bars, minutes):
+    """Folds 1-minute bars into minutes-wide bars, as timesales would return."""
+    out = []
+    for i in range(0, len(bars), minutes):
+        group = bars[i:i + minutes]
+        out.append(dict(group[0], high=max(b["high"] for b in group), low=min(b["low"] for b in group),
+                        close=group[-1]["close"], price=group[-1]["close"],
+                        volume=sum(b["volume"] for b in group)))
+    return out
+
+class StubTradier:
+    """Local HTTP server answering the Tradier endpoints the scheduler uses
+    from pre-serialized fixture payloads."""
+
+    def __init__(self, chain, timesales, spot=SPOT):
+        quote = {"symbol": "SPX", "last": spot, "prevclose": spot - 10, "change": 10}
+        vix = {"symbol": "VIX", "last": 16.5, "prevclose": 17.0, "change": -0.5}
+        # Every chain request gets the same fixture, whatever the expiration
+        today = datetime.date.today()
+        expirations = [(today + datetime.timedelta(days=i)).isoformat() for i in range(8)]
+        self.payloads = {
+            "/v1/markets/options/expirations": json.dumps({"expirations": {"date": expirations}}).encode(),
+            "/v1/markets/options/chains": json.dumps({"options": {"option": chain}}).encode(),
+            "quote": json.dumps({"quotes": {"quote": quote}}).encode(),
+            "vix": json.dumps({"quotes": {"quote": vix}}).encode(),
+        }
+        for minutes in (1, 5, 15):
+            self.payloads[f"timesales:{minutes}min"] = json.dumps(
+                {"series": {"data": resample(timesales, minutes)}}).encode()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                query = parse_qs(url.query)
+                if url.path == "/v1/markets/quotes":
+                    key = "vix" if query.get("symbols") == ["VIX"] else "quote"
+                elif url.path == "/v1/markets/timesales":
+                    key = f"timesales:{query.get('interval', ['1min'])[0]}"
+                else:
+                    key = url.path
+                body = stub.payloads.get(key)
+                if body is None:
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+
+class StubGoogleDocs:
+    """Local fake of the Docs/Drive calls made by google_docs_service:
+    Drive file search, document create/get and insertText batchUpdates.
+    Rejects inserts past the end of the document like the real API."""
+
+    def __init__(self):
+        self.documents = {}  # id -> {"title", "text"}
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _reply(self, status, payload):
+                body = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _document(self, doc_id):
+                doc = stub.documents[doc_id]
+                end_index = len(doc["text"].encode("utf-16-le")) // 2 + 2
+                return {"documentId": doc_id, "title": doc["title"], "body": {"content": [{"endIndex": end_index}]}}
+
+            def do_GET(self):
+                stub.requests += 1
+                url = urlparse(self.path)
+                if url.path == "/files":
+                    q = parse_qs(url.query).get("q", [""])[0]
+                    files = [{"id": i, "name": d["title"]} for i, d in stub.documents.items() if f"name = '{d['title']}'" in q]
+                    return self._reply(200, {"files": files})
+                doc_id = url.path.rsplit("/", 1)[-1]
+                if url.path.startswith("/v1/documents/") and doc_id in stub.documents:
+                    return self._reply(200, self._document(doc_id))
+                self._reply(404, {"error": {"code": 404, "message": "not found"}})
+
+            def do_POST(self):
+                stub.requests += 1
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+                path = urlparse(self.path).path
+                if path == "/v1/documents":
+                    doc_id = f"doc{len(stub.documents) + 1}"
+                    stub.documents[doc_id] = {"title": body.get("title", ""), "text": ""}
+                    return self._reply(200, self._document(doc_id))
+                doc_id = path[len("/v1/documents/"):].removesuffix(":batchUpdate")
+                if doc_id not in stub.documents:
+                    return self._reply(404, {"error": {"code": 404, "message": "not found"}})
+                doc = stub.documents[doc_id]
+                for request in body.get("requests", []):
+                    insert = request["insertText"]
+                    if insert["location"]["index"] > self._document(doc_id)["body"]["content"][-1]["endIndex"] - 1:
+                        return self._reply(400, {"error": {"code": 400, "message": "Index out of bounds"}})
+                    doc["text"] += insert["text"]
+                self._reply(200, {"documentId": doc_id, "replies": [{}]})
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
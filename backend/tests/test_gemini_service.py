@@ -0,0 +1,70 @@
+import json
+import pytest
+from services import gemini_service, prompt_builder
+from services.llm_service import LLMError, StubProvider, router
+
+MARKET_DATA = {"symbol": "SPX", "spot_price": 5800.0, "vix_current": 15.2, "vix_change": -0.3}
+
+@pytest.fixture
+def stub_backend():
+    providers = router.providers
+    backend = StubProvider(chunk_size=16)
+    gemini_service.set_backend(backend)
+    yield backend
+    router.set_providers(providers)
+
+def test_stub_streams_in_chunks():
+    chunks = list(StubProvider(text="x" * 50, chunk_size=20).stream("prompt"))
+    assert [len(c) for c in chunks] == [20, 20, 10]
+
+def test_stub_json_reply_is_centered_on_spot():
+    prompt, _ = prompt_builder.build_prompt(MARKET_DATA, structured=True)
+    reply = prompt_builder.parse_analysis("".join(StubProvider().stream(prompt, json_output=True)))
+    assert reply["target"] == 5800
+    assert reply["range"][0] < 5800 < reply["range"][1]
+
+def test_analysis_streams_through_the_router(stub_backend):
+    chunks = list(gemini_service.analyze_market_stream(MARKET_DATA))
+    assert len(chunks) > 1
+    text, structured = gemini_service.finish_analysis("".join(chunks))
+    if gemini_service.STRUCTURED_OUTPUT:
+        assert structured["sentiment"] == "Neutral"
+        assert text.startswith("Market Sentiment: Neutral")
+    else:
+        assert structured is None
+
+def test_failed_generation_returns_error_text(stub_backend):
+    stub_backend.error = LLMError("quota exceeded (429)", rate_limited=True)
+    assert gemini_service.analyze_market(MARKET_DATA).startswith("Analysis unavailable: Rate limit exceeded")
+
+def test_partial_summary_grows_with_the_reply():
+    reply = json.dumps({"summary": 'Pin near "5800" — sell premium.', "sentiment": "Neutral"})
+    seen = [prompt_builder.partial_summary(reply[:i]) for i in range(len(reply) + 1)]
+    assert seen[0] == ""
+    assert all(b.startswith(a) for a, b in zip(seen, seen[1:]))
+    assert seen[-1] == 'Pin near "5800" — sell premium.'
+
+def test_structured_generation_streams_summary(stub_backend, monkeypatch):
+    from services import scheduler
+    monkeypatch.setattr(gemini_service, "STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(scheduler, "LLM_CACHE_ENABLED", False)
+    deltas = []
+    monkeypatch.setattr(scheduler.broadcaster, "publish",
+                        lambda event, data: deltas.append(data["delta"]) if event == "analysis_delta" else None)
+    final = scheduler.generate_analysis(dict(MARKET_DATA))
+    assert len(deltas) > 1
+    assert "".join(deltas) == final["structured"]["summary"]
+
+def test_invalid_structured_reply_is_not_cached(stub_backend, monkeypatch):
+    from services import scheduler
+    monkeypatch.setattr(gemini_service, "STRUCTURED_OUTPUT", True)
+    monkeypatch.setattr(scheduler.broadcaster, "publish", lambda event, data: None)
+    monkeypatch.setattr(scheduler, "analysis_cache", type(scheduler.analysis_cache)())
+    stub_backend.text = '{"summary": "cut off'
+    final = scheduler.generate_analysis(dict(MARKET_DATA))
+    assert final["structured"] is None and final["text"] == stub_backend.text
+    assert scheduler.analysis_cache.last_good("SPX") is None
+
+    stub_backend.text = None
+    final = scheduler.generate_analysis(dict(MARKET_DATA))
+    assert scheduler.analysis_cache.last_good("SPX")["structured"] == final["structured"]
@@ -0,0 +1,81 @@
+import threading
+import pytest
+from tests.fakes import StubGoogleDocs
+from services import google_docs_service as docs
+
+TITLE = "0DTE Analysis - 2026-10-16"
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    server = StubGoogleDocs().start()
+    # No token.json in the working directory: calls go out unauthenticated
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(docs, "GOOGLE_API_ENDPOINT", server.url)
+    monkeypatch.setattr(docs, "_clients", None)
+    docs._daily_doc.clear()
+    yield server
+    docs._daily_doc.clear()
+    server.stop()
+
+def test_creates_doc_then_appends(stub):
+    url = docs.write_analyses(TITLE, ["first"])
+    assert url.endswith("/doc1/edit")
+    docs.write_analyses(TITLE, ["second", "third"])
+    assert list(stub.documents) == ["doc1"]
+    assert stub.documents["doc1"]["text"] == "first\n\n" + "".join(docs.SEPARATOR + t + "\n" for t in ("second", "third"))
+
+def test_reuses_existing_doc(stub):
+    stub.documents["existing"] = {"title": TITLE, "text": "earlier\n"}
+    assert docs.write_analyses(TITLE, ["next"]).endswith("/existing/edit")
+    assert stub.documents["existing"]["text"] == "earlier\n" + docs.SEPARATOR + "next\n"
+
+def test_warm_write_is_two_requests(stub):
+    docs.write_analyses(TITLE, ["first"])
+    before = stub.requests
+    docs.write_analyses(TITLE, ["second"])
+    # End index check and the batchUpdate; no Drive search
+    assert stub.requests - before == 2
+
+def test_picks_up_edits_made_elsewhere(stub):
+    docs.write_analyses(TITLE, ["first"])
+    stub.documents["doc1"]["text"] += "typed by hand\n"
+    docs.write_analyses(TITLE, ["second"])
+    assert docs._daily_doc["end_index"] == len(stub.documents["doc1"]["text"]) + 2
+
+def test_rejected_update_reloads_document(stub, monkeypatch):
+    docs.write_analyses(TITLE, ["first"])
+    real_end_index = docs._end_index
+    stale = iter([10_000])
+    # First lookup returns an index past the end, as after a concurrent delete of text
+    monkeypatch.setattr(docs, "_end_index", lambda documents, doc_id: next(stale, None) or real_end_index(documents, doc_id))
+    docs.write_analyses(TITLE, ["second"])
+    assert stub.documents["doc1"]["text"] == "first\n\n" + docs.SEPARATOR + "second\n"
+
+def test_deleted_document_is_recreated(stub):
+    docs.write_analyses(TITLE, ["first"])
+    del stub.documents["doc1"]
+    url = docs.write_analyses(TITLE, ["second"])
+    assert url.endswith("/doc1/edit")
+    assert stub.documents["doc1"]["text"] == "second\n\n"
+
+def test_export_queue_coalesces_and_drops_cancelled(stub):
+    calls = []
+    writing, busy = threading.Event(), threading.Event()
+
+    def write(title, contents):
+        calls.append(list(contents))
+        writing.set()
+        busy.wait(5)
+        return docs.write_analyses(title, contents)
+
+    queue = docs.ExportQueue(write)
+    first = queue.submit(TITLE, "first")
+    assert writing.wait(5)
+    # Queued while the first write is in flight
+    dropped = queue.submit(TITLE, "dropped")
+    kept = [queue.submit(TITLE, f"kept {i}") for i in range(2)]
+    assert dropped.cancel()
+    busy.set()
+    assert first.result(timeout=5) == kept[1].result(timeout=5)
+    assert calls == [["first"], ["kept 0", "kept 1"]]
+    assert "dropped" not in stub.documents["doc1"]["text"]
@@ -0,0 +1,84 @@
+import pytest
+from services.history import IntradayHistory
+from services.option_chain import OptionChain
+from tests.fakes import SPOT, synthetic_chain
+
+TS = 1762185600  # 2025-11-03 11:00 ET
+
+def _loop_changes(before, after, spot_before, spot_after, range_pct):
+    """OI and GEX change per strike from the raw Tradier dicts."""
+    def by_strike(options, spot):
+        out = {}
+        for opt in options:
+            row = out.setdefault(opt["strike"], {"call_oi": 0, "put_oi": 0, "gex": 0.0})
+            row["call_oi" if opt["option_type"] == "call" else "put_oi"] += opt["open_interest"]
+            sign = 1 if opt["option_type"] == "call" else -1
+            row["gex"] += sign * opt["greeks"]["gamma"] * opt["open_interest"] * 100 * spot
+        return out
+
+    then, now = by_strike(before, spot_before), by_strike(after, spot_after)
+    empty = {"call_oi": 0, "put_oi": 0, "gex": 0.0}
+    return {k: {"call_oi_change": now.get(k, empty)["call_oi"] - then.get(k, empty)["call_oi"],
+                "put_oi_change": now.get(k, empty)["put_oi"] - then.get(k, empty)["put_oi"],
+                "net_gex": now.get(k, empty)["gex"], "net_gex_change": now.get(k, empty)["gex"] - then.get(k, empty)["gex"]}
+            for k in sorted(set(then) | set(now)) if abs(k / spot_after - 1) <= range_pct}
+
+def test_changes_match_per_strike_loop():
+    before = synthetic_chain(seed=1)
+    after = synthetic_chain(seed=2)
+    # A strike listed only in the later chain
+    after.append(dict(after[-1], strike=SPOT + 2.5))
+    history = IntradayHistory()
+    history.add("SPX", TS, SPOT, OptionChain.from_tradier(before))
+    history.add("SPX", TS + 600, SPOT + 10, OptionChain.from_tradier(after))
+
+    changes = history.changes("SPX", range_pct=0.01)
+    expected = _loop_changes(before, after, SPOT, SPOT + 10, 0.01)
+    assert [row["strike"] for row in changes["strikes"]] == list(expected)
+    for row in changes["strikes"]:
+        ref = expected[row["strike"]]
+        assert row["call_oi_change"] == ref["call_oi_change"]
+        assert row["put_oi_change"] == ref["put_oi_change"]
+        # Snapshots store greeks as float32
+        assert row["net_gex"] == pytest.approx(ref["net_gex"], rel=1e-5, abs=1)
+        assert row["net_gex_change"] == pytest.approx(ref["net_gex_change"], rel=1e-5, abs=1)
+
+def test_changes_since_picks_the_base_snapshot():
+    history = IntradayHistory()
+    for i in range(3):
+        chain = OptionChain.from_tradier(synthetic_chain(seed=i))
+        history.add("SPX", TS + 600 * i, SPOT, chain)
+    assert history.changes("SPX", since=TS + 60)["from"]["ts"] == TS
+    assert history.changes("SPX")["from"]["ts"] == TS + 600
+    assert IntradayHistory().changes("SPX") is None
+
+def test_new_day_clears_the_buffer():
+    history = IntradayHistory()
+    chain = OptionChain.from_tradier(synthetic_chain())
+    history.add("SPX", TS, SPOT, chain)
+    history.add("SPX", TS + 86400, SPOT, chain)
+    assert len(history.snapshots("SPX")) == 1
+    assert history.stats()["bytes"] == history.snapshots("SPX")[0].nbytes
+
+def test_memory_cap_evicts_oldest():
+    chain = OptionChain.from_tradier(synthetic_chain())
+    size = IntradayHistory().add("SPX", TS, SPOT, chain).nbytes
+    history = IntradayHistory(max_bytes=2.5 * size)
+    for i in range(4):
+        history.add("SPX", TS + i, SPOT, chain)
+    assert [s.ts for s in history.snapshots("SPX")] == [TS + 2, TS + 3]
+
+def test_changes_skip_contracts_without_a_strike():
+    before = synthetic_chain(seed=1)
+    after = synthetic_chain(seed=2)
+    call = next(o for o in after if o["option_type"] == "call")
+    after.append(dict(call, strike=None))
+    history = IntradayHistory()
+    history.add("SPX", TS, SPOT, OptionChain.from_tradier(before))
+    history.add("SPX", TS + 600, SPOT + 10, OptionChain.from_tradier(after))
+
+    changes = history.changes("SPX", range_pct=0.01)
+    expected = _loop_changes(before, after[:-1], SPOT, SPOT + 10, 0.01)
+    assert [row["strike"] for row in changes["strikes"]] == list(expected)
+    call_oi = lambda chain: sum(o["open_interest"] for o in chain if o["option_type"] == "call")
+    assert changes["totals"]["call_oi_change"] == call_oi(after[:-1]) - call_oi(before)
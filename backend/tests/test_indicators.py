@@ -0,0 +1,102 @@
+import numpy as np
+import pytest
+from services.indicators import (calculate_expiry_breakdown, calculate_exposure_profile, calculate_gex_dex,
+                                 calculate_volume_totals, find_zero_gamma, top_open_interest)
+from services.option_chain import OptionChain
+from services.pricing import bs_gamma
+from tests.fakes import SPOT, synthetic_chain
+
+T = 2 / 365 / 24  # two hours to expiry
+
+def _loop_gex_dex(options, spot):
+    """The per-contract loop the vectorized version replaced."""
+    total_gex = total_dex = 0
+    for opt in options:
+        greeks = opt.get("greeks")
+        if not greeks:
+            continue
+        gamma, delta, oi = greeks.get("gamma"), greeks.get("delta"), opt.get("open_interest")
+        if gamma is None or delta is None or oi is None:
+            continue
+        gex = gamma * oi * 100 * spot
+        total_gex += -gex if opt["option_type"] == "put" else gex
+        total_dex += delta * oi * 100 * spot
+    return total_gex, total_dex
+
+@pytest.fixture(scope="module")
+def options():
+    options = synthetic_chain()
+    # Contracts the loop skips: no greeks, a missing gamma, missing open interest
+    options[0] = dict(options[0], greeks=None)
+    options[1] = dict(options[1], greeks=dict(options[1]["greeks"], gamma=None))
+    options[2] = dict(options[2], open_interest=None)
+    return options
+
+def test_gex_dex_matches_loop(options):
+    expected = _loop_gex_dex(options, SPOT)
+    assert calculate_gex_dex(options, SPOT) == pytest.approx(expected, rel=1e-12)
+    assert calculate_gex_dex(OptionChain.from_tradier(options), SPOT) == pytest.approx(expected, rel=1e-12)
+
+def test_volume_totals_and_top_oi_match_loop(options):
+    calls = sum(o["volume"] for o in options if o["option_type"] == "call")
+    puts = sum(o["volume"] for o in options if o["option_type"] == "put")
+    assert calculate_volume_totals(options) == (calls, puts)
+    oi = {(o["strike"], o["option_type"]): o["open_interest"] for o in options if o["open_interest"] is not None}
+    top = top_open_interest(options, 5)
+    # Compared by open interest so ties may come in either order
+    assert [oi[key] for key in top] == sorted(oi.values(), reverse=True)[:5]
+
+def test_exposure_profile_matches_per_strike_loop(options):
+    profile = calculate_exposure_profile(options, SPOT, T, profile_pct=0.01)
+    call_gex, put_gex = {}, {}
+    for opt in options:
+        greeks = opt.get("greeks") or {}
+        if greeks.get("gamma") is None or greeks.get("delta") is None or opt.get("open_interest") is None:
+            continue
+        gex = greeks["gamma"] * opt["open_interest"] * 100 * SPOT
+        if opt["option_type"] == "call":
+            call_gex[opt["strike"]] = call_gex.get(opt["strike"], 0) + gex
+        else:
+            put_gex[opt["strike"]] = put_gex.get(opt["strike"], 0) - gex
+
+    total_gex, total_dex = _loop_gex_dex(options, SPOT)
+    assert profile["total_gex"] == pytest.approx(total_gex)
+    assert profile["total_dex"] == pytest.approx(total_dex)
+    assert profile["call_wall"] == max(call_gex, key=call_gex.get)
+    assert profile["put_wall"] == min(put_gex, key=put_gex.get)
+    assert sum(b["gex"] for b in profile["buckets"]) == pytest.approx(total_gex, abs=len(profile["buckets"]))
+    for row in profile["strikes"]:
+        assert abs(row["strike"] / SPOT - 1) <= 0.01
+        assert row["call_gex"] == round(call_gex.get(row["strike"], 0))
+        assert row["put_gex"] == round(put_gex.get(row["strike"], 0))
+
+def test_expiry_breakdown_walls_match_profile(options):
+    # A huge put without delta is left out of both, not just the profile
+    put = next(o for o in options if o["option_type"] == "put" and o["strike"] == SPOT - 50)
+    options = options + [dict(put, open_interest=10 ** 7, greeks=dict(put["greeks"], delta=None))]
+    profile = calculate_exposure_profile(options, SPOT, T)
+    (entry,) = calculate_expiry_breakdown(options, SPOT)
+    assert (entry["call_wall"], entry["put_wall"]) == (profile["call_wall"], profile["put_wall"])
+    assert entry["total_gex"] == round(profile["total_gex"])
+
+def _net_gex(chain, spot):
+    """Net dealer gamma at a hypothetical spot, one contract at a time."""
+    total = 0.0
+    for k, iv, oi, call in zip(chain.strike, chain.iv, chain.open_interest, chain.is_call):
+        if oi > 0 and iv > 0:
+            total += (1 if call else -1) * oi * float(bs_gamma(spot, k, iv, T)) * 100 * spot
+    return total
+
+def test_zero_gamma_is_a_sign_change_of_net_gamma():
+    chain = OptionChain.from_tradier(synthetic_chain())
+    # Put-heavy below spot, call-heavy above: net gamma flips near spot
+    chain.open_interest = np.where(chain.is_call == (chain.strike > SPOT), chain.open_interest * 3, chain.open_interest)
+    level = find_zero_gamma(chain, SPOT, T)
+    assert level is not None and abs(level / SPOT - 1) < 0.05
+    step = SPOT * 0.1 / 200
+    assert np.sign(_net_gex(chain, level - step)) != np.sign(_net_gex(chain, level + step))
+
+def test_zero_gamma_none_without_iv():
+    chain = OptionChain.from_tradier(synthetic_chain())
+    chain.iv = np.full(len(chain), np.nan)
+    assert find_zero_gamma(chain, SPOT, T) is None
@@ -0,0 +1,101 @@
+import threading
+import time
+import pytest
+from services.llm_service import LLMError, LLMRouter, StubProvider
+
+def _router(*providers, concurrency=2, deadline=5, hedge_after=0, abandoned_max=2):
+    return LLMRouter(providers, concurrency=concurrency, deadline=deadline, hedge_after=hedge_after,
+                     abandoned_max=abandoned_max)
+
+def _free_slots(router, expected, wait=1.0):
+    # Attempt threads release their slot just after their last message
+    end = time.monotonic() + wait
+    while router._slots._value != expected and time.monotonic() < end:
+        time.sleep(0.01)
+    return router._slots._value
+
+def test_streams_primary_reply():
+    router = _router(StubProvider(text="hello world", chunk_size=4))
+    assert list(router.stream("p")) == ["hell", "o wo", "rld"]
+    assert _free_slots(router, 2) == 2
+
+def test_falls_back_after_error():
+    router = _router(StubProvider(error=LLMError("boom"), name="primary"), StubProvider(text="ok", name="backup"))
+    assert "".join(router.stream("p")) == "ok"
+
+def test_rate_limited_provider_cools_down():
+    primary = StubProvider(error=LLMError("429", rate_limited=True), name="primary")
+    router = _router(primary, StubProvider(text="ok", name="backup"))
+    assert "".join(router.stream("p")) == "ok"
+    assert primary.throttled()
+
+def test_all_providers_failing_raises_combined_error():
+    router = _router(StubProvider(error=LLMError("a down"), name="a"), StubProvider(error=LLMError("b down"), name="b"))
+    with pytest.raises(LLMError, match="a: a down; b: b down"):
+        list(router.stream("p"))
+
+def test_hedges_slow_primary():
+    router = _router(StubProvider(text="slow", first_token_delay=2, name="slow"),
+                     StubProvider(text="fast", name="fast"), hedge_after=0.1)
+    started = time.monotonic()
+    assert "".join(router.stream("p")) == "fast"
+    assert time.monotonic() - started < 1
+    # The abandoned primary gave its slot back while still sleeping
+    assert _free_slots(router, 2) == 2
+
+def test_deadline_exceeded():
+    router = _router(StubProvider(text="late", first_token_delay=30, name="hung"), deadline=0.3)
+    with pytest.raises(LLMError):
+        list(router.stream("p"))
+
+class HungProvider(StubProvider):
+    """Ignores the timeout, like a provider stuck on a dead connection."""
+
+    def __init__(self):
+        super().__init__(name="hung")
+        self.release = threading.Event()
+
+    def stream(self, prompt, json_output=False, timeout=None):
+        self.release.wait(30)
+        yield "late"
+
+def test_abandoned_call_moves_to_the_abandoned_allowance():
+    hung = HungProvider()
+    router = _router(hung, concurrency=1, deadline=0.3, abandoned_max=1)
+    with pytest.raises(LLMError, match="deadline"):
+        list(router.stream("p"))
+    # The hung call no longer holds the only slot, but still holds a permit
+    assert router._slots._value == 1
+    assert router._abandoned._value == 0
+    router.set_providers([StubProvider(text="ok")])
+    assert "".join(router.stream("p")) == "ok"
+    assert _free_slots(router, 1) == 1
+    hung.release.set()
+    end = time.monotonic() + 1
+    while router._abandoned._value != 1 and time.monotonic() < end:
+        time.sleep(0.01)
+    assert router._abandoned._value == 1
+    assert router._slots._value == 1
+
+def test_abandoned_calls_stay_bounded():
+    hung = HungProvider()
+    router = _router(hung, concurrency=1, deadline=0.2, abandoned_max=0)
+    with pytest.raises(LLMError, match="deadline"):
+        list(router.stream("p"))
+    # No allowance left: the hung call keeps its slot until it returns
+    with pytest.raises(LLMError, match="no free LLM slot"):
+        list(router.stream("p"))
+    hung.release.set()
+    assert _free_slots(router, 1) == 1
+
+def test_provider_timeout_is_time_left():
+    seen = []
+
+    class Recording(StubProvider):
+        def stream(self, prompt, json_output=False, timeout=None):
+            seen.append(timeout)
+            yield "ok"
+
+    router = _router(Recording(), deadline=2)
+    assert "".join(router.stream("p")) == "ok"
+    assert 0 < seen[0] <= 2
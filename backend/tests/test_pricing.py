@@ -0,0 +1,61 @@
+import math
+import numpy as np
+import pytest
+from services.pricing import bs_greeks, bs_price, implied_vol, norm_cdf
+
+SPOT = 6000.0
+STRIKES = np.array([5400, 5800, 5950, 6000, 6050, 6200, 6600], dtype=float)
+
+def test_norm_cdf_matches_erf():
+    x = np.linspace(-6, 6, 241)
+    expected = [0.5 * (1 + math.erf(v / math.sqrt(2))) for v in x]
+    assert np.allclose(norm_cdf(x), expected, atol=1e-7)
+
+@pytest.mark.parametrize("t", [10 / 60 / 24 / 365, 3 / 24 / 365, 1 / 365, 30 / 365])
+@pytest.mark.parametrize("is_call", [True, False])
+def test_implied_vol_recovers_the_pricing_vol(t, is_call):
+    vols = np.array([0.08, 0.12, 0.2, 0.35, 0.6, 1.0, 1.5])
+    strike, vol = (a.ravel() for a in np.meshgrid(STRIKES, vols))
+    price = bs_price(SPOT, strike, vol, t, is_call)
+    solved = implied_vol(price, SPOT, strike, t, is_call)
+    # Where the option has time value left to solve from, the solver recovers the vol
+    intrinsic = np.maximum(SPOT - strike, 0) if is_call else np.maximum(strike - SPOT, 0)
+    usable = price - intrinsic > 1e-4
+    assert usable.any()
+    assert np.allclose(solved[usable], vol[usable], atol=1e-4)
+
+def test_implied_vol_is_nan_outside_arbitrage_bounds():
+    solved = implied_vol(np.array([0.0, 250.0, 7000.0, np.nan]), SPOT, np.array([6100.0, 5800.0, 6000.0, 6000.0]),
+                         1 / 365, True)
+    # Zero price, a valid 5800 call above its 200 intrinsic, a call worth more than spot, no price
+    assert np.isnan(solved[0]) and np.isfinite(solved[1]) and np.isnan(solved[2]) and np.isnan(solved[3])
+
+def _exact_price(spot, strike, vol, t, is_call):
+    # Black-Scholes with the exact normal CDF, so differences aren't polluted
+    # by the polynomial approximation's error
+    cdf = lambda x: 0.5 * (1 + math.erf(x / math.sqrt(2)))
+    d1 = (math.log(spot / strike) + 0.5 * vol * vol * t) / (vol * math.sqrt(t))
+    call = spot * cdf(d1) - strike * cdf(d1 - vol * math.sqrt(t))
+    return call if is_call else call - spot + strike
+
+@pytest.mark.parametrize("is_call", [True, False])
+def test_greeks_match_finite_differences(is_call):
+    iv, t = 0.18, 2 / 365
+    greeks = bs_greeks(SPOT, STRIKES, iv, t, is_call)
+    h_s, h_v, h_t = 0.01, 1e-5, 1e-7
+
+    def price(spot=SPOT, vol=iv, years=t):
+        return np.array([_exact_price(spot, k, vol, years, is_call) for k in STRIKES])
+
+    def delta(vol=iv, years=t):
+        return (price(SPOT + h_s, vol, years) - price(SPOT - h_s, vol, years)) / (2 * h_s)
+
+    gamma = (price(SPOT + h_s) - 2 * price() + price(SPOT - h_s)) / h_s ** 2
+    vanna = (delta(iv + h_v) - delta(iv - h_v)) / (2 * h_v)
+    # charm is delta's change as time passes, i.e. -d delta / d t
+    charm = -(delta(years=t + h_t) - delta(years=t - h_t)) / (2 * h_t)
+
+    assert np.allclose(greeks["delta"], delta(), atol=1e-5)
+    assert np.allclose(greeks["gamma"], gamma, rtol=1e-3, atol=1e-7)
+    assert np.allclose(greeks["vanna"], vanna, rtol=1e-3, atol=1e-4)
+    assert np.allclose(greeks["charm"], charm, rtol=1e-2, atol=1e-2)
@@ -0,0 +1,60 @@
+import json
+import pytest
+from services.prompt_builder import build_prompt, estimate_tokens, parse_analysis, prompt_spot, render_text
+
+REPLY = {
+    "summary": "Range-bound into the close.", "sentiment": "neutral", "range": [5810, "5790"], "target": "5,800",
+    "strategy": "Iron Condor 5780/5790/5810/5820",
+    "exits": {"profit_target": "50%", "stop_loss": "2x credit", "time_exit": None},
+    "levels": {"support": [5790, "5780"], "resistance": 5810},
+}
+
+MARKET_DATA = {
+    "symbol": "SPX", "spot_price": 5801.234, "vix_current": 15.2, "vix_change": -0.3,
+    "gex_profile": {"total_gex": 2.5e9, "total_dex": -1e9,
+                    "strikes": [{"strike": 5700 + 5 * i, "net_gex": (i - 20) * 1e7} for i in range(40)]},
+    "zero_gamma": 5790.5, "call_wall": 5850, "put_wall": 5750, "rsi_5min": 48.2,
+    "macd_values": {"macd": 1.2, "signal": 0.8, "histogram": 0.4}, "recent_trend_5min": "Up",
+    "atm_iv": 14.1, "skew_25d": 3.2, "butterfly_25d": 0.4, "iv_rank": 35.0,
+    "call_volume": 120000, "put_volume": 150000, "top_oi": [(5800.0, "call"), (5750.0, "put")],
+}
+
+def test_parse_normalizes_fields():
+    parsed = parse_analysis("Here you go:\n```json\n" + json.dumps(REPLY) + "\n```")
+    assert parsed["sentiment"] == "Neutral"
+    assert parsed["range"] == [5790, 5810]
+    assert parsed["target"] == 5800
+    assert parsed["exits"] == {"profit_target": "50%", "stop_loss": "2x credit", "time_exit": None}
+    assert parsed["levels"] == {"support": [5790, 5780], "resistance": [5810]}
+
+@pytest.mark.parametrize("field, value, error", [
+    ("sentiment", "Sideways", "sentiment"), ("range", [5800], "range"), ("target", "soon", "target"),
+    ("strategy", " ", "strategy"), ("levels", {"support": "5850"}, "levels.support"),
+    ("levels", {"resistance": {"a": 1}}, "levels.resistance"),
+])
+def test_parse_rejects_invalid_fields(field, value, error):
+    with pytest.raises(ValueError, match=error):
+        parse_analysis(json.dumps(dict(REPLY, **{field: value})))
+
+@pytest.mark.parametrize("text", ["no json here", "{not json}", "[1, 2]"])
+def test_parse_rejects_non_objects(text):
+    with pytest.raises(ValueError):
+        parse_analysis(text)
+
+def test_render_text_round_trips_labels():
+    text = render_text(parse_analysis(json.dumps(REPLY)))
+    assert "Market Sentiment: Neutral" in text
+    assert "Predicted Closing Range: 5,790 - 5,810" in text
+    assert "Key Levels: Support 5,790, 5,780; Resistance 5,810" in text
+    assert text.endswith("Range-bound into the close.")
+
+def test_prompt_keeps_within_budget_by_dropping_low_priority_sections():
+    full, info = build_prompt(MARKET_DATA, budget=10_000)
+    assert info["dropped"] == [] and info["tokens"] == estimate_tokens(full)
+    budget = info["tokens"] - 1
+    trimmed, info = build_prompt(MARKET_DATA, budget=budget)
+    assert info["dropped"][0] == "profile"
+    assert info["tokens"] <= budget and len(trimmed) < len(full)
+    # The price section is never dropped
+    minimal, info = build_prompt(MARKET_DATA, budget=1)
+    assert "price" not in info["dropped"] and prompt_spot(minimal) == 5801.23
@@ -0,0 +1,43 @@
+import datetime
+import pytest
+from services import scheduler
+from services.option_chain import OptionChain
+from services.pricing import MARKET_TZ, bs_price, time_to_expiry
+from services.stream_service import LiveSnapshot
+from tests.fakes import SESSION_DATE, SPOT, synthetic_chain
+
+NOW = datetime.datetime.fromisoformat(SESSION_DATE).replace(hour=13, tzinfo=MARKET_TZ)
+
+def _streamed(chain, rows, iv, spot=SPOT):
+    """Snapshot with the rows quoted at Black-Scholes prices for iv."""
+    snapshot = LiveSnapshot()
+    snapshot.apply({"type": "trade", "symbol": "SPX", "last": spot})
+    t = time_to_expiry(SESSION_DATE, now=NOW)
+    for i in rows:
+        price = float(bs_price(spot, chain.strike[i], iv, t, chain.is_call[i]))
+        snapshot.apply({"type": "quote", "symbol": chain.symbols[i], "bid": price - 0.01, "ask": price + 0.01})
+    return snapshot
+
+def test_near_the_money_rows():
+    chain = OptionChain.from_tradier(synthetic_chain())
+    rows = scheduler.near_the_money_rows(chain, SPOT, count=10)
+    assert sorted(set(chain.strike[rows])) == [5990, 5995, 6000, 6005, 6010]
+
+def test_live_atm_iv_from_streamed_marks():
+    chain = OptionChain.from_tradier(synthetic_chain())
+    rows = scheduler.near_the_money_rows(chain, SPOT, count=10)
+    assert scheduler.live_atm_iv(chain, rows, SPOT, _streamed(chain, rows, 0.18), now=NOW) == pytest.approx(18.0, abs=0.05)
+    assert scheduler.live_atm_iv(chain, rows, SPOT, LiveSnapshot(), now=NOW) is None
+
+def test_option_quote_alone_refreshes_live_metrics(monkeypatch):
+    chain = OptionChain.from_tradier(synthetic_chain())
+    rows = scheduler.near_the_money_rows(chain, SPOT, count=10)
+    monkeypatch.setattr(scheduler, "live_context", {
+        "symbol": "SPX", "chain": chain, "profile": None, "analysis_spot": SPOT,
+        "option_rows": rows, "option_symbols": frozenset(chain.symbols[i] for i in rows)})
+    monkeypatch.setattr(scheduler, "live_metrics", {})
+    monkeypatch.setattr(scheduler, "now_et", lambda: NOW)
+
+    scheduler._on_live_update({chain.symbols[rows[0]]}, _streamed(chain, rows, 0.18))
+    assert scheduler.live_metrics["atm_iv"] == pytest.approx(18.0, abs=0.05)
+    assert scheduler.live_metrics["spot_price"] == SPOT
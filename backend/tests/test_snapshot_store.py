@@ -0,0 +1,46 @@
+import sqlite3
+import pytest
+from services.option_chain import OptionChain
+from services.snapshot_store import SnapshotStore
+from tests.fakes import SESSION_DATE, synthetic_chain
+
+TS = 1762185600.0
+
+@pytest.fixture
+def store(tmp_path):
+    return SnapshotStore(str(tmp_path), flush_seconds=0.05)
+
+def test_round_trip(store):
+    chain = OptionChain.from_tradier(synthetic_chain())
+    store.record_cycle(SESSION_DATE, "run", TS, "SPX", chain=chain, spot=6000.0, quotes={"vix": 15})
+    store.flush()
+    (cycle,) = store.query_cycles(SESSION_DATE, "SPX")
+    assert cycle["spot"] == 6000.0 and cycle["quotes"] == {"vix": 15}
+    columns = store.query_chain(SESSION_DATE, "SPX", strike_min=5990, strike_max=6010)
+    assert sorted(set(columns["strike"])) == [5990, 5995, 6000, 6005, 6010]
+
+def test_reads_never_create_files(store, tmp_path):
+    assert store.query_cycles(SESSION_DATE, "SPX") == []
+    assert len(store.query_chain(SESSION_DATE, "SPX")["ts"]) == 0
+    assert list(tmp_path.iterdir()) == []
+
+@pytest.mark.parametrize("date_str", ["../etc/passwd", "2025-11-3", "2025-13-01", "2025-11-03.db", None])
+def test_invalid_dates_are_rejected(store, tmp_path, date_str):
+    with pytest.raises(ValueError):
+        store.query_cycles(date_str, "SPX")
+    assert list(tmp_path.iterdir()) == []
+
+def test_reader_leaves_old_files_unmigrated(store):
+    path = store._path(SESSION_DATE)
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE chain_rows (run_id TEXT, ts REAL, symbol TEXT, option_symbol TEXT, strike REAL, "
+                 "is_call INTEGER, open_interest REAL, volume REAL, bid REAL, ask REAL, iv REAL, gamma REAL, delta REAL)")
+    conn.execute("INSERT INTO chain_rows VALUES ('run', ?, 'SPX', 'SPX1', 6000, 1, 10, 1, 1, 2, 0.2, 0.01, 0.5)", (TS,))
+    conn.commit()
+    conn.close()
+
+    columns = store.query_chain(SESSION_DATE, "SPX")
+    assert columns["expiration"] == [None] and list(columns["strike"]) == [6000]
+    conn = sqlite3.connect(path)
+    assert "expiration" not in {row[1] for row in conn.execute("PRAGMA table_info(chain_rows)")}
+    conn.close()
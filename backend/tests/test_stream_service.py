@@ -0,0 +1,61 @@
+import threading
+import time
+import pytest
+from services.stream_service import QuoteFeed, ReplayFeed, StreamIngestor
+
+EVENTS = [{"type": "trade", "symbol": "SPX", "last": str(5800 + i)} for i in range(5)]
+
+def test_quote_feed_is_abstract():
+    with pytest.raises(TypeError):
+        QuoteFeed()
+
+def test_replay_filters_symbols():
+    feed = ReplayFeed(EVENTS + [{"type": "trade", "symbol": "QQQ", "last": "1"}])
+    events = feed.events(["QQQ"])
+    assert next(events)["symbol"] == "QQQ"
+    feed.close()
+    assert list(events) == []
+
+def test_close_before_iteration_ends_next_subscription():
+    feed = ReplayFeed(EVENTS)
+    feed.close()
+    assert list(feed.events(["SPX"])) == []
+    # The close was consumed; the next subscription streams again
+    events = feed.events(["SPX"])
+    assert next(events)["last"] == "5800"
+
+def test_resubscribe_resumes_where_it_stopped():
+    feed = ReplayFeed(EVENTS)
+    first = feed.events(["SPX"])
+    assert [next(first)["last"], next(first)["last"]] == ["5800", "5801"]
+    feed.close()
+    assert list(first) == []
+    second = feed.events(["SPX"])
+    assert next(second)["last"] == "5802"
+
+def test_close_wakes_an_exhausted_feed():
+    feed = ReplayFeed(EVENTS[:1])
+    received = []
+    thread = threading.Thread(target=lambda: received.extend(feed.events(["SPX"])))
+    thread.start()
+    time.sleep(0.05)
+    assert thread.is_alive()
+    feed.close()
+    thread.join(1)
+    assert not thread.is_alive()
+    assert len(received) == 1
+
+def test_ingestor_resubscribe_keeps_streaming():
+    feed = ReplayFeed(EVENTS)
+    ingestor = StreamIngestor(feed, symbols=["SPX"])
+    ingestor.start()
+    try:
+        deadline = time.monotonic() + 2
+        while ingestor.snapshot.get("SPX").get("last") != 5804.0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert ingestor.snapshot.get("SPX")["last"] == 5804.0
+        ingestor.set_symbols(["SPX", "QQQ"])
+        time.sleep(0.1)
+        assert ingestor.stats["reconnects"] == 0
+    finally:
+        ingestor.stop()
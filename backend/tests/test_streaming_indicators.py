@@ -0,0 +1,109 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from services.streaming_indicators import IndicatorEngine, IndicatorState
+from tests.fakes import synthetic_timesales
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_timesales(bars=200)
+
+def _wilder(values, period):
+    """Simple average of the first period values, then Wilder smoothing."""
+    avg = sum(values[:period]) / period
+    for value in values[period:]:
+        avg = (avg * (period - 1) + value) / period
+    return avg
+
+def _state(bars):
+    state = IndicatorState()
+    for bar in bars:
+        state.update(bar)
+    return state.values()
+
+def test_macd_matches_pandas_ewm(bars):
+    closes = pd.Series([b["close"] for b in bars])
+    fast = closes.ewm(span=12, adjust=False).mean()
+    slow = closes.ewm(span=26, adjust=False).mean()
+    signal = (fast - slow).ewm(span=9, adjust=False).mean()
+    macd = _state(bars)["macd"]
+    assert macd["macd"] == pytest.approx(fast.iloc[-1] - slow.iloc[-1], abs=1e-9)
+    assert macd["signal"] == pytest.approx(signal.iloc[-1], abs=1e-9)
+
+def test_rsi_matches_wilder(bars):
+    closes = [b["close"] for b in bars]
+    changes = np.diff(closes)
+    gain = _wilder(list(np.maximum(changes, 0)), 14)
+    loss = _wilder(list(np.maximum(-changes, 0)), 14)
+    assert _state(bars)["rsi"] == pytest.approx(100 - 100 / (1 + gain / loss), abs=1e-9)
+
+def test_atr_and_vwap_match_reference(bars):
+    frame = pd.DataFrame(bars)
+    prev_close = frame["close"].shift()
+    true_range = pd.concat([frame["high"] - frame["low"], (frame["high"] - prev_close).abs(),
+                            (frame["low"] - prev_close).abs()], axis=1).max(axis=1)
+    typical = (frame["high"] + frame["low"] + frame["close"]) / 3
+    values = _state(bars)
+    assert values["atr"] == pytest.approx(_wilder(list(true_range), 14), abs=1e-9)
+    assert values["vwap"] == pytest.approx((typical * frame["volume"]).sum() / frame["volume"].sum(), abs=1e-9)
+
+def test_not_enough_bars(bars):
+    values = _state(bars[:10])
+    assert values["rsi"] is None and values["macd"] is None and values["atr"] is None
+
+def test_engine_applies_only_new_bars_and_never_commits_the_last(bars):
+    engine = IndicatorEngine()
+    # Overlapping fetches, the way each cycle re-fetches from the last committed bar
+    for end in (50, 120, 121, 200):
+        values = engine.update("SPX", "1min", bars[max(0, end - 80):end])
+    expected = _state(bars)
+    for key in ("rsi", "atr", "vwap"):
+        assert values[key] == pytest.approx(expected[key], abs=1e-9)
+    assert values["macd"]["histogram"] == pytest.approx(expected["macd"]["histogram"], abs=1e-9)
+    # The forming bar is shown but not committed
+    assert engine.states[("SPX", "1min")].bars == len(bars) - 1
+
+def test_state_round_trips_through_dict(bars):
+    state = IndicatorState()
+    for bar in bars[:100]:
+        state.update(bar)
+    restored = IndicatorState.from_dict(state.to_dict())
+    for bar in bars[100:]:
+        state.update(bar)
+        restored.update(bar)
+    assert restored.values() == state.values()
+
+def _next_day(bars):
+    shifted = []
+    for bar in bars:
+        when = datetime.datetime.fromisoformat(bar["time"]) + datetime.timedelta(days=1)
+        shifted.append(dict(bar, time=when.strftime("%Y-%m-%dT%H:%M:%S"), timestamp=int(when.timestamp())))
+    return shifted
+
+def test_engine_starts_fresh_state_each_session(bars):
+    engine = IndicatorEngine()
+    engine.update("SPX", "1min", bars[:100])
+    today = _next_day(bars[100:])
+    # The fetch from the last committed bar still returns yesterday's tail
+    values = engine.update("SPX", "1min", bars[99:100] + today)
+    expected = _state(today)
+    for key in ("rsi", "atr", "vwap"):
+        assert values[key] == pytest.approx(expected[key], abs=1e-9)
+    assert engine.states[("SPX", "1min")].bars == len(today) - 1
+
+def test_checkpoint_writes_only_after_new_bars(bars, tmp_path):
+    path = tmp_path / "indicators.json"
+    engine = IndicatorEngine(str(path))
+    engine.checkpoint()
+    assert not path.exists()
+    engine.update("SPX", "1min", bars[:50])
+    engine.checkpoint()
+    restored = IndicatorEngine(str(path))
+    assert restored.restore()
+    assert restored.states[("SPX", "1min")].bars == 49
+    path.unlink()
+    # Only the forming bar changed, so there is nothing new to write
+    engine.update("SPX", "1min", bars[49:50])
+    engine.checkpoint()
+    assert not path.exists()
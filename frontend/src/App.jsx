@@ -1,7 +1,9 @@
 import { useState, useEffect, useRef } from 'react'
 
 function App() {
-    const [analysis, setAnalysis] = useState(null)
+    const [analyses, setAnalyses] = useState({})
+    const [symbols, setSymbols] = useState([])
+    const [selectedSymbol, setSelectedSymbol] = useState(null)
     const [voiceEnabled, setVoiceEnabled] = useState(false)
     const [autoSaveDocs, setAutoSaveDocs] = useState(false)
     const [autoSaveDisk, setAutoSaveDisk] = useState(false)
@@ -9,6 +11,18 @@ function App() {
     const [lastReadTimestamp, setLastReadTimestamp] = useState(null)
     const [lastSavedTimestamp, setLastSavedTimestamp] = useState(null)
     const [loading, setLoading] = useState(false)
+    const streamConnected = useRef(false)
+    const latestEtag = useRef(null)
+
+    const currentSymbol = selectedSymbol || symbols[0] || Object.keys(analyses)[0]
+    const analysis = analyses[currentSymbol] || null
+
+    // Analyses are kept per symbol; events for every symbol update the map
+    const storeAnalysis = (data) => {
+        const symbol = data?.data?.symbol
+        if (!symbol) return
+        setAnalyses(prev => ({ ...prev, [symbol]: data }))
+    }
 
     const API_URL = import.meta.env.VITE_API_URL || 'http://localhost:8001'
 
@@ -19,6 +33,9 @@ function App() {
             if (data.paused !== undefined) {
                 setIsPaused(data.paused)
             }
+            if (data.symbols) {
+                setSymbols(data.symbols)
+            }
         } catch (err) {
             console.error("Failed to fetch status", err)
         }
@@ -26,18 +43,40 @@ function App() {
 
     const fetchAnalysis = async () => {
         try {
-            const res = await fetch(`${API_URL}/api/latest`)
+            const headers = latestEtag.current ? { 'If-None-Match': latestEtag.current } : {}
+            const res = await fetch(`${API_URL}/api/latest/all`, { headers })
+            if (res.status === 304) return
+            latestEtag.current = res.headers.get('ETag')
             const data = await res.json()
-            setAnalysis(data)
+            Object.values(data).forEach(storeAnalysis)
         } catch (err) {
             console.error("Failed to fetch analysis", err)
         }
     }
 
+    const waitForJob = async (jobId) => {
+        // Poll the background job until it leaves the queued/running states
+        while (true) {
+            const res = await fetch(`${API_URL}/api/jobs/${jobId}`)
+            const job = await res.json()
+            if (job.error || (job.status !== 'queued' && job.status !== 'running')) {
+                return job
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000))
+        }
+    }
+
     const triggerAnalysis = async () => {
         setLoading(true)
         try {
-            await fetch(`${API_URL}/api/analyze`, { method: 'POST' })
+            const res = await fetch(`${API_URL}/api/analyze`, { method: 'POST' })
+            const data = await res.json()
+            if (data.job_id) {
+                const job = await waitForJob(data.job_id)
+                if (job.outcome === 'skipped_cooldown') {
+                    console.log("Analysis skipped: cooldown active, showing latest result")
+                }
+            }
             await fetchAnalysis()
         } catch (err) {
             console.error("Failed to trigger analysis", err)
@@ -49,25 +88,56 @@ function App() {
     useEffect(() => {
         fetchStatus()
         fetchAnalysis()
+
+        // New analyses and pause/resume changes are pushed over SSE
+        const events = new EventSource(`${API_URL}/api/events`)
+        events.onopen = () => { streamConnected.current = true }
+        events.onerror = () => { streamConnected.current = false } // EventSource reconnects on its own
+        events.addEventListener('analysis', (e) => storeAnalysis(JSON.parse(e.data)))
+        // Streaming generation: start with the market data, then append text as it arrives
+        events.addEventListener('analysis_start', (e) => storeAnalysis(JSON.parse(e.data)))
+        events.addEventListener('analysis_delta', (e) => {
+            const { symbol, timestamp, delta } = JSON.parse(e.data)
+            setAnalyses(prev => {
+                const current = prev[symbol]
+                if (!current || current.timestamp !== timestamp) return prev
+                return { ...prev, [symbol]: { ...current, text: current.text + delta } }
+            })
+        })
+        events.addEventListener('status', (e) => {
+            const data = JSON.parse(e.data)
+            if (data.paused !== undefined) {
+                setIsPaused(data.paused)
+            }
+        })
+
+        // Fallback polling only while the stream is down
         const interval = setInterval(() => {
+            if (streamConnected.current) return
             fetchAnalysis()
             fetchStatus()
-        }, 60000) // Poll every minute
-        return () => clearInterval(interval)
+        }, 60000)
+        return () => {
+            clearInterval(interval)
+            events.close()
+        }
     }, [])
 
     useEffect(() => {
-        if (!analysis || !analysis.timestamp) return
+        // Wait for the complete text before reading it aloud or saving it
+        if (!analysis || !analysis.timestamp || analysis.partial) return
+        // A reused (cached) analysis keeps the time its text was generated
+        const generatedAt = analysis.generated_at || analysis.timestamp
 
         // Voice Logic
-        if (voiceEnabled && analysis.text && analysis.timestamp !== lastReadTimestamp) {
+        if (voiceEnabled && analysis.text && generatedAt !== lastReadTimestamp) {
             const utterance = new SpeechSynthesisUtterance(analysis.text)
             window.speechSynthesis.speak(utterance)
-            setLastReadTimestamp(analysis.timestamp)
+            setLastReadTimestamp(generatedAt)
         }
 
         // Auto-Save Logic
-        if (analysis.timestamp !== lastSavedTimestamp) {
+        if (generatedAt !== lastSavedTimestamp) {
             if (autoSaveDocs) {
                 shareToDocs(true) // Pass true to suppress alerts
             }
@@ -80,13 +150,13 @@ function App() {
             // Let's update lastSavedTimestamp only if we attempted a save OR if we just want to track "processed".
             // If I update it here unconditionally, then toggling ON later won't save the *current* stale one, which is probably good.
             // We only want to auto-save *fresh* incoming data.
-            setLastSavedTimestamp(analysis.timestamp)
+            setLastSavedTimestamp(generatedAt)
         }
     }, [analysis, voiceEnabled, autoSaveDocs, autoSaveDisk, lastReadTimestamp, lastSavedTimestamp])
 
     const shareToDocs = async (silent = false) => {
         try {
-            const res = await fetch(`${API_URL}/api/share`, { method: 'POST' })
+            const res = await fetch(`${API_URL}/api/share?symbol=${currentSymbol}`, { method: 'POST' })
             const data = await res.json()
             if (data.url) {
                 if (!silent) window.open(data.url, '_blank')
@@ -103,7 +173,7 @@ function App() {
 
     const saveToDisk = async (silent = false) => {
         try {
-            const res = await fetch(`${API_URL}/api/save_local`, { method: 'POST' })
+            const res = await fetch(`${API_URL}/api/save_local?symbol=${currentSymbol}`, { method: 'POST' })
             const data = await res.json()
             if (data.path) {
                 console.log("Saved to disk:", data.path)
@@ -135,6 +205,15 @@ function App() {
             <header className="mb-8 flex justify-between items-center">
                 <h1 className="text-3xl font-bold text-blue-400">0DTE Trader Assistant</h1>
                 <div className="flex items-center gap-4">
+                    {symbols.length > 1 && (
+                        <select
+                            value={currentSymbol}
+                            onChange={(e) => setSelectedSymbol(e.target.value)}
+                            className="px-4 py-2 rounded-full font-semibold bg-slate-700 text-slate-100"
+                        >
+                            {symbols.map(symbol => <option key={symbol} value={symbol}>{symbol}</option>)}
+                        </select>
+                    )}
                     <button
                         onClick={togglePause}
                         className={`px-4 py-2 rounded-full font-semibold transition-colors ${isPaused ? 'bg-green-600 hover:bg-green-500' : 'bg-yellow-600 hover:bg-yellow-500'
@@ -178,13 +257,18 @@ function App() {
                     <div className="space-y-6">
                         <div className="bg-slate-800 p-6 rounded-xl shadow-lg border border-slate-700">
                             <div className="flex justify-between items-center mb-4">
-                                <h2 className="text-xl font-semibold text-slate-300">Latest Analysis</h2>
+                                <h2 className="text-xl font-semibold text-slate-300">Latest Analysis{currentSymbol ? ` - ${currentSymbol}` : ''}</h2>
                                 <span className="text-sm text-slate-500">
                                     {analysis.timestamp ? new Date(analysis.timestamp).toLocaleString('en-US', { timeZone: 'America/New_York', timeZoneName: 'short' }) : 'Never'}
+                                    {analysis.cached && analysis.generated_at && (
+                                        <span className={analysis.stale ? 'text-amber-400' : ''}>
+                                            {' '}({analysis.stale ? 'rate limited, showing' : 'unchanged since'} {new Date(analysis.generated_at).toLocaleTimeString('en-US', { timeZone: 'America/New_York' })})
+                                        </span>
+                                    )}
                                 </span>
                             </div>
                             <div className="prose prose-invert max-w-none text-lg leading-relaxed whitespace-pre-line">
-                                {analysis.text}
+                                {analysis.text || (analysis.partial ? <span className="text-slate-500">Generating analysis...</span> : null)}
                             </div>
                         </div>
 
@@ -209,6 +293,18 @@ function App() {
                                         <span className="text-sm text-slate-500">{analysis.data.vix_trend}</span>
                                     </div>
                                 </div>
+                                <div className="bg-slate-800 p-4 rounded-lg border border-slate-700">
+                                    <h3 className="text-sm font-medium text-slate-400 mb-1">Zero Gamma</h3>
+                                    <p className="text-2xl font-bold text-yellow-400">{analysis.data.zero_gamma?.toFixed(1) || 'N/A'}</p>
+                                </div>
+                                <div className="bg-slate-800 p-4 rounded-lg border border-slate-700">
+                                    <h3 className="text-sm font-medium text-slate-400 mb-1">Call Wall / Put Wall</h3>
+                                    <p className="text-2xl font-bold">
+                                        <span className="text-green-400">{analysis.data.call_wall || 'N/A'}</span>
+                                        <span className="text-slate-500"> / </span>
+                                        <span className="text-red-400">{analysis.data.put_wall || 'N/A'}</span>
+                                    </p>
+                                </div>
                             </div>
                         )}
                     </div>